@@ -0,0 +1,38 @@
+"""add rental period range with gist index
+
+Revision ID: 0002_alquileres_periodo
+Revises: 0001_create_tables
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0002_alquileres_periodo"
+down_revision = "0001_create_tables"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_check_constraint("ck_alquileres_fechas", "alquileres", "fecha_hasta >= fecha_desde")
+    op.add_column(
+        "alquileres",
+        sa.Column(
+            "periodo",
+            postgresql.TSTZRANGE(),
+            sa.Computed("tstzrange(fecha_desde, fecha_hasta, '[)')", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index("ix_alquileres_periodo", "alquileres", ["periodo"], postgresql_using="gist")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_alquileres_periodo", table_name="alquileres")
+    op.drop_column("alquileres", "periodo")
+    op.drop_constraint("ck_alquileres_fechas", "alquileres", type_="check")
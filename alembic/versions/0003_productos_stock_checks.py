@@ -0,0 +1,53 @@
+"""add stock invariants as check constraints
+
+Revision ID: 0003_productos_stock_checks
+Revises: 0002_alquileres_periodo
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+import logging
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0003_productos_stock_checks"
+down_revision = "0002_alquileres_periodo"
+branch_labels = None
+depends_on = None
+
+
+CHECKS = (
+    ("ck_productos_stock_actual", "stock_actual >= 0"),
+    ("ck_productos_stock_rentado", "stock_rentado >= 0"),
+    ("ck_productos_stock_disponible", "stock_disponible >= 0 AND stock_disponible <= stock_actual"),
+)
+
+log = logging.getLogger("alembic.runtime.migration")
+
+
+def upgrade() -> None:
+    # NOT VALID primero: el ALTER no recorre la tabla con el lock exclusivo tomado y ya controla las escrituras nuevas.
+    for nombre, condicion in CHECKS:
+        op.execute(f"ALTER TABLE productos ADD CONSTRAINT {nombre} CHECK ({condicion}) NOT VALID")
+    # La edición directa de productos permitía stock negativo o disponible mayor al actual: se llevan al rango válido
+    # antes de validar.
+    reparados = op.get_bind().exec_driver_sql(
+        """
+        UPDATE productos
+        SET stock_actual = greatest(stock_actual, 0),
+            stock_rentado = greatest(stock_rentado, 0),
+            stock_disponible = greatest(least(stock_disponible, greatest(stock_actual, 0)), 0)
+        WHERE stock_actual < 0 OR stock_rentado < 0 OR stock_disponible < 0 OR stock_disponible > stock_actual
+        """
+    ).rowcount
+    if reparados:
+        log.warning("%s productos con stock fuera de rango se ajustaron antes de validar los CHECKs", reparados)
+    for nombre, _ in CHECKS:
+        op.execute(f"ALTER TABLE productos VALIDATE CONSTRAINT {nombre}")
+
+
+def downgrade() -> None:
+    op.drop_constraint("ck_productos_stock_disponible", "productos", type_="check")
+    op.drop_constraint("ck_productos_stock_rentado", "productos", type_="check")
+    op.drop_constraint("ck_productos_stock_actual", "productos", type_="check")
@@ -0,0 +1,40 @@
+"""add incrementally maintained dashboard metrics
+
+Revision ID: 0004_metricas_dashboard
+Revises: 0003_productos_stock_checks
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0004_metricas_dashboard"
+down_revision = "0003_productos_stock_checks"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "metricas_dashboard",
+        sa.Column("clave", sa.String(length=50), primary_key=True),
+        sa.Column("shard", sa.Integer(), primary_key=True),
+        sa.Column("valor", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+    )
+    op.execute(
+        """
+        INSERT INTO metricas_dashboard (clave, shard, valor)
+        SELECT 'total_productos', 0, count(*) FROM productos
+        UNION ALL SELECT 'stock_total', 0, coalesce(sum(stock_actual), 0) FROM productos
+        UNION ALL SELECT 'cantidad_alertas_stock_bajo', 0, count(*) FROM productos WHERE stock_disponible <= stock_minimo
+        UNION ALL SELECT 'cantidad_depositos', 0, count(*) FROM depositos
+        UNION ALL SELECT 'ordenes_alquiler_activas', 0, count(*) FROM alquileres WHERE estado IN ('Confirmado', 'En curso')
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("metricas_dashboard")
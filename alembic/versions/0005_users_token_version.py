@@ -0,0 +1,25 @@
+"""add token version to users for stateless auth revocation
+
+Revision ID: 0005_users_token_version
+Revises: 0004_metricas_dashboard
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0005_users_token_version"
+down_revision = "0004_metricas_dashboard"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("token_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    op.drop_column("users", "token_version")
@@ -0,0 +1,34 @@
+"""add trigram indexes for product and client search
+
+Revision ID: 0006_busqueda_trigram
+Revises: 0005_users_token_version
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0006_busqueda_trigram"
+down_revision = "0005_users_token_version"
+branch_labels = None
+depends_on = None
+
+INDICES = (
+    ("ix_productos_nombre_trgm", "productos", "nombre"),
+    ("ix_productos_codigo_trgm", "productos", "codigo"),
+    ("ix_clientes_nombre_trgm", "clientes", "nombre"),
+    ("ix_clientes_apellido_trgm", "clientes", "apellido"),
+    ("ix_clientes_email_trgm", "clientes", "email"),
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for nombre, tabla, columna in INDICES:
+        op.create_index(nombre, tabla, [columna], postgresql_using="gin", postgresql_ops={columna: "gin_trgm_ops"})
+
+
+def downgrade() -> None:
+    for nombre, tabla, _ in reversed(INDICES):
+        op.drop_index(nombre, table_name=tabla)
@@ -0,0 +1,48 @@
+"""add composite indexes for hot filters and keyset orderings
+
+Revision ID: 0007_indices_consultas
+Revises: 0006_busqueda_trigram
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0007_indices_consultas"
+down_revision = "0006_busqueda_trigram"
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, columnas, predicado parcial)
+INDICES = (
+    ("ix_movimientos_stock_producto_fecha", "movimientos_stock", "producto_id, fecha, id", None),
+    ("ix_movimientos_stock_fecha", "movimientos_stock", "fecha, id", None),
+    ("ix_alquileres_estado_fecha_desde", "alquileres", "estado, fecha_desde", None),
+    ("ix_alquileres_fecha_desde", "alquileres", "fecha_desde, id", None),
+    ("ix_alquileres_cliente_id", "alquileres", "cliente_id", None),
+    ("ix_alquileres_evento_id", "alquileres", "evento_id", None),
+    ("ix_alquiler_items_producto_id", "alquiler_items", "producto_id", None),
+    ("ix_alquiler_items_alquiler_id", "alquiler_items", "alquiler_id", None),
+    ("ix_eventos_fecha_evento", "eventos", "fecha_evento, id", None),
+    ("ix_eventos_cliente_id", "eventos", "cliente_id", None),
+    ("ix_productos_nombre", "productos", "nombre, id", None),
+    ("ix_productos_deposito_principal_id", "productos", "deposito_principal_id", None),
+    ("ix_productos_stock_bajo", "productos", "stock_disponible", "stock_disponible <= stock_minimo"),
+    ("ix_productos_danados", "productos", "fecha_actualizacion", "estado_fisico = 'Dañado'"),
+    ("ix_clientes_nombre", "clientes", "nombre, id", None),
+)
+
+
+def upgrade() -> None:
+    # CONCURRENTLY no puede correr dentro de una transacción: evita bloquear escrituras mientras se construyen.
+    with op.get_context().autocommit_block():
+        for nombre, tabla, columnas, predicado in INDICES:
+            where = f" WHERE {predicado}" if predicado else ""
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {tabla} ({columnas}){where}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for nombre, _, _, _ in reversed(INDICES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}")
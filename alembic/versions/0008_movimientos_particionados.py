@@ -0,0 +1,96 @@
+"""partition movimientos_stock by month
+
+Revision ID: 0008_movimientos_particionados
+Revises: 0007_indices_consultas
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+from datetime import date
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0008_movimientos_particionados"
+down_revision = "0007_indices_consultas"
+branch_labels = None
+depends_on = None
+
+COLUMNAS = (
+    "id, producto_id, fecha, tipo, cantidad, deposito_origen_id, deposito_destino_id, "
+    "referencia, observaciones, usuario_id"
+)
+INDICES = (
+    ("ix_movimientos_stock_producto_fecha", "producto_id, fecha, id"),
+    ("ix_movimientos_stock_fecha", "fecha, id"),
+)
+MESES_ADELANTE = 3
+
+
+def _crear_tabla(particionada: bool) -> None:
+    clave = "PRIMARY KEY (id, fecha)" if particionada else "PRIMARY KEY (id)"
+    op.execute(
+        f"""
+        CREATE TABLE movimientos_stock (
+            id integer NOT NULL DEFAULT nextval('movimientos_stock_id_seq'),
+            producto_id integer NOT NULL REFERENCES productos (id),
+            fecha timestamp with time zone NOT NULL DEFAULT timezone('utc', now()),
+            tipo varchar(20) NOT NULL,
+            cantidad integer NOT NULL,
+            deposito_origen_id integer REFERENCES depositos (id),
+            deposito_destino_id integer REFERENCES depositos (id),
+            referencia varchar(255),
+            observaciones text,
+            usuario_id integer REFERENCES users (id),
+            CONSTRAINT movimientos_stock_pkey {clave}
+        ){" PARTITION BY RANGE (fecha)" if particionada else ""}
+        """
+    )
+    for nombre, columnas in INDICES:
+        op.execute(f"CREATE INDEX {nombre} ON movimientos_stock ({columnas})")
+
+
+def _renombrar_anterior() -> None:
+    op.execute("ALTER TABLE movimientos_stock RENAME TO movimientos_stock_anterior")
+    op.execute("ALTER INDEX movimientos_stock_pkey RENAME TO movimientos_stock_anterior_pkey")
+    for nombre, _ in INDICES:
+        op.execute(f"ALTER INDEX {nombre} RENAME TO {nombre}_anterior")
+    # La secuencia pertenece a la columna id: sin esto se borraría junto con la tabla anterior.
+    op.execute("ALTER SEQUENCE movimientos_stock_id_seq OWNED BY NONE")
+
+
+def _copiar_y_descartar_anterior() -> None:
+    op.execute(f"INSERT INTO movimientos_stock ({COLUMNAS}) SELECT {COLUMNAS} FROM movimientos_stock_anterior")
+    op.execute("DROP TABLE movimientos_stock_anterior")
+    op.execute("ALTER SEQUENCE movimientos_stock_id_seq OWNED BY movimientos_stock.id")
+
+
+def _sumar_meses(mes: date, meses: int) -> date:
+    total = mes.year * 12 + mes.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    primera = op.get_bind().exec_driver_sql(
+        "SELECT date_trunc('month', min(fecha) AT TIME ZONE 'UTC')::date FROM movimientos_stock"
+    ).scalar()
+    hoy = date.today().replace(day=1)
+    mes = min(primera or hoy, hoy)
+
+    _renombrar_anterior()
+    _crear_tabla(particionada=True)
+    while mes <= _sumar_meses(hoy, MESES_ADELANTE):
+        siguiente = _sumar_meses(mes, 1)
+        op.execute(
+            f"CREATE TABLE movimientos_stock_p{mes:%Y%m} PARTITION OF movimientos_stock "
+            f"FOR VALUES FROM ('{mes:%Y-%m-%d} 00:00+00') TO ('{siguiente:%Y-%m-%d} 00:00+00')"
+        )
+        mes = siguiente
+    op.execute("CREATE TABLE movimientos_stock_default PARTITION OF movimientos_stock DEFAULT")
+    _copiar_y_descartar_anterior()
+
+
+def downgrade() -> None:
+    _renombrar_anterior()
+    _crear_tabla(particionada=False)
+    _copiar_y_descartar_anterior()
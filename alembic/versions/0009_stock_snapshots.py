@@ -0,0 +1,46 @@
+"""add stock snapshots and persist adjustment sign in the ledger
+
+Revision ID: 0009_stock_snapshots
+Revises: 0008_movimientos_particionados
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0009_stock_snapshots"
+down_revision = "0008_movimientos_particionados"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Los AJUSTE previos quedan en NULL, que se interpreta como positivo igual que al registrarlos sin el campo.
+    op.add_column("movimientos_stock", sa.Column("ajuste_positivo", sa.Boolean(), nullable=True))
+    op.add_column(
+        "productos",
+        sa.Column("movimientos_sin_snapshot", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+    op.create_table(
+        "stock_snapshots",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("producto_id", sa.Integer(), sa.ForeignKey("productos.id"), nullable=False),
+        sa.Column("fecha", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("stock_actual", sa.Integer(), nullable=False),
+        sa.Column("stock_rentado", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_stock_snapshots_producto_fecha", "stock_snapshots", ["producto_id", "fecha"])
+    op.execute(
+        "INSERT INTO stock_snapshots (producto_id, fecha, stock_actual, stock_rentado) "
+        "SELECT id, now(), stock_actual, stock_rentado FROM productos"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_stock_snapshots_producto_fecha", table_name="stock_snapshots")
+    op.drop_table("stock_snapshots")
+    op.drop_column("productos", "movimientos_sin_snapshot")
+    op.drop_column("movimientos_stock", "ajuste_positivo")
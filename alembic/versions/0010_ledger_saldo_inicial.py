@@ -0,0 +1,58 @@
+"""record opening balances so the movement ledger matches product counters
+
+Revision ID: 0010_ledger_saldo_inicial
+Revises: 0009_stock_snapshots
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0010_ledger_saldo_inicial"
+down_revision = "0009_stock_snapshots"
+branch_labels = None
+depends_on = None
+
+REFERENCIA = "Saldo inicial"
+
+
+def upgrade() -> None:
+    # Hasta ahora el alta y la edición directa de productos no dejaban movimientos: la diferencia entre los
+    # contadores y el ledger se registra como saldo inicial, fechado en el alta para que quede antes de los snapshots.
+    op.execute(
+        f"""
+        WITH ledger AS (
+            SELECT
+                producto_id,
+                sum(CASE
+                    WHEN tipo = 'INGRESO' OR (tipo = 'AJUSTE' AND ajuste_positivo IS NOT FALSE) THEN cantidad
+                    WHEN tipo IN ('EGRESO', 'AJUSTE') THEN -cantidad
+                    ELSE 0
+                END) AS actual,
+                sum(CASE tipo WHEN 'ALQUILER' THEN cantidad WHEN 'DEVOLUCION' THEN -cantidad ELSE 0 END) AS rentado
+            FROM movimientos_stock
+            GROUP BY producto_id
+        ),
+        diferencia AS (
+            SELECT
+                p.id,
+                p.fecha_creacion,
+                p.stock_actual - coalesce(l.actual, 0) AS actual,
+                p.stock_rentado - coalesce(l.rentado, 0) AS rentado
+            FROM productos p
+            LEFT JOIN ledger l ON l.producto_id = p.id
+        )
+        INSERT INTO movimientos_stock (producto_id, fecha, tipo, cantidad, ajuste_positivo, referencia)
+        SELECT id, fecha_creacion, 'AJUSTE', abs(actual), actual > 0, '{REFERENCIA}'
+        FROM diferencia WHERE actual <> 0
+        UNION ALL
+        SELECT id, fecha_creacion, CASE WHEN rentado > 0 THEN 'ALQUILER' ELSE 'DEVOLUCION' END, abs(rentado), NULL,
+               '{REFERENCIA}'
+        FROM diferencia WHERE rentado <> 0
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(f"DELETE FROM movimientos_stock WHERE referencia = '{REFERENCIA}'")
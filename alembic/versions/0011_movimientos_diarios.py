@@ -0,0 +1,35 @@
+"""add daily movement rollup
+
+Revision ID: 0011_movimientos_diarios
+Revises: 0010_ledger_saldo_inicial
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0011_movimientos_diarios"
+down_revision = "0010_ledger_saldo_inicial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "movimientos_diarios",
+        sa.Column("dia", sa.Date(), primary_key=True),
+        sa.Column("producto_id", sa.Integer(), primary_key=True),
+        sa.Column("deposito_id", sa.Integer(), primary_key=True),
+        sa.Column("tipo", sa.String(length=20), primary_key=True),
+        sa.Column("cantidad", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("movimientos", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+    op.create_index("ix_movimientos_diarios_producto_dia", "movimientos_diarios", ["producto_id", "dia"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_movimientos_diarios_producto_dia", table_name="movimientos_diarios")
+    op.drop_table("movimientos_diarios")
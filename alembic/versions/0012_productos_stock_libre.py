@@ -0,0 +1,46 @@
+"""check rented and available stock against stock_actual
+
+Revision ID: 0012_productos_stock_libre
+Revises: 0011_movimientos_diarios
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+import logging
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0012_productos_stock_libre"
+down_revision = "0011_movimientos_diarios"
+branch_labels = None
+depends_on = None
+
+CHECKS = (
+    ("ck_productos_stock_rentado_actual", "stock_rentado <= stock_actual"),
+    ("ck_productos_stock_disponible_libre", "stock_disponible <= stock_actual - stock_rentado"),
+)
+
+log = logging.getLogger("alembic.runtime.migration")
+
+
+def upgrade() -> None:
+    # NOT VALID: se controlan las escrituras desde ya aunque haya filas viejas que no cumplan (p. ej. alquileres
+    # confirmados para fechas distintas que sumaron más unidades rentadas que el stock; 0013 las libera y valida).
+    for nombre, condicion in CHECKS:
+        op.execute(f"ALTER TABLE productos ADD CONSTRAINT {nombre} CHECK ({condicion}) NOT VALID")
+        invalidas = op.get_bind().exec_driver_sql(f"SELECT count(*) FROM productos WHERE NOT ({condicion})").scalar()
+        if invalidas:
+            log.warning(
+                "%s productos no cumplen %s; corregirlos y luego ejecutar ALTER TABLE productos VALIDATE CONSTRAINT %s",
+                invalidas,
+                condicion,
+                nombre,
+            )
+        else:
+            op.execute(f"ALTER TABLE productos VALIDATE CONSTRAINT {nombre}")
+
+
+def downgrade() -> None:
+    for nombre, _ in reversed(CHECKS):
+        op.drop_constraint(nombre, "productos", type_="check")
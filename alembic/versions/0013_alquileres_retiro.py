@@ -0,0 +1,97 @@
+"""book rented stock at pickup instead of at confirmation
+
+Revision ID: 0013_alquileres_retiro
+Revises: 0012_productos_stock_libre
+Create Date: 2026-10-18 00:00:00
+"""
+from __future__ import annotations
+
+import logging
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0013_alquileres_retiro"
+down_revision = "0012_productos_stock_libre"
+branch_labels = None
+depends_on = None
+
+REFERENCIA = "Reserva sin retirar"
+CHECKS = (
+    ("ck_productos_stock_rentado_actual", "stock_rentado <= stock_actual"),
+    ("ck_productos_stock_disponible_libre", "stock_disponible <= stock_actual - stock_rentado"),
+)
+
+log = logging.getLogger("alembic.runtime.migration")
+
+
+def upgrade() -> None:
+    # Hasta ahora confirmar registraba el ALQUILER. Los confirmados que ya empezaron pasan a En curso; los que son a
+    # futuro devuelven sus unidades (quedan reservados por fechas y el ALQUILER se registra al retirarlos).
+    op.execute("UPDATE alquileres SET estado = 'En curso' WHERE estado = 'Confirmado' AND fecha_desde <= now()")
+    op.execute(
+        f"""
+        WITH reservado AS (
+            SELECT ai.producto_id, sum(ai.cantidad) AS cantidad
+            FROM alquileres a
+            JOIN alquiler_items ai ON ai.alquiler_id = a.id
+            WHERE a.estado = 'Confirmado'
+            GROUP BY ai.producto_id
+        ),
+        liberar AS (
+            SELECT p.id, least(r.cantidad, p.stock_rentado) AS cantidad
+            FROM reservado r
+            JOIN productos p ON p.id = r.producto_id
+            WHERE p.stock_rentado > 0
+        ),
+        liberado AS (
+            UPDATE productos p
+            SET stock_rentado = p.stock_rentado - l.cantidad,
+                stock_disponible = least(p.stock_disponible + l.cantidad, p.stock_actual - p.stock_rentado + l.cantidad)
+            FROM liberar l
+            WHERE p.id = l.id
+            RETURNING p.id, l.cantidad
+        ),
+        devuelto AS (
+            INSERT INTO movimientos_stock (producto_id, fecha, tipo, cantidad, referencia)
+            SELECT id, now(), 'DEVOLUCION', cantidad, '{REFERENCIA}' FROM liberado
+            RETURNING producto_id, fecha, cantidad
+        )
+        INSERT INTO movimientos_diarios (dia, producto_id, deposito_id, tipo, cantidad, movimientos)
+        SELECT (fecha AT TIME ZONE 'UTC')::date, producto_id, 0, 'DEVOLUCION', cantidad, 1 FROM devuelto
+        ON CONFLICT (dia, producto_id, deposito_id, tipo) DO UPDATE
+        SET cantidad = movimientos_diarios.cantidad + excluded.cantidad,
+            movimientos = movimientos_diarios.movimientos + excluded.movimientos
+        """
+    )
+    op.execute("DELETE FROM metricas_dashboard WHERE clave = 'cantidad_alertas_stock_bajo'")
+    op.execute(
+        """
+        INSERT INTO metricas_dashboard (clave, shard, valor)
+        SELECT 'cantidad_alertas_stock_bajo', 0, count(*) FROM productos WHERE stock_disponible <= stock_minimo
+        """
+    )
+
+    # Los CHECKs de 0012 quedaron sin validar donde las confirmaciones habían rentado más que el stock.
+    bind = op.get_bind()
+    for nombre, condicion in CHECKS:
+        validado = bind.exec_driver_sql(
+            "SELECT convalidated FROM pg_constraint WHERE conname = %s AND conrelid = 'productos'::regclass", (nombre,)
+        ).scalar()
+        if validado:
+            continue
+        invalidas = bind.exec_driver_sql(f"SELECT count(*) FROM productos WHERE NOT ({condicion})").scalar()
+        if invalidas:
+            log.warning(
+                "%s productos no cumplen %s; corregirlos y luego ejecutar ALTER TABLE productos VALIDATE CONSTRAINT %s",
+                invalidas,
+                condicion,
+                nombre,
+            )
+        else:
+            op.execute(f"ALTER TABLE productos VALIDATE CONSTRAINT {nombre}")
+
+
+def downgrade() -> None:
+    # Los alquileres pasados a En curso no se distinguen de los demás: la migración de datos no se revierte.
+    pass
@@ -1,12 +1,22 @@
 from __future__ import annotations
 
-from fastapi import Depends, HTTPException, status
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.security import decode_token
-from app.db.session import SessionLocal
+from app.core import instrumentacion
+from app.core.security import decode_token, optional_oauth2_scheme, user_id_from_token
+from app.core.user_cache import user_cache
+from app.db import replica
+from app.db.session import AsyncSessionLocal, SessionLocal
 from app.models.user import User
 from app.schemas.auth import TokenData
+from app.schemas.user import CurrentUser
+from app.services import perfiles_service
 
 
 def get_db() -> Session:
@@ -17,22 +27,97 @@ def get_db() -> Session:
         db.close()
 
 
-def get_current_user(token_data: TokenData = Depends(decode_token), db: Session = Depends(get_db)) -> User:
-    if token_data.email is None:
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Sesión async; los servicios síncronos se ejecutan sobre ella con `await db.run_sync(servicio, ...)`."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def leer_de_replica(request: Request, token: str | None = Depends(optional_oauth2_scheme)) -> bool:
+    """Si las lecturas del request pueden ir a la réplica: no, si el usuario escribió recién."""
+    usuario_id = user_id_from_token(token)
+    return usuario_id is None or not replica.escribio_recientemente(usuario_id, request.cookies.get(replica.COOKIE))
+
+
+async def get_read_db(usar_replica: bool = Depends(leer_de_replica)) -> AsyncIterator[AsyncSession]:
+    """Sesión de solo lectura: usa la réplica si está configurada, salvo que el usuario haya escrito recién."""
+    async with AsyncSessionLocal(info={"replica": usar_replica}) as db:
+        yield db
+
+
+async def get_current_user(
+    token_data: TokenData = Depends(decode_token), db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
+    """Resuelve el usuario del token desde la caché en memoria; solo consulta la base ante un fallo de caché."""
+    if token_data.user_id is None or token_data.version is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
-    user = db.query(User).filter(User.email == token_data.email).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no encontrado")
-    return user
+
+    usuario = user_cache.get(token_data.user_id)
+    if usuario is None or usuario.token_version != token_data.version:
+        user = await db.get(User, token_data.user_id)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no encontrado")
+        usuario = CurrentUser.model_validate(user)
+        user_cache.set(usuario)
+
+    if usuario.token_version != token_data.version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revocado")
+    db.info["usuario_id"] = usuario.id
+    return usuario
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     if not current_user.activo:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuario inactivo")
     return current_user
 
 
-def get_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
+async def get_admin_user(current_user: CurrentUser = Depends(get_current_active_user)) -> CurrentUser:
     if current_user.rol != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo administradores")
     return current_user
+
+
+def presupuesto_consultas(maximo: int) -> Callable[[], Awaitable[None]]:
+    """Máximo de sentencias SQL esperado para la ruta: `dependencies=[Depends(presupuesto_consultas(3))]`.
+
+    Lo controla `PresupuestoConsultasMiddleware` antes de enviar la respuesta, incluida su serialización.
+    """
+
+    async def _fijar_presupuesto() -> None:
+        consultas = instrumentacion.consultas_actuales()
+        if consultas is not None:
+            consultas.presupuesto = maximo
+
+    return _fijar_presupuesto
+
+
+async def perfilar_request(
+    request: Request, token: str | None = Depends(optional_oauth2_scheme)
+) -> AsyncIterator[None]:
+    """Con el header `X-Perfil` un admin ejecuta el request bajo el profiler; sin el header no hace nada más."""
+    if perfiles_service.HEADER not in request.headers:
+        yield
+        return
+
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="No autorizado")
+    async with AsyncSessionLocal() as db:
+        usuario = await get_admin_user(await get_current_active_user(await get_current_user(decode_token(token), db)))
+
+    perfil_id = uuid.uuid4().hex
+    instrumentacion.agregar_header(request.scope, "X-Perfil-Id", perfil_id)
+    profiler = perfiles_service.iniciar()
+    try:
+        yield
+    finally:
+        sesion = profiler.stop()
+        await run_in_threadpool(
+            perfiles_service.guardar,
+            sesion,
+            perfil_id,
+            metodo=request.method,
+            ruta=instrumentacion.ruta_plantilla(request.scope),
+            path=request.url.path,
+            usuario_id=usuario.id,
+        )
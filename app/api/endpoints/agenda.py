@@ -1,20 +1,20 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_active_user, get_db
-from app.models.user import User
+from app.api.deps import get_current_active_user, get_read_db, presupuesto_consultas
+from app.schemas.user import CurrentUser
 from app.services.agenda_service import proximos_eventos
 
 router = APIRouter()
 
 
-@router.get("/proximos-eventos")
-def agenda_proximos_eventos(
+@router.get("/proximos-eventos", dependencies=[Depends(presupuesto_consultas(3))])
+async def agenda_proximos_eventos(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     dias: int = Query(14, ge=1, le=90),
-    _: User = Depends(get_current_active_user),
+    _: CurrentUser = Depends(get_current_active_user),
 ) -> list[dict]:
-    return proximos_eventos(db, dias=dias)
+    return await db.run_sync(proximos_eventos, dias=dias)
@@ -3,100 +3,183 @@ from __future__ import annotations
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-
-from app.api.deps import get_current_active_user, get_db
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import (
+    get_async_db,
+    get_current_active_user,
+    get_read_db,
+    leer_de_replica,
+    presupuesto_consultas,
+)
 from app.models.alquiler import Alquiler
-from app.models.user import User
-from app.schemas.alquiler import AlquilerCreate, AlquilerRead, AlquilerUpdate
-from app.services import alquiler_service
+from app.schemas.alquiler import (
+    AlquilerCreate,
+    AlquilerRead,
+    AlquilerUpdate,
+    DisponibilidadRead,
+    DisponibilidadRequest,
+)
+from app.schemas.pagination import Page
+from app.schemas.user import CurrentUser
+from app.services import alquiler_service, disponibilidad_service
+from app.services.exportacion import respuesta_exportacion
+from app.services.pagination import DEFAULT_LIMIT, MAX_LIMIT
 
 router = APIRouter()
 
 
-@router.get("/", response_model=list[AlquilerRead])
-def listar_alquileres(
+@router.get("/", response_model=Page[AlquilerRead], dependencies=[Depends(presupuesto_consultas(3))])
+async def listar_alquileres(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     cliente_id: int | None = None,
     evento_id: int | None = None,
     estado: str | None = None,
     fecha_desde: datetime | None = Query(None),
     fecha_hasta: datetime | None = Query(None),
-) -> list[AlquilerRead]:
-    alquileres = alquiler_service.list_alquileres(
-        db,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+) -> Page[AlquilerRead]:
+    alquileres, next_cursor = await db.run_sync(
+        alquiler_service.list_alquileres,
         cliente_id=cliente_id,
         evento_id=evento_id,
         estado=estado,
         fecha_desde=fecha_desde,
         fecha_hasta=fecha_hasta,
+        cursor=cursor,
+        limit=limit,
     )
-    return [_to_read(alquiler) for alquiler in alquileres]
+    return Page(items=[_to_read(alquiler) for alquiler in alquileres], next_cursor=next_cursor)
 
 
-@router.get("/{alquiler_id}", response_model=AlquilerRead)
-def obtener_alquiler(alquiler_id: int, db: Session = Depends(get_db)) -> AlquilerRead:
-    alquiler = alquiler_service.get_alquiler_or_404(db, alquiler_id)
+@router.get("/export", response_class=StreamingResponse)
+async def exportar_alquileres(
+    *,
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    cliente_id: int | None = None,
+    evento_id: int | None = None,
+    estado: str | None = None,
+    fecha_desde: datetime | None = Query(None),
+    fecha_hasta: datetime | None = Query(None),
+    _: CurrentUser = Depends(get_current_active_user),
+    replica: bool = Depends(leer_de_replica),
+) -> StreamingResponse:
+    consulta = alquiler_service.consulta_exportacion(
+        cliente_id=cliente_id,
+        evento_id=evento_id,
+        estado=estado,
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta,
+    )
+    return respuesta_exportacion(consulta, formato, "alquileres", replica=replica)
+
+
+@router.get("/{alquiler_id}", response_model=AlquilerRead, dependencies=[Depends(presupuesto_consultas(3))])
+async def obtener_alquiler(alquiler_id: int, db: AsyncSession = Depends(get_read_db)) -> AlquilerRead:
+    alquiler = await db.run_sync(alquiler_service.get_alquiler_or_404, alquiler_id)
     return _to_read(alquiler)
 
 
 @router.post("/", response_model=AlquilerRead, status_code=201)
-def crear_alquiler(
+async def crear_alquiler(
     alquiler_in: AlquilerCreate,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: CurrentUser = Depends(get_current_active_user),
 ) -> AlquilerRead:
-    alquiler = alquiler_service.create_alquiler(db, alquiler_in)
+    alquiler = await db.run_sync(alquiler_service.create_alquiler, alquiler_in)
     return _to_read(alquiler)
 
 
+@router.post("/disponibilidad", response_model=list[DisponibilidadRead])
+async def consultar_disponibilidad(
+    consulta: DisponibilidadRequest, db: AsyncSession = Depends(get_async_db)
+) -> list[DisponibilidadRead]:
+    solicitado: dict[int, int] = {}
+    for item in consulta.items:
+        solicitado[item.producto_id] = solicitado.get(item.producto_id, 0) + item.cantidad
+
+    disponibilidad = await db.run_sync(
+        disponibilidad_service.calcular_disponibilidad,
+        solicitado.keys(),
+        consulta.fecha_desde,
+        consulta.fecha_hasta,
+        excluir_alquiler_id=consulta.excluir_alquiler_id,
+    )
+    return [
+        DisponibilidadRead(
+            producto_id=producto_id,
+            solicitado=solicitado[producto_id],
+            suficiente=datos["disponible"] >= solicitado[producto_id],
+            **datos,
+        )
+        for producto_id, datos in disponibilidad.items()
+    ]
+
+
 @router.put("/{alquiler_id}", response_model=AlquilerRead)
-def actualizar_alquiler(
+async def actualizar_alquiler(
     alquiler_id: int,
     alquiler_in: AlquilerUpdate,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: CurrentUser = Depends(get_current_active_user),
 ) -> AlquilerRead:
-    alquiler = alquiler_service.get_alquiler_or_404(db, alquiler_id)
-    alquiler = alquiler_service.update_alquiler(db, alquiler, alquiler_in)
+    alquiler = await db.run_sync(alquiler_service.get_alquiler_or_404, alquiler_id)
+    alquiler = await db.run_sync(alquiler_service.update_alquiler, alquiler, alquiler_in)
     return _to_read(alquiler)
 
 
 @router.post("/{alquiler_id}/confirmar", response_model=AlquilerRead)
-def confirmar_alquiler(
+async def confirmar_alquiler(
+    alquiler_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    _: CurrentUser = Depends(get_current_active_user),
+) -> AlquilerRead:
+    alquiler = await db.run_sync(alquiler_service.get_alquiler_or_404, alquiler_id)
+    alquiler = await db.run_sync(alquiler_service.confirm_alquiler, alquiler)
+    return _to_read(alquiler)
+
+
+@router.post("/{alquiler_id}/retirar", response_model=AlquilerRead)
+async def retirar_alquiler(
     alquiler_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ) -> AlquilerRead:
-    alquiler = alquiler_service.get_alquiler_or_404(db, alquiler_id)
-    alquiler = alquiler_service.confirm_alquiler(db, alquiler, usuario_id=current_user.id)
+    alquiler = await db.run_sync(alquiler_service.get_alquiler_or_404, alquiler_id)
+    alquiler = await db.run_sync(alquiler_service.retirar_alquiler, alquiler, usuario_id=current_user.id)
     return _to_read(alquiler)
 
 
 @router.post("/{alquiler_id}/registrar-devolucion", response_model=AlquilerRead)
-def registrar_devolucion(
+async def registrar_devolucion(
     alquiler_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ) -> AlquilerRead:
-    alquiler = alquiler_service.get_alquiler_or_404(db, alquiler_id)
-    alquiler = alquiler_service.registrar_devolucion(db, alquiler, usuario_id=current_user.id)
+    alquiler = await db.run_sync(alquiler_service.get_alquiler_or_404, alquiler_id)
+    alquiler = await db.run_sync(alquiler_service.registrar_devolucion, alquiler, usuario_id=current_user.id)
     return _to_read(alquiler)
 
 
 @router.delete("/{alquiler_id}", status_code=204)
-def eliminar_alquiler(
+async def eliminar_alquiler(
     alquiler_id: int,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: CurrentUser = Depends(get_current_active_user),
 ) -> None:
-    alquiler = alquiler_service.get_alquiler_or_404(db, alquiler_id)
-    alquiler_service.cancelar_alquiler(db, alquiler)
+    alquiler = await db.run_sync(alquiler_service.get_alquiler_or_404, alquiler_id)
+    await db.run_sync(alquiler_service.cancelar_alquiler, alquiler)
 
 
 def _to_read(alquiler: Alquiler) -> AlquilerRead:
     dto = AlquilerRead.model_validate(alquiler)
     cliente_nombre = alquiler.cliente.nombre if alquiler.cliente else None
     evento_nombre = alquiler.evento.nombre if alquiler.evento else None
-    return dto.model_copy(update={"cliente_nombre": cliente_nombre, "evento_nombre": evento_nombre})
+    items = [
+        item_dto.model_copy(update={"producto_nombre": item.producto.nombre if item.producto else None})
+        for item_dto, item in zip(dto.items, alquiler.items)
+    ]
+    return dto.model_copy(update={"cliente_nombre": cliente_nombre, "evento_nombre": evento_nombre, "items": items})
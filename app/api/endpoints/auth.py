@@ -2,32 +2,57 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Depends
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_active_user, get_db
+from app.api.deps import get_admin_user, get_async_db, get_current_active_user
 from app.models.user import User
-from app.schemas.auth import Token
-from app.schemas.user import UserCreate, UserRead
+from app.schemas.auth import RefreshRequest, Token
+from app.schemas.user import CurrentUser, UserCreate, UserRead, UserUpdate
 from app.services import auth_service
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=UserRead)
-def register_user(
+async def register_user(
     user_in: UserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> User:
-    return auth_service.create_user(db, user_in)
+    return await auth_service.create_user(db, user_in)
 
 
 @router.post("/login", response_model=Token)
-def login_usuario(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)) -> Token:
-    user = auth_service.authenticate_user(db, form_data.username, form_data.password)
-    token = auth_service.create_user_token(user)
-    return Token(access_token=token)
+async def login_usuario(
+    form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)
+) -> Token:
+    user = await auth_service.authenticate_user(db, form_data.username, form_data.password)
+    return _tokens(user)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_token(refresh_in: RefreshRequest, db: AsyncSession = Depends(get_async_db)) -> Token:
+    user = await auth_service.authenticate_refresh_token(db, refresh_in.refresh_token)
+    return _tokens(user)
 
 
 @router.get("/me", response_model=UserRead)
-def read_current_user(current_user: User = Depends(get_current_active_user)) -> User:
+async def read_current_user(current_user: CurrentUser = Depends(get_current_active_user)) -> CurrentUser:
     return current_user
+
+
+@router.put("/users/{user_id}", response_model=UserRead)
+async def update_user(
+    user_id: int,
+    user_in: UserUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    _: CurrentUser = Depends(get_admin_user),
+) -> User:
+    user = await auth_service.get_user_or_404(db, user_id)
+    return await auth_service.update_user(db, user, user_in)
+
+
+def _tokens(user: User) -> Token:
+    return Token(
+        access_token=auth_service.create_user_token(user),
+        refresh_token=auth_service.create_user_refresh_token(user),
+    )
@@ -1,55 +1,62 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_active_user, get_db
-from app.models.user import User
+from app.api.deps import get_async_db, get_current_active_user, get_read_db
 from app.schemas.cliente import ClienteCreate, ClienteRead, ClienteUpdate
+from app.schemas.pagination import Page
+from app.schemas.user import CurrentUser
 from app.services import cliente_service
+from app.services.pagination import DEFAULT_LIMIT, MAX_LIMIT
 
 router = APIRouter()
 
 
-@router.get("/", response_model=list[ClienteRead])
-def listar_clientes(search: str | None = Query(None, description="Buscar por nombre o email"), db: Session = Depends(get_db)) -> list[ClienteRead]:
-    clientes = cliente_service.list_clientes(db, search=search)
-    return [ClienteRead.model_validate(cliente) for cliente in clientes]
+@router.get("/", response_model=Page[ClienteRead])
+async def listar_clientes(
+    search: str | None = Query(None, description="Buscar por nombre o email"),
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_read_db),
+) -> Page[ClienteRead]:
+    clientes, next_cursor = await db.run_sync(cliente_service.list_clientes, search=search, cursor=cursor, limit=limit)
+    return Page(items=[ClienteRead.model_validate(cliente) for cliente in clientes], next_cursor=next_cursor)
 
 
 @router.get("/{cliente_id}", response_model=ClienteRead)
-def obtener_cliente(cliente_id: int, db: Session = Depends(get_db)) -> ClienteRead:
-    cliente = cliente_service.get_cliente_or_404(db, cliente_id)
+async def obtener_cliente(cliente_id: int, db: AsyncSession = Depends(get_read_db)) -> ClienteRead:
+    cliente = await db.run_sync(cliente_service.get_cliente_or_404, cliente_id)
     return ClienteRead.model_validate(cliente)
 
 
 @router.post("/", response_model=ClienteRead, status_code=201)
-def crear_cliente(
+async def crear_cliente(
     cliente_in: ClienteCreate,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: CurrentUser = Depends(get_current_active_user),
 ) -> ClienteRead:
-    cliente = cliente_service.create_cliente(db, cliente_in)
+    cliente = await db.run_sync(cliente_service.create_cliente, cliente_in)
     return ClienteRead.model_validate(cliente)
 
 
 @router.put("/{cliente_id}", response_model=ClienteRead)
-def actualizar_cliente(
+async def actualizar_cliente(
     cliente_id: int,
     cliente_in: ClienteUpdate,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: CurrentUser = Depends(get_current_active_user),
 ) -> ClienteRead:
-    cliente = cliente_service.get_cliente_or_404(db, cliente_id)
-    cliente = cliente_service.update_cliente(db, cliente, cliente_in)
+    cliente = await db.run_sync(cliente_service.get_cliente_or_404, cliente_id)
+    cliente = await db.run_sync(cliente_service.update_cliente, cliente, cliente_in)
     return ClienteRead.model_validate(cliente)
 
 
 @router.delete("/{cliente_id}", status_code=204)
-def eliminar_cliente(
+async def eliminar_cliente(
     cliente_id: int,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: CurrentUser = Depends(get_current_active_user),
 ) -> None:
-    cliente = cliente_service.get_cliente_or_404(db, cliente_id)
-    cliente_service.delete_cliente(db, cliente)
+    cliente = await db.run_sync(cliente_service.get_cliente_or_404, cliente_id)
+    await db.run_sync(cliente_service.delete_cliente, cliente)
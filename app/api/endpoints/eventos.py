@@ -3,72 +3,83 @@ from __future__ import annotations
 from datetime import date
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-
-from app.api.deps import get_current_active_user, get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import (
+    get_async_db,
+    get_current_active_user,
+    get_read_db,
+    presupuesto_consultas,
+)
 from app.models.evento import Evento
-from app.models.user import User
 from app.schemas.evento import EventoCreate, EventoRead, EventoUpdate
+from app.schemas.pagination import Page
+from app.schemas.user import CurrentUser
 from app.services import evento_service
+from app.services.pagination import DEFAULT_LIMIT, MAX_LIMIT
 
 router = APIRouter()
 
 
-@router.get("/", response_model=list[EventoRead])
-def listar_eventos(
+@router.get("/", response_model=Page[EventoRead], dependencies=[Depends(presupuesto_consultas(2))])
+async def listar_eventos(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     estado: str | None = None,
     cliente_id: int | None = None,
     fecha_desde: date | None = Query(None),
     fecha_hasta: date | None = Query(None),
-) -> list[EventoRead]:
-    eventos = evento_service.list_eventos(
-        db,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+) -> Page[EventoRead]:
+    eventos, next_cursor = await db.run_sync(
+        evento_service.list_eventos,
         estado=estado,
         cliente_id=cliente_id,
         fecha_desde=fecha_desde,
         fecha_hasta=fecha_hasta,
+        cursor=cursor,
+        limit=limit,
     )
-    return [_to_read(evento) for evento in eventos]
+    return Page(items=[_to_read(evento) for evento in eventos], next_cursor=next_cursor)
 
 
-@router.get("/{evento_id}", response_model=EventoRead)
-def obtener_evento(evento_id: int, db: Session = Depends(get_db)) -> EventoRead:
-    evento = evento_service.get_evento_or_404(db, evento_id)
+@router.get("/{evento_id}", response_model=EventoRead, dependencies=[Depends(presupuesto_consultas(2))])
+async def obtener_evento(evento_id: int, db: AsyncSession = Depends(get_read_db)) -> EventoRead:
+    evento = await db.run_sync(evento_service.get_evento_or_404, evento_id)
     return _to_read(evento)
 
 
 @router.post("/", response_model=EventoRead, status_code=201)
-def crear_evento(
+async def crear_evento(
     evento_in: EventoCreate,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: CurrentUser = Depends(get_current_active_user),
 ) -> EventoRead:
-    evento = evento_service.create_evento(db, evento_in)
+    evento = await db.run_sync(evento_service.create_evento, evento_in)
     return _to_read(evento)
 
 
 @router.put("/{evento_id}", response_model=EventoRead)
-def actualizar_evento(
+async def actualizar_evento(
     evento_id: int,
     evento_in: EventoUpdate,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: CurrentUser = Depends(get_current_active_user),
 ) -> EventoRead:
-    evento = evento_service.get_evento_or_404(db, evento_id)
-    evento = evento_service.update_evento(db, evento, evento_in)
+    evento = await db.run_sync(evento_service.get_evento_or_404, evento_id)
+    evento = await db.run_sync(evento_service.update_evento, evento, evento_in)
     return _to_read(evento)
 
 
 @router.delete("/{evento_id}", status_code=204)
-def eliminar_evento(
+async def eliminar_evento(
     evento_id: int,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: CurrentUser = Depends(get_current_active_user),
 ) -> None:
-    evento = evento_service.get_evento_or_404(db, evento_id)
-    evento_service.delete_evento(db, evento)
+    evento = await db.run_sync(evento_service.get_evento_or_404, evento_id)
+    await db.run_sync(evento_service.delete_evento, evento)
 
 
 def _to_read(evento: Evento) -> EventoRead:
@@ -3,48 +3,106 @@ from __future__ import annotations
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_active_user, get_db
-from app.models.user import User
-from app.schemas.movimiento import MovimientoCreate, MovimientoRead
+from app.api.deps import (
+    get_async_db,
+    get_current_active_user,
+    get_read_db,
+    leer_de_replica,
+    presupuesto_consultas,
+)
+from app.api.respuestas import ORJSONResponse, respuesta_pagina
+from app.schemas.movimiento import (
+    MovimientoCreate,
+    MovimientoLoteCreate,
+    MovimientoRead,
+)
+from app.schemas.pagination import Page
+from app.schemas.user import CurrentUser
 from app.services import movimiento_service
+from app.services.exportacion import respuesta_exportacion
+from app.services.pagination import DEFAULT_LIMIT, MAX_LIMIT
 
 router = APIRouter()
 
 
-@router.get("/", response_model=list[MovimientoRead])
-def listar_movimientos(
+@router.get(
+    "/",
+    response_model=Page[MovimientoRead],
+    response_class=ORJSONResponse,
+    dependencies=[Depends(presupuesto_consultas(2))],
+)
+async def listar_movimientos(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     fecha_desde: datetime | None = Query(None),
     fecha_hasta: datetime | None = Query(None),
     tipo: str | None = None,
     producto_id: int | None = None,
     deposito_id: int | None = None,
-) -> list[MovimientoRead]:
-    movimientos = movimiento_service.list_movimientos(
-        db,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+) -> ORJSONResponse:
+    filas, next_cursor = await db.run_sync(
+        movimiento_service.list_movimientos,
         fecha_desde=fecha_desde,
         fecha_hasta=fecha_hasta,
         tipo=tipo,
         producto_id=producto_id,
         deposito_id=deposito_id,
+        cursor=cursor,
+        limit=limit,
     )
-    return [MovimientoRead.model_validate(movimiento) for movimiento in movimientos]
+    return respuesta_pagina(MovimientoRead, filas, next_cursor)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def exportar_movimientos(
+    *,
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    fecha_desde: datetime | None = Query(None),
+    fecha_hasta: datetime | None = Query(None),
+    tipo: str | None = None,
+    producto_id: int | None = None,
+    deposito_id: int | None = None,
+    _: CurrentUser = Depends(get_current_active_user),
+    replica: bool = Depends(leer_de_replica),
+) -> StreamingResponse:
+    consulta = movimiento_service.consulta_exportacion(
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta,
+        tipo=tipo,
+        producto_id=producto_id,
+        deposito_id=deposito_id,
+    )
+    return respuesta_exportacion(consulta, formato, "movimientos", replica=replica)
 
 
 @router.get("/{movimiento_id}", response_model=MovimientoRead)
-def obtener_movimiento(movimiento_id: int, db: Session = Depends(get_db)) -> MovimientoRead:
-    movimiento = movimiento_service.get_movimiento_or_404(db, movimiento_id)
+async def obtener_movimiento(movimiento_id: int, db: AsyncSession = Depends(get_read_db)) -> MovimientoRead:
+    movimiento = await db.run_sync(movimiento_service.get_movimiento_or_404, movimiento_id)
     return MovimientoRead.model_validate(movimiento)
 
 
 @router.post("/", response_model=MovimientoRead, status_code=201)
-def crear_movimiento(
+async def crear_movimiento(
     movimiento_in: MovimientoCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
 ) -> MovimientoRead:
-    movimiento = movimiento_service.create_movimiento(db, movimiento_in, usuario_id=current_user.id)
+    movimiento = await db.run_sync(movimiento_service.create_movimiento, movimiento_in, usuario_id=current_user.id)
     return MovimientoRead.model_validate(movimiento)
+
+
+@router.post("/lote", response_model=list[MovimientoRead], status_code=201)
+async def crear_movimientos_lote(
+    lote_in: MovimientoLoteCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
+) -> list[MovimientoRead]:
+    movimientos = await db.run_sync(
+        movimiento_service.create_movimientos_bulk, lote_in.movimientos, usuario_id=current_user.id
+    )
+    return [MovimientoRead.model_validate(movimiento) for movimiento in movimientos]
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse
+
+from app.api.deps import get_admin_user
+from app.schemas.perfil import PerfilRead
+from app.schemas.user import CurrentUser
+from app.services import perfiles_service
+
+router = APIRouter()
+
+
+@router.get("/", response_model=list[PerfilRead])
+async def listar_perfiles(_: CurrentUser = Depends(get_admin_user)) -> list[PerfilRead]:
+    return [PerfilRead(**datos) for datos in await run_in_threadpool(perfiles_service.listar_perfiles)]
+
+
+@router.get("/{perfil_id}")
+async def descargar_perfil(
+    perfil_id: str,
+    formato: str = Query("speedscope", pattern="^(speedscope|html)$"),
+    _: CurrentUser = Depends(get_admin_user),
+) -> Response:
+    contenido = await run_in_threadpool(perfiles_service.renderizar, perfil_id, formato)
+    if formato == "html":
+        return HTMLResponse(contenido)
+    return Response(
+        contenido,
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="perfil-{perfil_id}.speedscope.json"'},
+    )
@@ -1,82 +1,180 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-
-from app.api.deps import get_current_active_user, get_db
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, File, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import (
+    get_async_db,
+    get_current_active_user,
+    get_read_db,
+    leer_de_replica,
+    presupuesto_consultas,
+)
+from app.api.respuestas import ORJSONResponse, respuesta_pagina
 from app.models.producto import Producto
-from app.models.user import User
-from app.schemas.producto import ProductoCreate, ProductoRead, ProductoUpdate
-from app.services import producto_service
+from app.schemas.pagination import Page
+from app.schemas.producto import (
+    ImportacionProductosRead,
+    ProductoAutocomplete,
+    ProductoCreate,
+    ProductoRead,
+    ProductoUpdate,
+    StockHistoricoRead,
+)
+from app.schemas.user import CurrentUser
+from app.services import importacion_service, producto_service, stock_historico_service
+from app.services.exportacion import respuesta_exportacion
+from app.services.pagination import DEFAULT_LIMIT, MAX_LIMIT
 
 router = APIRouter()
 
 
-@router.get("/", response_model=list[ProductoRead])
-def listar_productos(
+@router.get(
+    "/",
+    response_model=Page[ProductoRead],
+    response_class=ORJSONResponse,
+    dependencies=[Depends(presupuesto_consultas(2))],
+)
+async def listar_productos(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     search: str | None = Query(None, description="Buscar por nombre o código"),
     categoria: str | None = None,
     tipo_vajilla: str | None = None,
     deposito_principal_id: int | None = None,
     stock_bajo: bool | None = Query(None, description="Solo stock bajo"),
     activo: bool | None = None,
-) -> list[ProductoRead]:
-    productos = producto_service.list_productos(
-        db,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+) -> ORJSONResponse:
+    filas, next_cursor = await db.run_sync(
+        producto_service.list_productos,
         search=search,
         categoria=categoria,
         tipo_vajilla=tipo_vajilla,
         deposito_principal_id=deposito_principal_id,
         stock_bajo=stock_bajo,
         activo=activo,
+        cursor=cursor,
+        limit=limit,
     )
-    return [_to_read(prod) for prod in productos]
+    return respuesta_pagina(ProductoRead, filas, next_cursor)
+
+
+@router.get(
+    "/autocomplete", response_model=list[ProductoAutocomplete], dependencies=[Depends(presupuesto_consultas(2))]
+)
+async def autocompletar_productos(
+    q: str = Query(..., min_length=2, description="Texto parcial de nombre o código"),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db),
+) -> list[ProductoAutocomplete]:
+    filas = await db.run_sync(producto_service.autocomplete_productos, q, limit=limit)
+    return [ProductoAutocomplete.model_validate(fila) for fila in filas]
 
 
-@router.get("/con-stock-bajo", response_model=list[ProductoRead])
-def productos_con_stock_bajo(db: Session = Depends(get_db)) -> list[ProductoRead]:
-    productos = producto_service.get_low_stock(db)
+@router.get("/export", response_class=StreamingResponse)
+async def exportar_productos(
+    *,
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    categoria: str | None = None,
+    tipo_vajilla: str | None = None,
+    deposito_principal_id: int | None = None,
+    stock_bajo: bool | None = None,
+    activo: bool | None = None,
+    _: CurrentUser = Depends(get_current_active_user),
+    replica: bool = Depends(leer_de_replica),
+) -> StreamingResponse:
+    consulta = producto_service.consulta_exportacion(
+        categoria=categoria,
+        tipo_vajilla=tipo_vajilla,
+        deposito_principal_id=deposito_principal_id,
+        stock_bajo=stock_bajo,
+        activo=activo,
+    )
+    return respuesta_exportacion(consulta, formato, "productos", replica=replica)
+
+
+@router.get("/con-stock-bajo", response_model=list[ProductoRead], dependencies=[Depends(presupuesto_consultas(2))])
+async def productos_con_stock_bajo(db: AsyncSession = Depends(get_read_db)) -> list[ProductoRead]:
+    productos = await db.run_sync(producto_service.get_low_stock)
     return [_to_read(prod) for prod in productos]
 
 
-@router.get("/{producto_id}", response_model=ProductoRead)
-def obtener_producto(producto_id: int, db: Session = Depends(get_db)) -> ProductoRead:
-    producto = producto_service.get_producto_or_404(db, producto_id)
+@router.get("/stock-historico", response_model=Page[StockHistoricoRead])
+async def stock_historico_catalogo(
+    fecha: datetime = Query(..., description="Instante a reconstruir"),
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_read_db),
+) -> Page[StockHistoricoRead]:
+    filas, next_cursor = await db.run_sync(stock_historico_service.stock_a_fecha, fecha, cursor=cursor, limit=limit)
+    return Page(items=[StockHistoricoRead.model_validate(fila) for fila in filas], next_cursor=next_cursor)
+
+
+@router.get("/{producto_id}/stock-historico", response_model=StockHistoricoRead)
+async def stock_historico_producto(
+    producto_id: int,
+    fecha: datetime = Query(..., description="Instante a reconstruir"),
+    db: AsyncSession = Depends(get_read_db),
+) -> StockHistoricoRead:
+    fila = await db.run_sync(stock_historico_service.stock_producto_a_fecha, producto_id, fecha)
+    return StockHistoricoRead.model_validate(fila)
+
+
+@router.get("/{producto_id}", response_model=ProductoRead, dependencies=[Depends(presupuesto_consultas(2))])
+async def obtener_producto(producto_id: int, db: AsyncSession = Depends(get_read_db)) -> ProductoRead:
+    producto = await db.run_sync(producto_service.get_producto_or_404, producto_id)
     return _to_read(producto)
 
 
 @router.post("/", response_model=ProductoRead, status_code=201)
-def crear_producto(
+async def crear_producto(
     producto_in: ProductoCreate,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: CurrentUser = Depends(get_current_active_user),
 ) -> ProductoRead:
-    producto = producto_service.create_producto(db, producto_in)
+    producto = await db.run_sync(producto_service.create_producto, producto_in)
     return _to_read(producto)
 
 
+@router.post("/importar", response_model=ImportacionProductosRead)
+async def importar_productos(
+    archivo: UploadFile = File(..., description="CSV o XLSX con una fila por producto y encabezado"),
+    current_user: CurrentUser = Depends(get_current_active_user),
+) -> ImportacionProductosRead:
+    contenido = await archivo.read()
+    # COPY necesita la conexión síncrona: la importación corre en un hilo con su propia sesión.
+    resumen = await run_in_threadpool(
+        importacion_service.importar_archivo, archivo.filename or "", contenido, usuario_id=current_user.id
+    )
+    return ImportacionProductosRead.model_validate(resumen)
+
+
 @router.put("/{producto_id}", response_model=ProductoRead)
-def actualizar_producto(
+async def actualizar_producto(
     producto_id: int,
     producto_in: ProductoUpdate,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: CurrentUser = Depends(get_current_active_user),
 ) -> ProductoRead:
-    producto = producto_service.get_producto_or_404(db, producto_id)
-    producto = producto_service.update_producto(db, producto, producto_in)
+    producto = await db.run_sync(producto_service.get_producto_or_404, producto_id)
+    producto = await db.run_sync(producto_service.update_producto, producto, producto_in)
     return _to_read(producto)
 
 
 @router.delete("/{producto_id}", response_model=ProductoRead)
-def eliminar_producto(
+async def eliminar_producto(
     producto_id: int,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: CurrentUser = Depends(get_current_active_user),
 ) -> ProductoRead:
-    producto = producto_service.get_producto_or_404(db, producto_id)
-    producto = producto_service.soft_delete_producto(db, producto)
+    producto = await db.run_sync(producto_service.get_producto_or_404, producto_id)
+    producto = await db.run_sync(producto_service.soft_delete_producto, producto)
     return _to_read(producto)
 
 
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_active_user, get_read_db
+from app.schemas.reporte import MovimientoReporteRead
+from app.schemas.user import CurrentUser
+from app.services import reportes_service
+
+router = APIRouter()
+
+
+@router.get("/movimientos", response_model=list[MovimientoReporteRead])
+async def reporte_movimientos(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    desde: date | None = Query(None, description="Por defecto, 30 días antes de hasta"),
+    hasta: date | None = Query(None, description="Por defecto, hoy"),
+    intervalo: str = Query("dia", description="dia, semana, mes, trimestre o anio"),
+    dias: int | None = Query(None, ge=1, le=366, description="Períodos fijos de N días desde `desde`"),
+    agrupar: list[str] = Query(["tipo"], description="Series: producto, deposito y/o tipo"),
+    producto_id: int | None = None,
+    deposito_id: int | None = None,
+    tipo: str | None = None,
+    _: CurrentUser = Depends(get_current_active_user),
+) -> list[MovimientoReporteRead]:
+    hasta = hasta or date.today()
+    filas = await db.run_sync(
+        reportes_service.reporte_movimientos,
+        desde=desde or hasta - timedelta(days=29),
+        hasta=hasta,
+        intervalo=intervalo,
+        dias=dias,
+        agrupar=agrupar,
+        producto_id=producto_id,
+        deposito_id=deposito_id,
+        tipo=tipo,
+    )
+    return [MovimientoReporteRead.model_validate(fila._mapping) for fila in filas]
@@ -0,0 +1,34 @@
+"""Respuestas rápidas para listados grandes.
+
+Los listados que devuelven filas Core se validan una sola vez con un `TypeAdapter` cacheado por schema y se
+codifican con orjson. Como el endpoint devuelve la respuesta ya armada, FastAPI no vuelve a validar contra
+`response_model`, que queda solo para la documentación.
+"""
+from __future__ import annotations
+
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import Row
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+def respuesta_pagina(schema: type[BaseModel], filas: Sequence[Row], next_cursor: str | None) -> ORJSONResponse:
+    """Página `{"items": [...], "next_cursor": ...}` a partir de filas Core con las columnas de `schema`."""
+    adaptador = _adaptador(schema)
+    # Validar dicts es bastante más rápido que leer atributos de cada Row con from_attributes.
+    items = adaptador.dump_python(adaptador.validate_python([fila._asdict() for fila in filas]))
+    return ORJSONResponse({"items": items, "next_cursor": next_cursor})
+
+
+@lru_cache
+def _adaptador(schema: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[schema])
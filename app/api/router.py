@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
+from app.api.deps import perfilar_request
 from app.core.config import settings
 from app.api.endpoints import (
     agenda,
@@ -12,10 +13,15 @@ from app.api.endpoints import (
     depositos,
     eventos,
     movimientos,
+    perfiles,
     productos,
+    reportes,
 )
 
-api_router = APIRouter(prefix=settings.api_prefix)
+api_router = APIRouter(
+    prefix=settings.api_prefix,
+    dependencies=[Depends(perfilar_request)] if settings.profiling_enabled else [],
+)
 
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(productos.router, prefix="/productos", tags=["productos"])
@@ -26,3 +32,5 @@ api_router.include_router(alquileres.router, prefix="/alquileres", tags=["alquil
 api_router.include_router(movimientos.router, prefix="/movimientos", tags=["movimientos"])
 api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
 api_router.include_router(agenda.router, prefix="/agenda", tags=["agenda"])
+api_router.include_router(reportes.router, prefix="/reportes", tags=["reportes"])
+api_router.include_router(perfiles.router, prefix="/perfiles", tags=["perfiles"])
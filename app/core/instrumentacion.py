@@ -0,0 +1,336 @@
+"""Métricas por request en formato Prometheus.
+
+`MetricasMiddleware` mide latencia y status por ruta (la plantilla, no el path concreto) y, con los eventos de
+SQLAlchemy que instala `registrar_engine`, cuántas sentencias SQL ejecutó cada request y cuánto tardaron. El conteo
+viaja en un contextvar, así que también cubre lo que corre dentro de `run_sync` o `run_in_threadpool`. El uso de los
+pools se lee de `pool_metrics` al momento del scrape.
+
+Una ruta puede fijar un presupuesto de consultas (`app.api.deps.presupuesto_consultas`). Lo controla
+`PresupuestoConsultasMiddleware`, que corre aunque las métricas estén desactivadas: si el request lo supera antes de
+enviar los headers lo registra en el log con las sentencias repetidas, típicas de un N+1, o lanza
+`PresupuestoConsultasExcedido` según `QUERY_BUDGET_MODE`, de modo que el cliente recibe un 500.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from collections import Counter as Conteo
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.db import pool_metrics
+
+logger = logging.getLogger(__name__)
+
+SIN_RUTA = "sin_ruta"
+_HEADERS_EXTRA = "instrumentacion.headers"
+
+DURACION = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de los requests HTTP por ruta.",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS = Counter("http_requests_total", "Requests HTTP por ruta y status.", ["method", "route", "status"])
+CONSULTAS = Histogram(
+    "http_request_sql_queries",
+    "Sentencias SQL ejecutadas por request.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+TIEMPO_SQL = Histogram(
+    "http_request_sql_seconds",
+    "Tiempo total en sentencias SQL por request.",
+    ["method", "route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+PRESUPUESTO_EXCEDIDO = Counter(
+    "http_request_query_budget_exceeded_total",
+    "Requests que ejecutaron más sentencias SQL que el presupuesto de su ruta.",
+    ["method", "route"],
+)
+
+# Listas de parámetros expandidas (IN, VALUES de varias filas) cuentan como la misma forma sin importar su largo.
+_LISTA_PARAMETROS = re.compile(r"%\(\w+\)s(?:::\w+)?(?:\s*,\s*%\(\w+\)s(?:::\w+)?)+")
+_FILAS_PARAMETROS = re.compile(r"\(%\(\.\.\.\)s\)(?:\s*,\s*\(%\(\.\.\.\)s\))+")
+_ESPACIOS = re.compile(r"\s+")
+
+
+class PresupuestoConsultasExcedido(RuntimeError):
+    pass
+
+
+@dataclass
+class ConsultasRequest:
+    cantidad: int = 0
+    segundos: float = 0.0
+    presupuesto: int | None = None
+    formas: Conteo = field(default_factory=Conteo)
+
+    def registrar(self, statement: str, segundos: float) -> None:
+        self.cantidad += 1
+        self.segundos += segundos
+        self.formas[statement] += 1
+
+    def repetidas(self, limite: int = 5) -> list[tuple[str, int]]:
+        """Formas de sentencia ejecutadas más de una vez, de la más repetida a la menos."""
+        formas: Conteo = Conteo()
+        for sentencia, veces in self.formas.items():
+            formas[_forma(sentencia)] += veces
+        return [(forma, veces) for forma, veces in formas.most_common(limite) if veces > 1]
+
+    def reporte(self) -> str:
+        lineas = [f"{self.cantidad} sentencias SQL ({self.segundos * 1000:.1f} ms)"]
+        lineas += [f"  {veces}x {forma}" for forma, veces in self.repetidas()]
+        return "\n".join(lineas)
+
+
+_consultas: ContextVar[ConsultasRequest | None] = ContextVar("consultas_request", default=None)
+# Contadores que miden todo lo que ejecutan los engines, sin importar el hilo ni el request (ver `observar_consultas`).
+_observadores: list[ConsultasRequest] = []
+_observadores_lock = threading.Lock()
+
+
+def consultas_actuales() -> ConsultasRequest | None:
+    """Contador de SQL del request en curso, o None fuera de un request."""
+    return _consultas.get()
+
+
+def registrar_engine(sync_engine: Engine) -> None:
+    """Cuenta en el request en curso cada sentencia que ejecuta el engine."""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is not None:
+            context._inicio_instrumentacion = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany) -> None:
+        consultas = _consultas.get()
+        if context is None or (consultas is None and not _observadores):
+            return
+        segundos = time.perf_counter() - getattr(context, "_inicio_instrumentacion", time.perf_counter())
+        if consultas is not None:
+            consultas.registrar(statement, segundos)
+        if _observadores:
+            with _observadores_lock:
+                for observador in _observadores:
+                    observador.registrar(statement, segundos)
+
+
+@contextmanager
+def observar_consultas() -> Iterator[ConsultasRequest]:
+    """Cuenta las sentencias de todos los engines mientras dure el bloque, p. ej. las de un TestClient."""
+    consultas = ConsultasRequest()
+    with _observadores_lock:
+        _observadores.append(consultas)
+    try:
+        yield consultas
+    finally:
+        with _observadores_lock:
+            _observadores.remove(consultas)
+
+
+def registrar_pools(pools: Callable[[], dict]) -> None:
+    """Publica en /metrics el estado de los pools que devuelve `pools()` como {nombre: pool}."""
+    REGISTRY.register(_PoolCollector(pools))
+
+
+def exposicion() -> tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def agregar_header(scope: Scope, nombre: str, valor: str) -> None:
+    """Header extra para la respuesta del request, también cuando el endpoint devuelve un `Response` armado.
+
+    Lo agrega `HeadersExtraMiddleware`, que se instala siempre.
+    """
+    scope.setdefault(_HEADERS_EXTRA, []).append((nombre.lower().encode("latin-1"), valor.encode("latin-1")))
+
+
+def ruta_plantilla(scope: Scope) -> str:
+    """Plantilla de la ruta que atendió el request (`/api/productos/{producto_id}`), o `sin_ruta`."""
+    # Starlette deja la ruta resuelta en el scope; versiones anteriores solo dejan el endpoint.
+    ruta = scope.get("route")
+    if ruta is None and "app" in scope:
+        ruta = next((r for r in scope["app"].router.routes if r.matches(scope)[0] == Match.FULL), None)
+    if ruta is None:
+        return SIN_RUTA
+    # Con routers anidados `ruta.path` es relativo al router: el prefijo es lo que queda del path concreto antes
+    # del sufijo que reconoce la ruta.
+    path = scope["path"]
+    for inicio in reversed([i for i, caracter in enumerate(path) if caracter == "/"]):
+        if ruta.path_regex.match(path[inicio:]):
+            return path[:inicio] + ruta.path
+    return ruta.path
+
+
+class MetricasMiddleware:
+    def __init__(self, app: ASGIApp, *, server_timing: bool = True, excluir: tuple[str, ...] = ("/metrics",)) -> None:
+        self.app = app
+        self.server_timing = server_timing
+        self.excluir = excluir
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.excluir:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        consultas = ConsultasRequest()
+        token = _consultas.set(consultas)
+        estado = 500
+
+        async def enviar(message: Message) -> None:
+            nonlocal estado
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+                if self.server_timing:
+                    # Lo que se haya ejecutado antes de los headers; en respuestas streaming el SQL posterior
+                    # solo llega a los histogramas.
+                    timing = (b"server-timing", _server_timing(inicio, consultas).encode("latin-1"))
+                    message = {**message, "headers": [*message.get("headers", []), timing]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _consultas.reset(token)
+            metodo = scope["method"]
+            ruta = ruta_plantilla(scope)
+            DURACION.labels(metodo, ruta).observe(time.perf_counter() - inicio)
+            REQUESTS.labels(metodo, ruta, str(estado)).inc()
+            CONSULTAS.labels(metodo, ruta).observe(consultas.cantidad)
+            TIEMPO_SQL.labels(metodo, ruta).observe(consultas.segundos)
+
+
+class HeadersExtraMiddleware:
+    """Suma a la respuesta los headers registrados con `agregar_header` durante el request."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(message: Message) -> None:
+            extra = scope.get(_HEADERS_EXTRA)
+            if message["type"] == "http.response.start" and extra:
+                message = {**message, "headers": [*message.get("headers", []), *extra]}
+            await send(message)
+
+        await self.app(scope, receive, enviar)
+
+
+class PresupuestoConsultasMiddleware:
+    """Controla el presupuesto de consultas de la ruta justo antes de enviar los headers de la respuesta."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Con `MetricasMiddleware` por fuera se comparte su contador.
+        consultas = _consultas.get()
+        token = None
+        if consultas is None:
+            consultas = ConsultasRequest()
+            token = _consultas.set(consultas)
+        excedido = False
+
+        async def enviar(message: Message) -> None:
+            nonlocal excedido
+            if message["type"] == "http.response.start" and _excede(consultas):
+                excedido = True
+                _presupuesto_excedido(scope, consultas, lanzar=True)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            if token is not None:
+                _consultas.reset(token)
+        if not excedido and _excede(consultas):
+            # SQL de una respuesta streaming: los headers ya salieron, así que solo queda registrarlo.
+            _presupuesto_excedido(scope, consultas, lanzar=False)
+
+
+class _PoolCollector(Collector):
+    # (clave de pool_metrics.resumen, métrica, tipo, descripción, escala)
+    METRICAS = (
+        ("checked_out", "db_pool_checked_out", GaugeMetricFamily, "Conexiones prestadas por el pool.", 1),
+        ("size", "db_pool_size", GaugeMetricFamily, "Tamaño configurado del pool.", 1),
+        ("overflow", "db_pool_overflow", GaugeMetricFamily, "Conexiones abiertas por encima de pool_size.", 1),
+        ("saturacion", "db_pool_saturation", GaugeMetricFamily, "Fracción de la capacidad total en uso.", 1),
+        ("checkouts", "db_pool_checkouts", CounterMetricFamily, "Checkouts desde el arranque.", 1),
+        ("timeouts", "db_pool_timeouts", CounterMetricFamily, "Checkouts que agotaron pool_timeout.", 1),
+        ("espera_max_ms", "db_pool_wait_max_seconds", GaugeMetricFamily, "Mayor espera de un checkout.", 0.001),
+    )
+
+    def __init__(self, pools: Callable[[], dict]) -> None:
+        self.pools = pools
+
+    def describe(self):
+        return [tipo(nombre, descripcion, labels=["pool"]) for _, nombre, tipo, descripcion, _ in self.METRICAS]
+
+    def collect(self):
+        familias = self.describe()
+        for nombre_pool, pool in self.pools().items():
+            datos = pool_metrics.resumen(pool)
+            for familia, (clave, *_, escala) in zip(familias, self.METRICAS):
+                if clave in datos:
+                    familia.add_metric([nombre_pool], datos[clave] * escala)
+        return familias
+
+
+def _excede(consultas: ConsultasRequest) -> bool:
+    return consultas.presupuesto is not None and consultas.cantidad > consultas.presupuesto
+
+
+def _presupuesto_excedido(scope: Scope, consultas: ConsultasRequest, *, lanzar: bool) -> None:
+    metodo = scope["method"]
+    ruta = ruta_plantilla(scope)
+    PRESUPUESTO_EXCEDIDO.labels(metodo, ruta).inc()
+    mensaje = f"{metodo} {ruta} superó su presupuesto de {consultas.presupuesto} consultas: {consultas.reporte()}"
+    if settings.query_budget_mode == "raise" and lanzar:
+        raise PresupuestoConsultasExcedido(mensaje)
+    if settings.query_budget_mode != "off":
+        logger.warning(mensaje)
+
+
+def _forma(statement: str) -> str:
+    forma = _LISTA_PARAMETROS.sub("%(...)s", _ESPACIOS.sub(" ", statement).strip())
+    forma = _FILAS_PARAMETROS.sub("(%(...)s), ...", forma)
+    return forma if len(forma) <= 200 else forma[:197] + "..."
+
+
+def _server_timing(inicio: float, consultas: ConsultasRequest) -> str:
+    total = (time.perf_counter() - inicio) * 1000
+    return (
+        f'db;dur={consultas.segundos * 1000:.2f};desc="SQL x{consultas.cantidad}", '
+        f"app;dur={total:.2f}"
+    )
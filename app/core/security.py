@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
@@ -11,8 +13,14 @@ from passlib.context import CryptContext
 from app.core.config import settings
 from app.schemas.auth import TokenData
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.api_prefix}/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.api_prefix}/auth/login", auto_error=False)
+
+# bcrypt es CPU intensivo: corre en un pool acotado propio para no agotar el threadpool que atiende al resto de la API.
+_hash_executor = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="password-hash")
+
+REFRESH_TOKEN_TYPE = "refresh"
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -23,6 +31,14 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, get_password_hash, password)
+
+
 def create_access_token(data: dict[str, Any], expires_delta: timedelta | None = None) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
@@ -31,7 +47,30 @@ def create_access_token(data: dict[str, Any], expires_delta: timedelta | None =
     return encoded_jwt
 
 
+def create_refresh_token(data: dict[str, Any]) -> str:
+    to_encode = {**data, "type": REFRESH_TOKEN_TYPE}
+    return create_access_token(to_encode, expires_delta=timedelta(days=settings.refresh_token_expire_days))
+
+
 def decode_token(token: str = Depends(oauth2_scheme)) -> TokenData:
+    return _decode(token, refresh=False)
+
+
+def user_id_from_token(token: str | None) -> int | None:
+    """Id de usuario de un access token opcional; None si no hay token o no es válido."""
+    if not token:
+        return None
+    try:
+        return _decode(token, refresh=False).user_id
+    except HTTPException:
+        return None
+
+
+def decode_refresh_token(token: str) -> TokenData:
+    return _decode(token, refresh=True)
+
+
+def _decode(token: str, *, refresh: bool) -> TokenData:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No autorizado",
@@ -40,8 +79,8 @@ def decode_token(token: str = Depends(oauth2_scheme)) -> TokenData:
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         email: str | None = payload.get("sub")
-        if email is None:
+        if email is None or (payload.get("type") == REFRESH_TOKEN_TYPE) != refresh:
             raise credentials_exception
-        return TokenData(email=email)
+        return TokenData(email=email, user_id=payload.get("uid"), rol=payload.get("rol"), version=payload.get("ver"))
     except JWTError as exc:  # pragma: no cover - defensive
         raise credentials_exception from exc
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from app.core.config import settings
+from app.schemas.user import CurrentUser
+
+
+class UserCache:
+    """Caché en proceso de usuarios autenticados con expiración corta.
+
+    La invalidación explícita solo alcanza al proceso actual; en otros workers la entrada vence con el TTL, y la
+    versión de token del JWT rechaza credenciales revocadas apenas se vuelve a leer el usuario.
+    """
+
+    def __init__(self, ttl_seconds: int) -> None:
+        self._ttl = ttl_seconds
+        self._entradas: dict[int, tuple[float, CurrentUser]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> CurrentUser | None:
+        with self._lock:
+            entrada = self._entradas.get(user_id)
+            if entrada is None:
+                return None
+            vence, usuario = entrada
+            if vence <= time.monotonic():
+                del self._entradas[user_id]
+                return None
+            return usuario
+
+    def set(self, usuario: CurrentUser) -> None:
+        if self._ttl <= 0:
+            return
+        with self._lock:
+            self._entradas[usuario.id] = (time.monotonic() + self._ttl, usuario)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entradas.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+
+user_cache = UserCache(settings.user_cache_ttl_seconds)
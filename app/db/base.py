@@ -8,4 +8,13 @@ class Base(DeclarativeBase):
 
 
 # Import models so Alembic can discover them
-from app.models import alquiler, cliente, deposito, evento, movimiento, producto, user  # noqa: E402,F401
+from app.models import (  # noqa: E402,F401
+    alquiler,
+    cliente,
+    deposito,
+    evento,
+    metrica,
+    movimiento,
+    producto,
+    user,
+)
@@ -0,0 +1,208 @@
+"""Log de consultas lentas con su plan de ejecución.
+
+Con `SLOW_QUERY_MS` > 0 cada engine mide sus sentencias. Las que superan el umbral se registran en un archivo NDJSON
+rotativo (`SLOW_QUERY_LOG_PATH`). Cada registro incluye los parámetros, la función de la app que la disparó y el
+resultado de `EXPLAIN (ANALYZE, BUFFERS)` tomado en otra conexión. El EXPLAIN y la escritura corren en un hilo
+aparte, así que el request no espera.
+
+ANALYZE vuelve a ejecutar la sentencia: solo se usa con lecturas sin bloqueos, dentro de una transacción que se
+descarta y con `statement_timeout`. Para escrituras o `FOR UPDATE` el plan es el estimado (`EXPLAIN` sin ANALYZE).
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from datetime import UTC, datetime
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+try:
+    import greenlet
+except ImportError:  # sin soporte async de SQLAlchemy
+    greenlet = None
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine
+
+from app.core.config import settings
+
+_APP = str(Path(__file__).resolve().parents[1])
+# Capas de infraestructura: el llamador interesante es el servicio o endpoint que está por encima.
+_INFRAESTRUCTURA = tuple(str(Path(_APP, carpeta)) for carpeta in ("db", "core"))
+_EXPLICABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE|VALUES)\b", re.IGNORECASE)
+_SOLO_LECTURA = re.compile(r"^\s*(SELECT|WITH|VALUES)\b", re.IGNORECASE)
+# Escrituras, bloqueos y funciones cuyo efecto no se deshace con el rollback (secuencias, advisory locks).
+_CON_EFECTOS = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE)\b|\bFOR\s+(NO\s+KEY\s+)?(UPDATE|SHARE)\b"
+    r"|\b(nextval|setval|pg_advisory\w*|pg_notify|pg_terminate_backend|pg_cancel_backend)\s*\(",
+    re.IGNORECASE,
+)
+_MAX_ELEMENTOS = 20
+
+_pendientes: queue.Queue[dict] = queue.Queue(maxsize=100)
+_hilo: threading.Thread | None = None
+_hilo_lock = threading.Lock()
+_descartadas = 0
+
+
+def registrar_engine(sync_engine: Engine) -> None:
+    """Mide las sentencias del engine y encola las que superan `SLOW_QUERY_MS`."""
+    umbral = settings.slow_query_ms / 1000
+    url = sync_engine.url
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is not None:
+            context._inicio_consulta_lenta = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany) -> None:
+        inicio = getattr(context, "_inicio_consulta_lenta", None)
+        if inicio is None:
+            return
+        duracion = time.perf_counter() - inicio
+        if duracion < umbral:
+            return
+        _encolar(
+            {
+                "fecha": datetime.now(UTC).isoformat(),
+                "duracion_ms": round(duracion * 1000, 3),
+                "umbral_ms": settings.slow_query_ms,
+                "base": url.render_as_string(hide_password=True),
+                "llamador": _llamador(),
+                "sentencia": statement,
+                "parametros": _serializable(parameters),
+                "executemany": executemany,
+                "_parametros": parameters,
+                "_url": url,
+            }
+        )
+
+
+def _encolar(registro: dict) -> None:
+    global _descartadas
+    _iniciar_hilo()
+    try:
+        _pendientes.put_nowait(registro)
+    except queue.Full:
+        # Preferimos perder registros a frenar requests cuando hay una ráfaga de consultas lentas.
+        _descartadas += 1
+
+
+def _iniciar_hilo() -> None:
+    global _hilo
+    if _hilo is not None and _hilo.is_alive():
+        return
+    with _hilo_lock:
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(target=_procesar, name="consultas-lentas", daemon=True)
+            _hilo.start()
+
+
+def _procesar() -> None:
+    global _descartadas
+    log = _log()
+    while True:
+        registro = _pendientes.get()
+        parametros = registro.pop("_parametros")
+        url = registro.pop("_url")
+        if settings.slow_query_explain and not registro["executemany"] and _EXPLICABLE.match(registro["sentencia"]):
+            try:
+                registro["analyze"], registro["plan"] = _explicar(url, registro["sentencia"], parametros)
+            except Exception as exc:  # noqa: BLE001 - el log no debe detenerse por un plan que falla
+                registro["plan_error"] = f"{type(exc).__name__}: {exc}"
+        if _descartadas:
+            registro["descartadas_previas"], _descartadas = _descartadas, 0
+        log.info(json.dumps(registro, ensure_ascii=False, default=str))
+
+
+def _explicar(url: URL, sentencia: str, parametros) -> tuple[bool, object]:
+    analyze = bool(_SOLO_LECTURA.match(sentencia)) and not _CON_EFECTOS.search(sentencia)
+    opciones = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    timeout = max(settings.slow_query_ms * 10, 5000)
+    conexion = _engine_explain(url).raw_connection()
+    try:
+        cursor = conexion.cursor()
+        cursor.execute(f"SET LOCAL statement_timeout = {int(timeout)}")
+        # Siempre con parámetros (aunque vacíos) para que psycopg interprete los `%%` que escapa SQLAlchemy.
+        cursor.execute(f"EXPLAIN ({opciones}) {sentencia}", parametros if parametros is not None else {})
+        plan = cursor.fetchone()[0]
+    finally:
+        conexion.rollback()
+        conexion.close()
+    return analyze, plan[0] if isinstance(plan, list) else plan
+
+
+@lru_cache
+def _engine_explain(url: URL) -> Engine:
+    # Engine síncrono propio: la conexión de un engine async no se puede usar desde este hilo.
+    return create_engine(url, pool_size=1, max_overflow=0, pool_pre_ping=True)
+
+
+@lru_cache(maxsize=1)
+def _log() -> logging.Logger:
+    ruta = Path(settings.slow_query_log_path)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    handler = RotatingFileHandler(
+        ruta,
+        maxBytes=settings.slow_query_log_max_bytes,
+        backupCount=settings.slow_query_log_backups,
+        encoding="utf-8",
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log = logging.getLogger(__name__)
+    log.setLevel(logging.INFO)
+    log.addHandler(handler)
+    log.propagate = False
+    return log
+
+
+def _llamador() -> dict | None:
+    """Primera función de la app por encima de SQLAlchemy, salteando db/ y core/ si hay algo más arriba."""
+    primero = None
+    actual = greenlet.getcurrent() if greenlet is not None else None
+    for frame in _pila(sys._getframe(2), actual):
+        archivo = frame.f_code.co_filename
+        if archivo.startswith(_APP):
+            datos = {
+                "archivo": os.path.relpath(archivo, os.path.dirname(_APP)),
+                "funcion": frame.f_code.co_name,
+                "linea": frame.f_lineno,
+            }
+            if not archivo.startswith(_INFRAESTRUCTURA):
+                return datos
+            primero = primero or datos
+    return primero
+
+
+def _pila(frame, actual):
+    """Frames de `frame` hacia arriba y luego los de los greenlets padres de `actual`, del más cercano al raíz."""
+    while True:
+        while frame is not None:
+            yield frame
+            frame = frame.f_back
+        # Desde una sesión async la sentencia corre en un greenlet hijo; la corrutina que la esperó está en el padre.
+        actual = getattr(actual, "parent", None)
+        if actual is None:
+            return
+        frame = actual.gr_frame
+
+
+def _serializable(parametros):
+    if isinstance(parametros, dict):
+        return {clave: _serializable(valor) for clave, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        valores = [_serializable(valor) for valor in parametros[:_MAX_ELEMENTOS]]
+        if len(parametros) > _MAX_ELEMENTOS:
+            valores.append(f"... ({len(parametros)} en total)")
+        return valores
+    if parametros is None or isinstance(parametros, (bool, int, float, str)):
+        return parametros
+    return str(parametros)
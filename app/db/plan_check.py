@@ -0,0 +1,256 @@
+"""Chequeo de regresiones de planes: ninguna consulta de los servicios debe recorrer secuencialmente tablas grandes.
+
+Carga un dataset sintético dentro de una transacción que se descarta al final, ejecuta las funciones de
+`app/services` capturando cada sentencia SQL y corre `EXPLAIN (FORMAT JSON)` sobre ellas. Termina con código 1
+si alguna consulta sigue leyendo entera una tabla vigilada aun con `enable_seqscan` apagado, es decir, si no
+tiene un índice aplicable. Los Seq Scan que el planner elige por costo con este volumen se informan como aviso.
+
+    python -m app.db.plan_check --productos 20000
+
+Las agregaciones que por diseño recorren una tabla completa (conteos por depósito, reconciliación de métricas)
+quedan fuera del chequeo.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from collections.abc import Callable
+from datetime import UTC, date, datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.db.session import engine
+from app.schemas.movimiento import MovimientoCreate
+from app.services import (
+    agenda_service,
+    alquiler_service,
+    cliente_service,
+    dashboard_service,
+    disponibilidad_service,
+    evento_service,
+    movimiento_service,
+    producto_service,
+    reportes_service,
+    stock_historico_service,
+)
+
+TABLAS_VIGILADAS = (
+    "productos",
+    "clientes",
+    "eventos",
+    "alquileres",
+    "alquiler_items",
+    "movimientos_stock",
+    "stock_snapshots",
+    "movimientos_diarios",
+)
+
+_SEED_SQL = """
+SELECT setseed(0.42);
+INSERT INTO depositos (nombre) SELECT 'Depósito plan ' || g FROM generate_series(1, 3) g;
+INSERT INTO productos (
+    nombre, codigo, unidad_medida, tipo_vajilla, material, estado_fisico,
+    stock_actual, stock_minimo, stock_rentado, stock_disponible, deposito_principal_id
+)
+SELECT
+    'Producto plan ' || g, 'PLAN-' || g, 'pieza', 'Plato', 'Loza',
+    CASE WHEN g % 500 = 0 THEN 'Dañado' ELSE 'Excelente' END,
+    100, 10, 0, CASE WHEN g % 200 = 0 THEN 5 ELSE 100 END,
+    (SELECT max(id) FROM depositos)
+FROM generate_series(1, :productos) g;
+INSERT INTO clientes (nombre, apellido, email)
+SELECT 'Cliente plan ' || g, 'Apellido ' || g, 'plan' || g || '@example.com' FROM generate_series(1, :productos / 4) g;
+INSERT INTO eventos (nombre, fecha_evento, cliente_id, estado)
+SELECT 'Evento plan ' || g, current_date + (random() * 1460 - 1095)::int, c.ids[1 + g % cardinality(c.ids)], 'Pendiente'
+FROM generate_series(1, :productos) g, (SELECT array_agg(id) AS ids FROM clientes WHERE nombre LIKE 'Cliente plan %') c;
+INSERT INTO alquileres (codigo, cliente_id, evento_id, fecha_desde, fecha_hasta, estado)
+SELECT 'PLAN-ALQ-' || g, e.cliente_id, e.id, e.fecha_evento - 1, e.fecha_evento + 2,
+       (ARRAY['Finalizado', 'Finalizado', 'Finalizado', 'Finalizado', 'Finalizado', 'Finalizado',
+              'Finalizado', 'Borrador', 'Confirmado', 'En curso'])[1 + g % 10]
+FROM (SELECT e.*, row_number() OVER (ORDER BY e.id) AS g FROM eventos e WHERE e.nombre LIKE 'Evento plan %') e;
+INSERT INTO alquiler_items (alquiler_id, producto_id, cantidad)
+SELECT a.id, p.ids[1 + (a.id * 7 + k * 13) % cardinality(p.ids)], 1 + k
+FROM alquileres a CROSS JOIN generate_series(0, 2) k, (SELECT array_agg(id) AS ids FROM productos) p
+WHERE a.codigo LIKE 'PLAN-ALQ-%';
+INSERT INTO movimientos_stock (producto_id, fecha, tipo, cantidad)
+SELECT p.ids[1 + g % cardinality(p.ids)], now() - random() * interval '1095 days', 'INGRESO', 1
+FROM generate_series(1, :productos * 10) g, (SELECT array_agg(id) AS ids FROM productos) p;
+INSERT INTO stock_snapshots (producto_id, fecha, stock_actual, stock_rentado)
+SELECT p.id, now() - d * interval '1 day', 100, 0 FROM productos p CROSS JOIN generate_series(1, 60, 7) d;
+INSERT INTO movimientos_diarios (dia, producto_id, deposito_id, tipo, cantidad, movimientos)
+SELECT (fecha AT TIME ZONE 'UTC')::date, producto_id, 0, tipo, sum(cantidad), count(*)
+FROM movimientos_stock GROUP BY 1, 2, 4
+ON CONFLICT DO NOTHING;
+ANALYZE depositos, productos, clientes, eventos, alquileres, alquiler_items, movimientos_stock, stock_snapshots,
+    movimientos_diarios;
+"""
+
+
+def _consultas(db: Session) -> dict[str, Callable[[Session], object]]:
+    producto_id = db.execute(text("SELECT max(id) FROM productos")).scalar_one()
+    cliente_id = db.execute(text("SELECT max(cliente_id) FROM alquileres")).scalar_one()
+    alquiler_id = db.execute(text("SELECT max(id) FROM alquileres")).scalar_one()
+    evento_id = db.execute(text("SELECT max(evento_id) FROM alquileres")).scalar_one()
+    ahora = datetime.now(UTC)
+    return {
+        "productos.list": lambda db: producto_service.list_productos(db),
+        "productos.list stock_bajo": lambda db: producto_service.list_productos(db, stock_bajo=True),
+        "productos.get": lambda db: producto_service.get_producto_or_404(db, producto_id),
+        "productos.stock_bajo": producto_service.get_low_stock,
+        "clientes.list": lambda db: cliente_service.list_clientes(db),
+        "clientes.delete con alquileres": lambda db: cliente_service.delete_cliente(
+            db, cliente_service.get_cliente_or_404(db, cliente_id)
+        ),
+        "eventos.list desde hoy": lambda db: evento_service.list_eventos(db, fecha_desde=date.today()),
+        "eventos.delete con alquileres": lambda db: evento_service.delete_evento(
+            db, evento_service.get_evento_or_404(db, evento_id)
+        ),
+        "alquileres.list": lambda db: alquiler_service.list_alquileres(db),
+        "alquileres.list estado": lambda db: alquiler_service.list_alquileres(db, estado="Confirmado"),
+        "alquileres.get": lambda db: alquiler_service.get_alquiler_or_404(db, alquiler_id),
+        "movimientos.list": lambda db: movimiento_service.list_movimientos(db),
+        "movimientos.list producto": lambda db: movimiento_service.list_movimientos(db, producto_id=producto_id),
+        "movimientos.create": lambda db: movimiento_service.create_movimiento(
+            db, MovimientoCreate(producto_id=producto_id, tipo="INGRESO", cantidad=1)
+        ),
+        "stock_historico.producto": lambda db: stock_historico_service.stock_producto_a_fecha(
+            db, producto_id, ahora - timedelta(days=20)
+        ),
+        "stock_historico.catalogo": lambda db: stock_historico_service.stock_a_fecha(db, ahora - timedelta(days=20)),
+        "reportes.movimientos": lambda db: reportes_service.reporte_movimientos(
+            db, desde=date.today() - timedelta(days=30), hasta=date.today()
+        ),
+        "reportes.movimientos producto": lambda db: reportes_service.reporte_movimientos(
+            db, desde=date.today() - timedelta(days=365), hasta=date.today(), intervalo="mes", producto_id=producto_id
+        ),
+        "disponibilidad": lambda db: disponibilidad_service.calcular_disponibilidad(
+            db, [producto_id], ahora, ahora + timedelta(days=3)
+        ),
+        "agenda.proximos_eventos": lambda db: agenda_service.proximos_eventos(db, dias=14),
+        "dashboard.resumen": dashboard_service.get_resumen,
+    }
+
+
+# Nodos que consumen toda su entrada: debajo de ellos un LIMIT ya no corta el recorrido del índice.
+_NODOS_BLOQUEANTES = {"Sort", "Incremental Sort", "Aggregate", "Hash", "Materialize", "Unique", "SetOp", "WindowAgg"}
+
+
+def _es_vigilada(relacion: str) -> bool:
+    return any(relacion == tabla or relacion.startswith(f"{tabla}_") for tabla in TABLAS_VIGILADAS)
+
+
+def _recorridos_completos(plan: dict, parciales: set[str], limitado: bool = False) -> set[str]:
+    """Tablas vigiladas cuyo filtro no puede resolverse con un índice.
+
+    Un Seq Scan, o un índice recorrido sin condición que además filtra filas, sin un LIMIT que corte el recorrido.
+    Los recorridos completos sin filtro (entradas de un hash join, agregados) son elección del planner, no
+    índices faltantes; los índices parciales ya implican su predicado.
+    """
+    encontrados: set[str] = set()
+    tipo = plan.get("Node Type", "")
+    relacion = plan.get("Relation Name", "")
+    if tipo == "Limit":
+        limitado = True
+    elif tipo in _NODOS_BLOQUEANTES:
+        limitado = False
+
+    sin_condicion = (
+        tipo in {"Index Scan", "Index Only Scan"}
+        and "Index Cond" not in plan
+        and "Filter" in plan
+        and plan.get("Index Name") not in parciales
+        and not limitado
+    )
+    if _es_vigilada(relacion) and (tipo == "Seq Scan" or sin_condicion):
+        encontrados.add(relacion)
+    for hijo in plan.get("Plans", []):
+        encontrados |= _recorridos_completos(hijo, parciales, limitado)
+    return encontrados
+
+
+def _seq_scans(plan: dict) -> set[str]:
+    encontrados = {plan["Relation Name"]} if plan.get("Node Type") == "Seq Scan" and _es_vigilada(
+        plan.get("Relation Name", "")
+    ) else set()
+    for hijo in plan.get("Plans", []):
+        encontrados |= _seq_scans(hijo)
+    return encontrados
+
+
+def _explicar(conn: Connection, sentencias: list[tuple[str, object]]) -> tuple[set[str], set[str]]:
+    """Devuelve (recorridos completos aun sin Seq Scan permitido, Seq Scan elegidos por el planner)."""
+    sin_indice: set[str] = set()
+    elegidos: set[str] = set()
+    parciales = set(
+        conn.exec_driver_sql(
+            "SELECT indexrelid::regclass::text FROM pg_index WHERE indpred IS NOT NULL"
+        ).scalars()
+    )
+    for sentencia, parametros in sentencias:
+        if not sentencia.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "INSERT", "DELETE")):
+            continue
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sentencia}", parametros).scalar_one()
+        elegidos |= _seq_scans(plan[0]["Plan"])
+
+        # Con enable_seqscan apagado el planner solo recorre la tabla entera si no tiene un índice aplicable.
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sentencia}", parametros).scalar_one()
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = on")
+        sin_indice |= _recorridos_completos(plan[0]["Plan"], parciales)
+    return sin_indice, elegidos
+
+
+def verificar_planes(productos: int = 20_000) -> list[tuple[str, set[str], set[str]]]:
+    """Devuelve (consulta, tablas sin índice aplicable, tablas con Seq Scan elegido) por consulta evaluada."""
+    resultados: list[tuple[str, set[str], set[str]]] = []
+    with engine.connect() as conn:
+        transaccion = conn.begin()
+        try:
+            for sentencia in filter(str.strip, _SEED_SQL.split(";")):
+                conn.execute(text(sentencia), {"productos": productos})
+
+            capturadas: list[tuple[str, object]] = []
+
+            def capturar(conn, cursor, statement, parameters, context, executemany) -> None:
+                if not executemany:
+                    capturadas.append((statement, parameters))
+
+            db = Session(bind=conn, join_transaction_mode="create_savepoint", autoflush=False)
+            for nombre, consulta in _consultas(db).items():
+                capturadas.clear()
+                event.listen(conn, "before_cursor_execute", capturar)
+                try:
+                    consulta(db)
+                except HTTPException:
+                    pass
+                finally:
+                    event.remove(conn, "before_cursor_execute", capturar)
+                resultados.append((nombre, *_explicar(conn, list(capturadas))))
+            db.close()
+        finally:
+            transaccion.rollback()
+    return resultados
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--productos", type=int, default=20_000, help="Escala del dataset sintético")
+    args = parser.parse_args()
+
+    fallas = 0
+    for nombre, sin_indice, elegidos in verificar_planes(args.productos):
+        if sin_indice:
+            fallas += 1
+            print(f"FALLA {nombre}: recorrido completo sin índice en {', '.join(sorted(sin_indice))}")
+        elif elegidos:
+            print(f"aviso {nombre}: el planner prefiere Seq Scan en {', '.join(sorted(elegidos))} con este volumen")
+        else:
+            print(f"ok    {nombre}")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
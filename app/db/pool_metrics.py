@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+_lock = threading.Lock()
+
+
+@dataclass
+class EstadisticasPool:
+    checkouts: int = 0
+    espera_total: float = 0.0
+    espera_max: float = 0.0
+    timeouts: int = 0
+
+
+class _MedirEspera:
+    """Mide cuánto tarda cada checkout en obtener conexión, ya sea esperando una libre o abriendo una nueva."""
+
+    @property
+    def estadisticas(self) -> EstadisticasPool:
+        return self.__dict__.setdefault("_estadisticas", EstadisticasPool())
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            with _lock:
+                self.estadisticas.timeouts += 1
+            raise
+        espera = time.perf_counter() - inicio
+        with _lock:
+            estadisticas = self.estadisticas
+            estadisticas.checkouts += 1
+            estadisticas.espera_total += espera
+            estadisticas.espera_max = max(estadisticas.espera_max, espera)
+        return conexion
+
+
+class TimedQueuePool(_MedirEspera, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_MedirEspera, AsyncAdaptedQueuePool):
+    pass
+
+
+def resumen(pool) -> dict:
+    """Estado del pool y estadísticas de espera acumuladas desde el arranque del proceso."""
+    capacidad = pool.size() + max(pool._max_overflow, 0)
+    en_uso = pool.checkedout()
+    datos = {
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": en_uso,
+        "overflow": max(pool.overflow(), 0),
+        "saturacion": round(en_uso / capacidad, 3) if capacidad else 0.0,
+    }
+    if isinstance(pool, _MedirEspera):
+        with _lock:
+            estadisticas = pool.estadisticas
+            datos.update(
+                checkouts=estadisticas.checkouts,
+                timeouts=estadisticas.timeouts,
+                espera_promedio_ms=round(estadisticas.espera_total / estadisticas.checkouts * 1000, 3)
+                if estadisticas.checkouts
+                else 0.0,
+                espera_max_ms=round(estadisticas.espera_max * 1000, 3),
+            )
+    return datos
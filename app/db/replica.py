@@ -0,0 +1,88 @@
+"""Lectura de lo escrito con réplica: tras confirmar una escritura, las lecturas del usuario van al primario.
+
+La marca viaja con el cliente en una cookie firmada (`usuario.vencimiento.firma`) que `LecturaPropiaMiddleware`
+agrega a la respuesta del request que escribió, así que vale sin importar qué worker atienda la lectura siguiente.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+COOKIE = "ultima_escritura"
+
+
+@dataclass
+class _EscrituraRequest:
+    usuario_id: int | None = None
+
+
+# Objeto mutable: los commits corren en hilos con una copia del contexto y solo así llegan al middleware.
+_escritura: ContextVar[_EscrituraRequest | None] = ContextVar("escritura_request", default=None)
+
+
+def marca(usuario_id: int, vencimiento: int) -> str:
+    return f"{usuario_id}.{vencimiento}.{_firma(usuario_id, vencimiento)}"
+
+
+def escribio_recientemente(usuario_id: int, cookie: str | None) -> bool:
+    """Indica si la cookie del cliente prueba una escritura del usuario dentro de la ventana de lectura-de-lo-escrito."""
+    try:
+        cookie_usuario, vencimiento, firma = (cookie or "").split(".")
+        cookie_usuario_id, vencimiento_ts = int(cookie_usuario), int(vencimiento)
+    except ValueError:
+        return False
+    return (
+        cookie_usuario_id == usuario_id
+        and vencimiento_ts > time.time()
+        and hmac.compare_digest(firma, _firma(usuario_id, vencimiento_ts))
+    )
+
+
+class LecturaPropiaMiddleware:
+    """Agrega la cookie `ultima_escritura` a la respuesta de los requests que confirmaron una escritura."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        escritura = _EscrituraRequest()
+        token = _escritura.set(escritura)
+
+        async def enviar(message: Message) -> None:
+            if message["type"] == "http.response.start" and escritura.usuario_id is not None:
+                segundos = settings.replica_read_your_writes_seconds
+                valor = marca(escritura.usuario_id, int(time.time()) + segundos)
+                cookie = f"{COOKIE}={valor}; Max-Age={segundos}; Path=/; HttpOnly; SameSite=Lax"
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _escritura.reset(token)
+
+
+@event.listens_for(Session, "after_commit")
+def _registrar_commit(session: Session) -> None:
+    usuario_id = session.info.get("usuario_id")
+    escritura = _escritura.get()
+    if usuario_id is not None and escritura is not None:
+        escritura.usuario_id = usuario_id
+
+
+def _firma(usuario_id: int, vencimiento: int) -> str:
+    mensaje = f"{COOKIE}:{usuario_id}:{vencimiento}".encode()
+    return hmac.new(settings.secret_key.encode(), mensaje, hashlib.sha256).hexdigest()
@@ -1,9 +1,68 @@
 from __future__ import annotations
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 
+from app.core import instrumentacion
 from app.core.config import settings
+from app.db import consultas_lentas
+from app.db.pool_metrics import TimedAsyncQueuePool, TimedQueuePool
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+
+def _engine_options() -> dict:
+    connect_args: dict = {}
+    if settings.db_pgbouncer:
+        # PgBouncer en modo transaction no mantiene prepared statements ni parámetros de sesión entre transacciones.
+        connect_args["prepare_threshold"] = None
+    elif settings.db_statement_timeout_ms:
+        connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "connect_args": connect_args,
+    }
+
+
+def _configurar_engine(sync_engine: Engine) -> None:
+    instrumentacion.registrar_engine(sync_engine)
+    if settings.slow_query_ms > 0:
+        consultas_lentas.registrar_engine(sync_engine)
+    if settings.db_pgbouncer and settings.db_statement_timeout_ms:
+
+        @event.listens_for(sync_engine, "begin")
+        def _statement_timeout(conn) -> None:
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.db_statement_timeout_ms)}")
+
+
+engine = create_engine(settings.database_url, poolclass=TimedQueuePool, **_engine_options())
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+# Misma URL: el dialecto psycopg selecciona su variante async al usarse con create_async_engine.
+async_engine = create_async_engine(settings.database_url, poolclass=TimedAsyncQueuePool, **_engine_options())
+replica_async_engine = (
+    create_async_engine(settings.database_replica_url, poolclass=TimedAsyncQueuePool, **_engine_options())
+    if settings.database_replica_url
+    else None
+)
+
+
+class RoutingSession(Session):
+    """Envía las lecturas de sesiones abiertas con info["replica"] a la réplica; los flush van siempre al primario."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if replica_async_engine is not None and self.info.get("replica") and not self._flushing:
+            return replica_async_engine.sync_engine
+        return async_engine.sync_engine
+
+
+AsyncSessionLocal = async_sessionmaker(sync_session_class=RoutingSession, autoflush=False)
+
+_configurar_engine(engine)
+_configurar_engine(async_engine.sync_engine)
+if replica_async_engine is not None:
+    _configurar_engine(replica_async_engine.sync_engine)
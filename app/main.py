@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.router import api_router
+from app.core import instrumentacion
 from app.core.config import settings
+from app.db import pool_metrics, replica
+from app.db.session import async_engine, engine, replica_async_engine
 
 app = FastAPI(title=settings.project_name)
 
@@ -15,6 +18,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(instrumentacion.PresupuestoConsultasMiddleware)
+app.add_middleware(instrumentacion.HeadersExtraMiddleware)
+if settings.database_replica_url:
+    app.add_middleware(replica.LecturaPropiaMiddleware)
+
+if settings.metrics_enabled:
+    app.add_middleware(instrumentacion.MetricasMiddleware, server_timing=settings.server_timing_enabled)
+    instrumentacion.registrar_pools(lambda: _pools())
 
 app.include_router(api_router)
 
@@ -22,3 +33,21 @@ app.include_router(api_router)
 @app.get("/health", tags=["health"])
 def healthcheck() -> dict[str, str]:
     return {"status": "ok"}
+
+
+@app.get("/health/pool", tags=["health"])
+def pool_status() -> dict[str, dict]:
+    return {nombre: pool_metrics.resumen(pool) for nombre, pool in _pools().items()}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    contenido, tipo = instrumentacion.exposicion()
+    return Response(content=contenido, media_type=tipo)
+
+
+def _pools() -> dict:
+    pools = {"sync": engine.pool, "async": async_engine.pool}
+    if replica_async_engine is not None:
+        pools["replica"] = replica_async_engine.pool
+    return pools
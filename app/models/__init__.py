@@ -2,8 +2,11 @@ from .alquiler import Alquiler, AlquilerItem
 from .cliente import Cliente
 from .deposito import Deposito
 from .evento import Evento
+from .metrica import MetricaDashboard
 from .movimiento import MovimientoStock
+from .movimiento_diario import MovimientoDiario
 from .producto import Producto
+from .stock_snapshot import StockSnapshot
 from .user import User
 
 __all__ = [
@@ -12,7 +15,10 @@ __all__ = [
     "Cliente",
     "Deposito",
     "Evento",
+    "MetricaDashboard",
+    "MovimientoDiario",
     "MovimientoStock",
     "Producto",
+    "StockSnapshot",
     "User",
 ]
@@ -1,6 +1,18 @@
 from __future__ import annotations
 
-from sqlalchemy import DateTime, ForeignKey, Integer, Numeric, String, Text, func
+from sqlalchemy import (
+    CheckConstraint,
+    Computed,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    Text,
+    func,
+)
+from sqlalchemy.dialects.postgresql import TSTZRANGE, Range
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -8,6 +20,14 @@ from app.db.base import Base
 
 class Alquiler(Base):
     __tablename__ = "alquileres"
+    __table_args__ = (
+        CheckConstraint("fecha_hasta >= fecha_desde", name="ck_alquileres_fechas"),
+        Index("ix_alquileres_periodo", "periodo", postgresql_using="gist"),
+        Index("ix_alquileres_estado_fecha_desde", "estado", "fecha_desde"),
+        Index("ix_alquileres_fecha_desde", "fecha_desde", "id"),
+        Index("ix_alquileres_cliente_id", "cliente_id"),
+        Index("ix_alquileres_evento_id", "evento_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     codigo: Mapped[str] = mapped_column(String(50), unique=True, nullable=False, index=True)
@@ -18,14 +38,21 @@ class Alquiler(Base):
     estado: Mapped[str] = mapped_column(String(50), nullable=False, default="Borrador")
     notas: Mapped[str | None] = mapped_column(Text)
     fecha_creacion: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    periodo: Mapped[Range | None] = mapped_column(
+        TSTZRANGE, Computed("tstzrange(fecha_desde, fecha_hasta, '[)')", persisted=True)
+    )
 
-    cliente = relationship("Cliente", back_populates="alquileres")
-    evento = relationship("Evento", back_populates="alquileres")
-    items = relationship("AlquilerItem", back_populates="alquiler", cascade="all, delete-orphan")
+    cliente = relationship("Cliente", back_populates="alquileres", lazy="raise")
+    evento = relationship("Evento", back_populates="alquileres", lazy="raise")
+    items = relationship("AlquilerItem", back_populates="alquiler", cascade="all, delete-orphan", lazy="raise")
 
 
 class AlquilerItem(Base):
     __tablename__ = "alquiler_items"
+    __table_args__ = (
+        Index("ix_alquiler_items_producto_id", "producto_id"),
+        Index("ix_alquiler_items_alquiler_id", "alquiler_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     alquiler_id: Mapped[int] = mapped_column(ForeignKey("alquileres.id"), nullable=False)
@@ -34,5 +61,5 @@ class AlquilerItem(Base):
     precio_unitario: Mapped[float | None] = mapped_column(Numeric(10, 2))
     observaciones: Mapped[str | None] = mapped_column(Text)
 
-    alquiler = relationship("Alquiler", back_populates="items")
-    producto = relationship("Producto", back_populates="alquiler_items")
+    alquiler = relationship("Alquiler", back_populates="items", lazy="raise")
+    producto = relationship("Producto", back_populates="alquiler_items", lazy="raise")
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import DateTime, Integer, String, Text, func
+from sqlalchemy import DateTime, Index, Integer, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -8,6 +8,14 @@ from app.db.base import Base
 
 class Cliente(Base):
     __tablename__ = "clientes"
+    __table_args__ = (
+        Index("ix_clientes_nombre_trgm", "nombre", postgresql_using="gin", postgresql_ops={"nombre": "gin_trgm_ops"}),
+        Index(
+            "ix_clientes_apellido_trgm", "apellido", postgresql_using="gin", postgresql_ops={"apellido": "gin_trgm_ops"}
+        ),
+        Index("ix_clientes_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+        Index("ix_clientes_nombre", "nombre", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     nombre: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -19,5 +27,5 @@ class Cliente(Base):
     notas: Mapped[str | None] = mapped_column(Text)
     fecha_creacion: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
-    alquileres = relationship("Alquiler", back_populates="cliente")
-    eventos = relationship("Evento", back_populates="cliente")
+    alquileres = relationship("Alquiler", back_populates="cliente", lazy="raise")
+    eventos = relationship("Evento", back_populates="cliente", lazy="raise")
@@ -15,10 +15,10 @@ class Deposito(Base):
     descripcion: Mapped[str | None] = mapped_column(Text, nullable=True)
     fecha_creacion: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
-    productos = relationship("Producto", back_populates="deposito_principal")
+    productos = relationship("Producto", back_populates="deposito_principal", lazy="raise")
     movimientos_origen = relationship(
-        "MovimientoStock", foreign_keys="MovimientoStock.deposito_origen_id", back_populates="deposito_origen"
+        "MovimientoStock", foreign_keys="MovimientoStock.deposito_origen_id", back_populates="deposito_origen", lazy="raise"
     )
     movimientos_destino = relationship(
-        "MovimientoStock", foreign_keys="MovimientoStock.deposito_destino_id", back_populates="deposito_destino"
+        "MovimientoStock", foreign_keys="MovimientoStock.deposito_destino_id", back_populates="deposito_destino", lazy="raise"
     )
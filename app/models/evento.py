@@ -1,6 +1,16 @@
 from __future__ import annotations
 
-from sqlalchemy import Date, DateTime, ForeignKey, Integer, String, Text, Time, func
+from sqlalchemy import (
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    Time,
+    func,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -8,6 +18,10 @@ from app.db.base import Base
 
 class Evento(Base):
     __tablename__ = "eventos"
+    __table_args__ = (
+        Index("ix_eventos_fecha_evento", "fecha_evento", "id"),
+        Index("ix_eventos_cliente_id", "cliente_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     nombre: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -19,5 +33,5 @@ class Evento(Base):
     estado: Mapped[str] = mapped_column(String(50), nullable=False, default="Pendiente")
     fecha_creacion: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
-    cliente = relationship("Cliente", back_populates="eventos")
-    alquileres = relationship("Alquiler", back_populates="evento")
+    cliente = relationship("Cliente", back_populates="eventos", lazy="raise")
+    alquileres = relationship("Alquiler", back_populates="evento", lazy="raise")
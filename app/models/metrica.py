@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from sqlalchemy import BigInteger, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class MetricaDashboard(Base):
+    __tablename__ = "metricas_dashboard"
+
+    clave: Mapped[str] = mapped_column(String(50), primary_key=True)
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True)
+    valor: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import BigInteger, Date, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class MovimientoDiario(Base):
+    __tablename__ = "movimientos_diarios"
+    __table_args__ = (Index("ix_movimientos_diarios_producto_dia", "producto_id", "dia"),)
+
+    dia: Mapped[date] = mapped_column(Date, primary_key=True)
+    producto_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # 0 cuando el movimiento no tiene depósito.
+    deposito_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    tipo: Mapped[str] = mapped_column(String(20), primary_key=True)
+    cantidad: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    movimientos: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -1,6 +1,17 @@
 from __future__ import annotations
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text, func
+from sqlalchemy import (
+    Boolean,
+    CheckConstraint,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    func,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -8,6 +19,19 @@ from app.db.base import Base
 
 class Producto(Base):
     __tablename__ = "productos"
+    __table_args__ = (
+        CheckConstraint("stock_actual >= 0", name="ck_productos_stock_actual"),
+        CheckConstraint("stock_rentado >= 0", name="ck_productos_stock_rentado"),
+        CheckConstraint("stock_disponible >= 0 AND stock_disponible <= stock_actual", name="ck_productos_stock_disponible"),
+        CheckConstraint("stock_rentado <= stock_actual", name="ck_productos_stock_rentado_actual"),
+        CheckConstraint("stock_disponible <= stock_actual - stock_rentado", name="ck_productos_stock_disponible_libre"),
+        Index("ix_productos_nombre_trgm", "nombre", postgresql_using="gin", postgresql_ops={"nombre": "gin_trgm_ops"}),
+        Index("ix_productos_codigo_trgm", "codigo", postgresql_using="gin", postgresql_ops={"codigo": "gin_trgm_ops"}),
+        Index("ix_productos_nombre", "nombre", "id"),
+        Index("ix_productos_deposito_principal_id", "deposito_principal_id"),
+        Index("ix_productos_stock_bajo", "stock_disponible", postgresql_where=text("stock_disponible <= stock_minimo")),
+        Index("ix_productos_danados", "fecha_actualizacion", postgresql_where=text("estado_fisico = 'Dañado'")),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     nombre: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -25,11 +49,12 @@ class Producto(Base):
     stock_minimo: Mapped[int] = mapped_column(Integer, default=0)
     stock_rentado: Mapped[int] = mapped_column(Integer, default=0)
     stock_disponible: Mapped[int] = mapped_column(Integer, default=0)
+    movimientos_sin_snapshot: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default=text("0"))
     deposito_principal_id: Mapped[int] = mapped_column(ForeignKey("depositos.id"), nullable=False)
     activo: Mapped[bool] = mapped_column(Boolean, default=True)
     fecha_creacion: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     fecha_actualizacion: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
-    deposito_principal = relationship("Deposito", back_populates="productos")
-    movimientos = relationship("MovimientoStock", back_populates="producto")
-    alquiler_items = relationship("AlquilerItem", back_populates="producto")
+    deposito_principal = relationship("Deposito", back_populates="productos", lazy="raise")
+    movimientos = relationship("MovimientoStock", back_populates="producto", lazy="raise")
+    alquiler_items = relationship("AlquilerItem", back_populates="producto", lazy="raise")
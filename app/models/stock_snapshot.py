@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class StockSnapshot(Base):
+    __tablename__ = "stock_snapshots"
+    __table_args__ = (Index("ix_stock_snapshots_producto_fecha", "producto_id", "fecha"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    producto_id: Mapped[int] = mapped_column(ForeignKey("productos.id"), nullable=False)
+    fecha: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+    stock_actual: Mapped[int] = mapped_column(Integer, nullable=False)
+    stock_rentado: Mapped[int] = mapped_column(Integer, nullable=False)
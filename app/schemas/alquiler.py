@@ -56,3 +56,24 @@ class AlquilerRead(AlquilerBase):
     cliente_nombre: str | None = None
     evento_nombre: str | None = None
     items: list[AlquilerItemRead] = Field(default_factory=list)
+
+
+class DisponibilidadItem(BaseModel):
+    producto_id: int
+    cantidad: int = 0
+
+
+class DisponibilidadRequest(BaseModel):
+    fecha_desde: datetime
+    fecha_hasta: datetime
+    items: list[DisponibilidadItem]
+    excluir_alquiler_id: int | None = None
+
+
+class DisponibilidadRead(BaseModel):
+    producto_id: int
+    stock_total: int
+    reservado: int
+    disponible: int
+    solicitado: int
+    suficiente: bool
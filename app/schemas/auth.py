@@ -5,8 +5,16 @@ from pydantic import BaseModel, EmailStr
 
 class Token(BaseModel):
     access_token: str
+    refresh_token: str | None = None
     token_type: str = "bearer"
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
 class TokenData(BaseModel):
     email: EmailStr | None = None
+    user_id: int | None = None
+    rol: str | None = None
+    version: int | None = None
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class MovimientoBase(BaseModel):
@@ -20,8 +20,13 @@ class MovimientoCreate(MovimientoBase):
     ajuste_positivo: bool | None = None
 
 
+class MovimientoLoteCreate(BaseModel):
+    movimientos: list[MovimientoCreate] = Field(min_length=1)
+
+
 class MovimientoRead(MovimientoBase):
     model_config = ConfigDict(from_attributes=True)
 
     id: int
     fecha: datetime
+    ajuste_positivo: bool | None = None
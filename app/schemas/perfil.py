@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class PerfilRead(BaseModel):
+    id: str
+    fecha: datetime
+    metodo: str
+    ruta: str
+    path: str
+    duracion_ms: float
+    muestras: int
+    usuario_id: int
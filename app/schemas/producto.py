@@ -47,6 +47,14 @@ class ProductoUpdate(BaseModel):
     activo: bool | None = None
 
 
+class ProductoAutocomplete(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    codigo: str
+    nombre: str
+
+
 class ProductoRead(ProductoBase):
     model_config = ConfigDict(from_attributes=True)
 
@@ -57,3 +65,27 @@ class ProductoRead(ProductoBase):
     fecha_creacion: datetime
     fecha_actualizacion: datetime
     deposito_nombre: str | None = None
+
+
+class StockHistoricoRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    producto_id: int
+    codigo: str
+    nombre: str
+    fecha: datetime
+    stock_actual: int
+    stock_rentado: int
+
+
+class ImportacionError(BaseModel):
+    fila: int
+    codigo: str | None = None
+    error: str
+
+
+class ImportacionProductosRead(BaseModel):
+    procesadas: int
+    creados: int
+    actualizados: int
+    errores: list[ImportacionError]
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from datetime import date
+
+from pydantic import BaseModel
+
+
+class MovimientoReporteRead(BaseModel):
+    periodo: date
+    producto_id: int | None = None
+    deposito_id: int | None = None
+    tipo: str | None = None
+    cantidad: int
+    movimientos: int
@@ -28,3 +28,11 @@ class UserRead(UserBase):
     id: int
     fecha_creacion: datetime
 
+
+class CurrentUser(UserRead):
+    """Copia inmutable del usuario autenticado; se cachea en memoria y no depende de una sesión abierta."""
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+    token_version: int
+
@@ -2,8 +2,9 @@ from __future__ import annotations
 
 from datetime import date, timedelta
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
 
+from app.models.cliente import Cliente
 from app.models.evento import Evento
 
 
@@ -13,6 +14,7 @@ def proximos_eventos(db: Session, *, dias: int = 14) -> list[dict]:
 
     eventos = (
         db.query(Evento)
+        .options(joinedload(Evento.cliente).load_only(Cliente.nombre), selectinload(Evento.alquileres))
         .filter(Evento.fecha_evento >= hoy)
         .filter(Evento.fecha_evento <= limite)
         .order_by(Evento.fecha_evento)
@@ -1,15 +1,27 @@
 from __future__ import annotations
 
+from collections.abc import Sequence
 from datetime import datetime
-from typing import Sequence
 
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from app.models.alquiler import Alquiler, AlquilerItem
-from app.schemas.alquiler import AlquilerCreate, AlquilerUpdate
+from app.models.cliente import Cliente
+from app.models.evento import Evento
+from app.models.producto import Producto
+from app.schemas.alquiler import AlquilerCreate, AlquilerItemCreate, AlquilerUpdate
 from app.schemas.movimiento import MovimientoCreate
-from app.services.movimiento_service import create_movimiento
+from app.services import disponibilidad_service, metricas_service
+from app.services.movimiento_service import create_movimientos_bulk
+from app.services.pagination import DEFAULT_LIMIT, build_page, paginate_query
+
+_LOAD_OPTIONS = (
+    joinedload(Alquiler.cliente).load_only(Cliente.nombre),
+    joinedload(Alquiler.evento).load_only(Evento.nombre),
+    selectinload(Alquiler.items).joinedload(AlquilerItem.producto).load_only(Producto.nombre),
+)
 
 
 def list_alquileres(
@@ -20,25 +32,66 @@ def list_alquileres(
     estado: str | None = None,
     fecha_desde: datetime | None = None,
     fecha_hasta: datetime | None = None,
-) -> Sequence[Alquiler]:
-    query = db.query(Alquiler)
+    cursor: str | None = None,
+    limit: int = DEFAULT_LIMIT,
+) -> tuple[list[Alquiler], str | None]:
+    query = db.query(Alquiler).options(*_LOAD_OPTIONS).filter(
+        *_filtros(
+            cliente_id=cliente_id,
+            evento_id=evento_id,
+            estado=estado,
+            fecha_desde=fecha_desde,
+            fecha_hasta=fecha_hasta,
+        )
+    )
+    query = paginate_query(
+        query, orden=Alquiler.fecha_desde, id_columna=Alquiler.id, cursor=cursor, limit=limit, descendente=True
+    )
+    return build_page(query.all(), limit=limit, clave=lambda alquiler: (alquiler.fecha_desde, alquiler.id))
 
-    if cliente_id:
-        query = query.filter(Alquiler.cliente_id == cliente_id)
-    if evento_id:
-        query = query.filter(Alquiler.evento_id == evento_id)
-    if estado:
-        query = query.filter(Alquiler.estado == estado)
-    if fecha_desde:
-        query = query.filter(Alquiler.fecha_desde >= fecha_desde)
-    if fecha_hasta:
-        query = query.filter(Alquiler.fecha_hasta <= fecha_hasta)
 
-    return query.order_by(Alquiler.fecha_desde.desc()).all()
+def consulta_exportacion(
+    *,
+    cliente_id: int | None = None,
+    evento_id: int | None = None,
+    estado: str | None = None,
+    fecha_desde: datetime | None = None,
+    fecha_hasta: datetime | None = None,
+) -> Select:
+    """Una fila por ítem de alquiler (o una sin producto si el alquiler no tiene ítems)."""
+    return (
+        select(
+            Alquiler.id.label("alquiler_id"),
+            Alquiler.codigo,
+            Alquiler.estado,
+            Alquiler.fecha_desde,
+            Alquiler.fecha_hasta,
+            Alquiler.cliente_id,
+            Cliente.nombre.label("cliente"),
+            Alquiler.evento_id,
+            AlquilerItem.producto_id,
+            Producto.codigo.label("producto_codigo"),
+            AlquilerItem.cantidad,
+            AlquilerItem.precio_unitario,
+        )
+        .join(Cliente, Cliente.id == Alquiler.cliente_id)
+        .outerjoin(AlquilerItem, AlquilerItem.alquiler_id == Alquiler.id)
+        .outerjoin(Producto, Producto.id == AlquilerItem.producto_id)
+        .where(
+            *_filtros(
+                cliente_id=cliente_id,
+                evento_id=evento_id,
+                estado=estado,
+                fecha_desde=fecha_desde,
+                fecha_hasta=fecha_hasta,
+            )
+        )
+        .order_by(Alquiler.id, AlquilerItem.id)
+    )
 
 
 def get_alquiler_or_404(db: Session, alquiler_id: int) -> Alquiler:
-    alquiler = db.query(Alquiler).filter(Alquiler.id == alquiler_id).first()
+    alquiler = db.query(Alquiler).options(*_LOAD_OPTIONS).filter(Alquiler.id == alquiler_id).first()
     if not alquiler:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Alquiler no encontrado")
     return alquiler
@@ -52,27 +105,38 @@ def create_alquiler(db: Session, alquiler_in: AlquilerCreate) -> Alquiler:
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Solo se pueden crear alquileres en borrador; use /confirmar para avanzar",
         )
+    fecha_desde = disponibilidad_service.en_utc(alquiler_in.fecha_desde)
+    fecha_hasta = disponibilidad_service.en_utc(alquiler_in.fecha_hasta)
+    _validar_fechas(fecha_desde, fecha_hasta)
+    cantidades = _cantidades_por_producto(alquiler_in.items)
+    if cantidades:
+        disponibilidad_service.verificar_disponibilidad(db, cantidades, fecha_desde, fecha_hasta)
 
     items = [AlquilerItem(**item.model_dump()) for item in alquiler_in.items]
     alquiler = Alquiler(
         codigo=alquiler_in.codigo,
         cliente_id=alquiler_in.cliente_id,
         evento_id=alquiler_in.evento_id,
-        fecha_desde=alquiler_in.fecha_desde,
-        fecha_hasta=alquiler_in.fecha_hasta,
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta,
         estado=alquiler_in.estado,
         notas=alquiler_in.notas,
         items=items,
     )
     db.add(alquiler)
+    db.flush()
+    alquiler_id = alquiler.id
     db.commit()
-    db.refresh(alquiler)
-    return alquiler
+    return get_alquiler_or_404(db, alquiler_id)
 
 
 def update_alquiler(db: Session, alquiler: Alquiler, alquiler_in: AlquilerUpdate) -> Alquiler:
     data = alquiler_in.model_dump(exclude_unset=True)
     items_payload = data.pop("items", None)
+    activo_previo = alquiler.estado in disponibilidad_service.ESTADOS_RESERVA
+    for campo in ("fecha_desde", "fecha_hasta"):
+        if data.get(campo) is not None:
+            data[campo] = disponibilidad_service.en_utc(data[campo])
 
     for field, value in data.items():
         setattr(alquiler, field, value)
@@ -82,54 +146,105 @@ def update_alquiler(db: Session, alquiler: Alquiler, alquiler_in: AlquilerUpdate
         for item in items_payload:
             alquiler.items.append(AlquilerItem(**item))
 
+    if {"fecha_desde", "fecha_hasta"} & data.keys() or items_payload is not None:
+        _validar_fechas(alquiler.fecha_desde, alquiler.fecha_hasta)
+        cantidades = _cantidades_por_producto(alquiler.items)
+        if cantidades:
+            disponibilidad_service.verificar_disponibilidad(
+                db, cantidades, alquiler.fecha_desde, alquiler.fecha_hasta, excluir_alquiler_id=alquiler.id
+            )
+
+    activo = alquiler.estado in disponibilidad_service.ESTADOS_RESERVA
+    metricas_service.acumular(db, ordenes_alquiler_activas=int(activo) - int(activo_previo))
+
+    alquiler_id = alquiler.id
     db.add(alquiler)
     db.commit()
-    db.refresh(alquiler)
-    return alquiler
+    return get_alquiler_or_404(db, alquiler_id)
+
 
+def confirm_alquiler(db: Session, alquiler: Alquiler) -> Alquiler:
+    """Reserva las unidades en las fechas del alquiler; el stock no se mueve hasta el retiro.
 
-def confirm_alquiler(db: Session, alquiler: Alquiler, usuario_id: int | None = None) -> Alquiler:
+    Así dos alquileres en fechas distintas pueden confirmarse aunque entre los dos superen el stock.
+    """
+    # El estado se relee con lock: dos confirmaciones del mismo alquiler no lo cuentan dos veces.
+    db.refresh(alquiler, ["estado"], with_for_update=True)
     if alquiler.estado != "Borrador":
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El alquiler ya fue confirmado")
     if not alquiler.items:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El alquiler no tiene ítems")
 
-    for item in alquiler.items:
-        movimiento = MovimientoCreate(
+    disponibilidad_service.verificar_disponibilidad(
+        db,
+        _cantidades_por_producto(alquiler.items),
+        alquiler.fecha_desde,
+        alquiler.fecha_hasta,
+        excluir_alquiler_id=alquiler.id,
+    )
+
+    alquiler.estado = "Confirmado"
+    metricas_service.acumular(db, ordenes_alquiler_activas=1)
+    alquiler_id = alquiler.id
+    db.add(alquiler)
+    db.commit()
+    return get_alquiler_or_404(db, alquiler_id)
+
+
+def retirar_alquiler(db: Session, alquiler: Alquiler, usuario_id: int | None = None) -> Alquiler:
+    """Registra la salida de las unidades (movimiento ALQUILER) y pasa el alquiler a En curso."""
+    db.refresh(alquiler, ["estado"], with_for_update=True)
+    if alquiler.estado != "Confirmado":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Solo alquileres confirmados pueden retirarse"
+        )
+    if not alquiler.items:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El alquiler no tiene ítems")
+
+    movimientos = [
+        MovimientoCreate(
             producto_id=item.producto_id,
             tipo="ALQUILER",
             cantidad=item.cantidad,
             referencia=alquiler.codigo,
         )
-        create_movimiento(db, movimiento, usuario_id=usuario_id, auto_commit=False)
+        for item in alquiler.items
+    ]
+    create_movimientos_bulk(db, movimientos, usuario_id=usuario_id, auto_commit=False)
 
-    alquiler.estado = "Confirmado"
+    alquiler.estado = "En curso"
+    alquiler_id = alquiler.id
     db.add(alquiler)
     db.commit()
-    db.refresh(alquiler)
-    return alquiler
+    return get_alquiler_or_404(db, alquiler_id)
 
 
 def registrar_devolucion(db: Session, alquiler: Alquiler, usuario_id: int | None = None) -> Alquiler:
-    if alquiler.estado not in {"Confirmado", "En curso"}:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Solo alquileres activos pueden devolverse")
+    db.refresh(alquiler, ["estado"], with_for_update=True)
+    if alquiler.estado != "En curso":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Solo alquileres en curso pueden devolverse"
+        )
     if not alquiler.items:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El alquiler no tiene ítems")
 
-    for item in alquiler.items:
-        movimiento = MovimientoCreate(
+    movimientos = [
+        MovimientoCreate(
             producto_id=item.producto_id,
             tipo="DEVOLUCION",
             cantidad=item.cantidad,
             referencia=f"DEV-{alquiler.codigo}",
         )
-        create_movimiento(db, movimiento, usuario_id=usuario_id, auto_commit=False)
+        for item in alquiler.items
+    ]
+    create_movimientos_bulk(db, movimientos, usuario_id=usuario_id, auto_commit=False)
 
     alquiler.estado = "Finalizado"
+    metricas_service.acumular(db, ordenes_alquiler_activas=-1)
+    alquiler_id = alquiler.id
     db.add(alquiler)
     db.commit()
-    db.refresh(alquiler)
-    return alquiler
+    return get_alquiler_or_404(db, alquiler_id)
 
 
 def cancelar_alquiler(db: Session, alquiler: Alquiler) -> None:
@@ -137,3 +252,37 @@ def cancelar_alquiler(db: Session, alquiler: Alquiler) -> None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Solo borradores pueden eliminarse")
     db.delete(alquiler)
     db.commit()
+
+
+def _validar_fechas(fecha_desde: datetime, fecha_hasta: datetime) -> None:
+    if fecha_hasta <= fecha_desde:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="fecha_hasta debe ser posterior a fecha_desde")
+
+
+def _cantidades_por_producto(items: Sequence[AlquilerItem | AlquilerItemCreate]) -> dict[int, int]:
+    cantidades: dict[int, int] = {}
+    for item in items:
+        cantidades[item.producto_id] = cantidades.get(item.producto_id, 0) + item.cantidad
+    return cantidades
+
+
+def _filtros(
+    *,
+    cliente_id: int | None,
+    evento_id: int | None,
+    estado: str | None,
+    fecha_desde: datetime | None,
+    fecha_hasta: datetime | None,
+) -> list:
+    filtros = []
+    if cliente_id:
+        filtros.append(Alquiler.cliente_id == cliente_id)
+    if evento_id:
+        filtros.append(Alquiler.evento_id == evento_id)
+    if estado:
+        filtros.append(Alquiler.estado == estado)
+    if fecha_desde:
+        filtros.append(Alquiler.fecha_desde >= fecha_desde)
+    if fecha_hasta:
+        filtros.append(Alquiler.fecha_hasta <= fecha_hasta)
+    return filtros
@@ -3,16 +3,24 @@ from __future__ import annotations
 from datetime import timedelta
 
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.security import create_access_token, get_password_hash, verify_password
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    decode_refresh_token,
+    get_password_hash_async,
+    verify_password_async,
+)
+from app.core.user_cache import user_cache
 from app.models.user import User
-from app.schemas.user import UserCreate
+from app.schemas.user import UserCreate, UserUpdate
 
 
-def create_user(db: Session, user_in: UserCreate) -> User:
-    if db.query(User).filter(User.email == user_in.email).first():
+async def create_user(db: AsyncSession, user_in: UserCreate) -> User:
+    if await db.scalar(select(User.id).where(User.email == user_in.email)):
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email ya registrado")
 
     user = User(
@@ -20,22 +28,71 @@ def create_user(db: Session, user_in: UserCreate) -> User:
         email=user_in.email,
         rol=user_in.rol,
         activo=user_in.activo,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await get_password_hash_async(user_in.password),
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
-def authenticate_user(db: Session, email: str, password: str) -> User:
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(password, user.hashed_password):
+async def get_user_or_404(db: AsyncSession, user_id: int) -> User:
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
+    return user
+
+
+async def update_user(db: AsyncSession, user: User, user_in: UserUpdate) -> User:
+    """Actualiza el usuario; cambiar rol, estado o contraseña revoca los tokens emitidos hasta ahora."""
+    data = user_in.model_dump(exclude_unset=True)
+    password = data.pop("password", None)
+
+    revocar = password is not None or any(
+        campo in data and data[campo] != getattr(user, campo) for campo in ("rol", "activo")
+    )
+    for field, value in data.items():
+        setattr(user, field, value)
+    if password is not None:
+        user.hashed_password = await get_password_hash_async(password)
+    if revocar:
+        user.token_version += 1
+
+    user_id = user.id
+    db.add(user)
+    await db.commit()
+    user_cache.invalidate(user_id)
+    await db.refresh(user)
+    return user
+
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> User:
+    user = await db.scalar(select(User).where(User.email == email))
+    if not user or not await verify_password_async(password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales inválidas")
     if not user.activo:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuario inactivo")
     return user
 
 
+async def authenticate_refresh_token(db: AsyncSession, refresh_token: str) -> User:
+    """Valida un refresh token contra la versión vigente del usuario, sin volver a verificar la contraseña."""
+    token_data = decode_refresh_token(refresh_token)
+    user = await db.get(User, token_data.user_id) if token_data.user_id is not None else None
+    if not user or user.token_version != token_data.version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revocado")
+    if not user.activo:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuario inactivo")
+    return user
+
+
 def create_user_token(user: User) -> str:
-    return create_access_token({"sub": user.email}, expires_delta=timedelta(minutes=settings.access_token_expire_minutes))
+    return create_access_token(_claims(user), expires_delta=timedelta(minutes=settings.access_token_expire_minutes))
+
+
+def create_user_refresh_token(user: User) -> str:
+    return create_refresh_token(_claims(user))
+
+
+def _claims(user: User) -> dict:
+    return {"sub": user.email, "uid": user.id, "rol": user.rol, "ver": user.token_version}
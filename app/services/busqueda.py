@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from sqlalchemy import Float, func, or_
+
+
+def filtro_busqueda(termino: str, *columnas):
+    """Coincidencia parcial en cualquiera de las columnas; los índices GIN pg_trgm resuelven el ILIKE '%...%'."""
+    like = f"%{termino}%"
+    return or_(*(columna.ilike(like) for columna in columnas))
+
+
+def relevancia(termino: str, *columnas):
+    """Mayor similitud trigram entre el término y las columnas (0 cuando todas son NULL)."""
+    similitudes = [func.similarity(columna, termino, type_=Float) for columna in columnas]
+    return func.coalesce(func.greatest(*similitudes, type_=Float), 0.0, type_=Float)
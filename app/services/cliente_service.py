@@ -1,22 +1,40 @@
 from __future__ import annotations
 
-from typing import Sequence
-
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.models.alquiler import Alquiler
 from app.models.cliente import Cliente
+from app.models.evento import Evento
 from app.schemas.cliente import ClienteCreate, ClienteUpdate
+from app.services.busqueda import filtro_busqueda, relevancia
+from app.services.pagination import DEFAULT_LIMIT, build_page, paginate_query
 
 
-def list_clientes(db: Session, search: str | None = None) -> Sequence[Cliente]:
+def list_clientes(
+    db: Session,
+    search: str | None = None,
+    *,
+    cursor: str | None = None,
+    limit: int = DEFAULT_LIMIT,
+) -> tuple[list[Cliente], str | None]:
     query = db.query(Cliente)
     if search:
-        like = f"%{search}%"
-        query = query.filter(
-            (Cliente.nombre.ilike(like)) | (Cliente.apellido.ilike(like)) | (Cliente.email.ilike(like))
+        columnas = (Cliente.nombre, Cliente.apellido, Cliente.email)
+        puntaje = relevancia(search, *columnas)
+        query = paginate_query(
+            query.filter(filtro_busqueda(search, *columnas)).add_columns(puntaje),
+            orden=puntaje,
+            id_columna=Cliente.id,
+            cursor=cursor,
+            limit=limit,
+            descendente=True,
         )
-    return query.order_by(Cliente.nombre).all()
+        filas, next_cursor = build_page(query.all(), limit=limit, clave=lambda fila: (fila[1], fila[0].id))
+        return [cliente for cliente, _ in filas], next_cursor
+
+    query = paginate_query(query, orden=Cliente.nombre, id_columna=Cliente.id, cursor=cursor, limit=limit)
+    return build_page(query.all(), limit=limit, clave=lambda cliente: (cliente.nombre, cliente.id))
 
 
 def get_cliente_or_404(db: Session, cliente_id: int) -> Cliente:
@@ -45,7 +63,9 @@ def update_cliente(db: Session, cliente: Cliente, cliente_in: ClienteUpdate) ->
 
 
 def delete_cliente(db: Session, cliente: Cliente) -> None:
-    if cliente.alquileres or cliente.eventos:
+    tiene_alquileres = db.query(Alquiler.id).filter(Alquiler.cliente_id == cliente.id).first()
+    tiene_eventos = db.query(Evento.id).filter(Evento.cliente_id == cliente.id).first()
+    if tiene_alquileres or tiene_eventos:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cliente con alquileres o eventos asociados",
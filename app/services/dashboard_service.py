@@ -6,23 +6,15 @@ from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.models.alquiler import Alquiler, AlquilerItem
-from app.models.deposito import Deposito
 from app.models.producto import Producto
+from app.services import metricas_service
 
 
 def get_resumen(db: Session, *, dias_historial: int = 90, top_n: int = 5) -> dict:
     now = datetime.now(timezone.utc)
     desde = now - timedelta(days=dias_historial)
 
-    total_productos = db.query(func.count(Producto.id)).scalar() or 0
-    stock_total = db.query(func.coalesce(func.sum(Producto.stock_actual), 0)).scalar() or 0
-    cantidad_alertas_stock_bajo = (
-        db.query(func.count(Producto.id)).filter(Producto.stock_disponible <= Producto.stock_minimo).scalar() or 0
-    )
-    cantidad_depositos = db.query(func.count(Deposito.id)).scalar() or 0
-    ordenes_alquiler_activas = (
-        db.query(func.count(Alquiler.id)).filter(Alquiler.estado.in_(["Confirmado", "En curso"])).scalar() or 0
-    )
+    metricas = metricas_service.obtener_metricas(db)
 
     productos_mas_alquilados = (
         db.query(
@@ -48,11 +40,7 @@ def get_resumen(db: Session, *, dias_historial: int = 90, top_n: int = 5) -> dic
     )
 
     return {
-        "total_productos": total_productos,
-        "stock_total": int(stock_total),
-        "cantidad_alertas_stock_bajo": cantidad_alertas_stock_bajo,
-        "cantidad_depositos": cantidad_depositos,
-        "ordenes_alquiler_activas": ordenes_alquiler_activas,
+        **metricas,
         "productos_mas_alquilados": [
             {"producto_id": row.producto_id, "nombre": row.nombre, "total": int(row.total)}
             for row in productos_mas_alquilados
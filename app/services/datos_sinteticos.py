@@ -0,0 +1,478 @@
+"""Datos sintéticos a escala para pruebas de rendimiento y suites de benchmark.
+
+Cada unidad de `escala` agrega 500 productos, 200 clientes y 600 eventos (con su alquiler) repartidos en `anios`
+de historia: la demanda de productos y clientes tiene cola larga (Zipf), los eventos se concentran en fines de
+semana y temporada alta, los alquileres de fechas cercanas se solapan y el ledger registra ingresos, bajas,
+ajustes, alquileres y devoluciones. Al final los contadores de stock se recalculan desde el ledger y se cargan
+snapshots, el rollup diario y las métricas, así que reconcile y metricas_service no encuentran deriva.
+
+El contenido depende solo de la semilla, de `hasta` y de los ids existentes (los nuevos continúan a partir del
+máximo de cada tabla), no de la cantidad de procesos: cada bloque usa su propio generador aleatorio y se carga con
+COPY desde un pool de procesos. Pensado para una base sin otras escrituras concurrentes.
+
+    python -m app.services.seed_data --scale 100 --seed 7 --workers 8
+"""
+from __future__ import annotations
+
+import itertools
+import math
+import random
+import time as reloj
+from bisect import bisect
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, time, timedelta
+from functools import lru_cache
+
+from sqlalchemy import Subquery, func, insert, literal, select, text, update
+from sqlalchemy.orm import Session
+
+from app.core.security import get_password_hash
+from app.db.session import SessionLocal, engine
+from app.models.alquiler import Alquiler, AlquilerItem
+from app.models.cliente import Cliente
+from app.models.deposito import Deposito
+from app.models.evento import Evento
+from app.models.movimiento import MovimientoStock
+from app.models.producto import Producto
+from app.models.user import User
+from app.services import (
+    metricas_service,
+    particiones_service,
+    reportes_service,
+    stock_historico_service,
+)
+
+PRODUCTOS_POR_ESCALA = 500
+CLIENTES_POR_ESCALA = 200
+EVENTOS_POR_ESCALA = 600
+FILAS_POR_BLOQUE = 2_000
+
+# (tipo_vajilla, prefijo de código, materiales, unidad, peso en el catálogo)
+CATALOGO = (
+    ("Plato", "PL", ("Porcelana", "Loza", "Melamina"), "pieza", 30),
+    ("Copa", "CP", ("Vidrio", "Cristal"), "pieza", 20),
+    ("Vaso", "VS", ("Vidrio", "Policarbonato"), "pieza", 15),
+    ("Cuchillería", "CB", ("Acero inoxidable", "Alpaca"), "set", 15),
+    ("Taza", "TZ", ("Porcelana", "Loza"), "pieza", 8),
+    ("Mantelería", "MT", ("Tela", "Lino"), "pieza", 7),
+    ("Fuente", "FT", ("Acero inoxidable", "Porcelana", "Vidrio"), "pieza", 5),
+)
+LINEAS = ("estándar", "premium", "gourmet", "vintage", "de autor", "línea hotel", "línea eventos", "XL")
+ESTADOS_FISICOS = (("Excelente", 60), ("Muy bueno", 25), ("Bueno", 10), ("Dañado", 5))
+ZONAS = ("Central", "Norte", "Sur", "Oeste", "Este", "Puerto", "Aeropuerto", "Parque Industrial")
+NOMBRES = ("Laura", "Martín", "Sofía", "Juan", "Valentina", "Diego", "Camila", "Lucas", "Julieta", "Mateo", "Ana")
+APELLIDOS = ("Gómez", "Rodríguez", "Fernández", "López", "Martínez", "Pérez", "García", "Sánchez", "Romero")
+RUBROS = ("Eventos", "Catering", "Producciones", "Banquetes", "Salones", "Hotelería")
+TIPOS_EVENTO = ("Boda", "Cumpleaños", "Congreso", "Cena de gala", "Bautismo", "Aniversario", "Evento corporativo")
+# Demanda relativa por día de la semana (lunes primero) y por mes.
+PESO_DIA = (0.3, 0.3, 0.4, 0.5, 0.9, 1.0, 0.6)
+PESO_MES = (0.4, 0.5, 0.7, 0.7, 0.7, 0.6, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+# Movimientos por año de cada producto, además de los alquileres.
+FRECUENCIAS_LEDGER = {"INGRESO": 3.0, "EGRESO": 8.0, "AJUSTE": 1.0}
+
+_MOVIMIENTO = ("producto_id", "fecha", "tipo", "cantidad", "ajuste_positivo", "deposito_origen_id",
+               "deposito_destino_id", "referencia")
+
+
+@dataclass(frozen=True)
+class Plan:
+    semilla: int
+    inicio: datetime
+    ahora: datetime
+    depositos: tuple[int, ...]
+    base_producto: int
+    productos: int
+    base_cliente: int
+    clientes: int
+    base_evento: int
+    base_alquiler: int
+    eventos: int
+
+
+def generar(
+    escala: int,
+    *,
+    semilla: int = 0,
+    workers: int | None = None,
+    anios: int = 3,
+    hasta: date | None = None,
+) -> dict[str, int]:
+    """Genera y carga el dataset; devuelve la cantidad de filas por tabla y los segundos que tomó."""
+    inicio_reloj = reloj.monotonic()
+    with SessionLocal() as db:
+        plan = _planificar(db, escala, semilla, anios, hasta or date.today())
+        particiones_service.crear_particiones(db, desde=plan.inicio.date())
+
+    totales: dict[str, int] = {"depositos": len(plan.depositos)}
+    # Fase 1 sin dependencias entre sí; la fase 2 referencia productos y clientes ya confirmados.
+    fases = (
+        [("productos", bloque) for bloque in _bloques(plan.productos)]
+        + [("clientes", bloque) for bloque in _bloques(plan.clientes)],
+        [("eventos", bloque) for bloque in _bloques(plan.eventos)],
+    )
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker) as pool:
+        for tareas in fases:
+            nombres = [tarea for tarea, _ in tareas]
+            bloques = [bloque for _, bloque in tareas]
+            for conteo in pool.map(_cargar_bloque, itertools.repeat(plan), nombres, bloques):
+                for tabla, filas in conteo.items():
+                    totales[tabla] = totales.get(tabla, 0) + filas
+
+    with SessionLocal() as db:
+        _completar(db, plan)
+        totales["stock_snapshots"] = plan.productos
+    totales["segundos"] = round(reloj.monotonic() - inicio_reloj, 2)
+    return totales
+
+
+def _planificar(db: Session, escala: int, semilla: int, anios: int, hasta: date) -> Plan:
+    if not db.scalar(select(User.id).limit(1)):
+        db.add(
+            User(nombre="Admin", email="admin@example.com", rol="admin", hashed_password=get_password_hash("admin123"))
+        )
+    zonas = ZONAS[: min(3 + escala // 25, len(ZONAS))]
+    depositos = [Deposito(nombre=f"Depósito {zona}", ubicacion=zona) for zona in zonas]
+    db.add_all(depositos)
+    db.flush()
+
+    ahora = datetime.combine(hasta, time(), UTC)
+    bases = {
+        modelo: db.scalar(select(func.coalesce(func.max(modelo.id), 0)))
+        for modelo in (Producto, Cliente, Evento, Alquiler)
+    }
+    plan = Plan(
+        semilla=semilla,
+        inicio=ahora - timedelta(days=365 * anios),
+        ahora=ahora,
+        depositos=tuple(deposito.id for deposito in depositos),
+        base_producto=bases[Producto],
+        productos=PRODUCTOS_POR_ESCALA * escala,
+        base_cliente=bases[Cliente],
+        clientes=CLIENTES_POR_ESCALA * escala,
+        base_evento=bases[Evento],
+        base_alquiler=bases[Alquiler],
+        eventos=EVENTOS_POR_ESCALA * escala,
+    )
+    # Reserva los rangos de ids antes de cargar con ids explícitos.
+    for tabla, base, cantidad in (
+        ("productos", plan.base_producto, plan.productos),
+        ("clientes", plan.base_cliente, plan.clientes),
+        ("eventos", plan.base_evento, plan.eventos),
+        ("alquileres", plan.base_alquiler, plan.eventos),
+    ):
+        db.execute(
+            text(f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), :valor)"), {"valor": base + cantidad}
+        )
+    db.commit()
+    return plan
+
+
+def _completar(db: Session, plan: Plan) -> None:
+    """Contadores desde el ledger, snapshot inicial, rollup diario, métricas y estadísticas del planner."""
+    desde, hasta = plan.base_producto + 1, plan.base_producto + plan.productos
+    ledger = (
+        select(
+            MovimientoStock.producto_id,
+            func.sum(stock_historico_service.DELTA_ACTUAL).label("actual"),
+            func.sum(stock_historico_service.DELTA_RENTADO).label("rentado"),
+        )
+        .where(MovimientoStock.producto_id.between(desde, hasta))
+        .group_by(MovimientoStock.producto_id)
+        .subquery()
+    )
+    _retirar_iniciados(db, plan, ledger)
+    db.execute(
+        update(Producto)
+        .where(Producto.id == ledger.c.producto_id)
+        .values(
+            stock_actual=ledger.c.actual,
+            stock_rentado=ledger.c.rentado,
+            stock_disponible=func.greatest(ledger.c.actual - ledger.c.rentado, 0),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    stock_historico_service.registrar_snapshots(db, range(desde, hasta + 1), fecha=plan.ahora)
+    db.commit()
+
+    reportes_service.recalcular_dias(db, plan.inicio.date(), plan.ahora.date())
+    metricas_service.reconciliar_metricas(db)
+    db.execute(text("ANALYZE"))
+    db.commit()
+
+
+def _retirar_iniciados(db: Session, plan: Plan, ledger: Subquery) -> None:
+    """Retira (ALQUILER y paso a En curso) los alquileres ya iniciados, en orden de fecha_desde, mientras haya stock.
+
+    Los bloques se generan sin ver la demanda de los demás, así que esto se decide al final: un alquiler que no
+    entra en el stock libre queda confirmado sin retirar, como un retiro demorado.
+    """
+    iniciados = (
+        select(
+            Alquiler.id,
+            Alquiler.codigo,
+            Alquiler.fecha_desde,
+            AlquilerItem.producto_id,
+            AlquilerItem.cantidad,
+            func.sum(AlquilerItem.cantidad)
+            .over(partition_by=AlquilerItem.producto_id, order_by=(Alquiler.fecha_desde, Alquiler.id))
+            .label("acumulado"),
+        )
+        .join(AlquilerItem, AlquilerItem.alquiler_id == Alquiler.id)
+        .where(
+            Alquiler.id.between(plan.base_alquiler + 1, plan.base_alquiler + plan.eventos),
+            Alquiler.estado == "Confirmado",
+            Alquiler.fecha_desde <= plan.ahora,
+        )
+        .cte("iniciados")
+    )
+    # Conservador: el acumulado cuenta también los alquileres anteriores que no se retiran.
+    sin_stock = (
+        select(iniciados.c.id)
+        .outerjoin(ledger, ledger.c.producto_id == iniciados.c.producto_id)
+        .where(iniciados.c.acumulado > func.coalesce(ledger.c.actual - ledger.c.rentado, 0))
+    )
+    db.execute(
+        insert(MovimientoStock).from_select(
+            ["producto_id", "fecha", "tipo", "cantidad", "referencia"],
+            select(
+                iniciados.c.producto_id,
+                iniciados.c.fecha_desde,
+                literal("ALQUILER"),
+                iniciados.c.cantidad,
+                iniciados.c.codigo,
+            ).where(iniciados.c.id.not_in(sin_stock)),
+        )
+    )
+    db.execute(
+        update(Alquiler)
+        .where(Alquiler.id.in_(select(iniciados.c.id).where(iniciados.c.id.not_in(sin_stock))))
+        .values(estado="En curso")
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _inicializar_worker() -> None:
+    # Las conexiones heredadas del proceso padre no se pueden compartir entre procesos.
+    engine.dispose(close=False)
+
+
+def _cargar_bloque(plan: Plan, tarea: str, bloque: tuple[int, int]) -> dict[str, int]:
+    desde, hasta = bloque
+    rng = random.Random(f"{plan.semilla}:{tarea}:{desde}")
+    tablas = _GENERADORES[tarea](plan, rng, desde, hasta)
+    with engine.begin() as conn, conn.connection.driver_connection.cursor() as cursor:
+        for tabla, (columnas, filas) in tablas.items():
+            with cursor.copy(f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN") as copia:
+                for fila in filas:
+                    copia.write_row(fila)
+    return {tabla: len(filas) for tabla, (_, filas) in tablas.items()}
+
+
+def _productos(plan: Plan, rng: random.Random, desde: int, hasta: int) -> dict[str, tuple[tuple, list]]:
+    columnas = ("id", "nombre", "codigo", "unidad_medida", "tipo_vajilla", "material", "estado_fisico", "es_set",
+                "piezas_por_set", "stock_minimo", "deposito_principal_id", "activo", "fecha_creacion")
+    pesos_deposito = [len(plan.depositos)] + [1] * (len(plan.depositos) - 1)
+    productos, movimientos = [], []
+    for indice in range(desde, hasta):
+        producto_id = plan.base_producto + indice + 1
+        tipo, prefijo, materiales, unidad, _ = rng.choices(CATALOGO, weights=[item[4] for item in CATALOGO])[0]
+        material = rng.choice(materiales)
+        objetivo = int(rng.lognormvariate(5.0, 0.8)) + 10
+        deposito = rng.choices(plan.depositos, weights=pesos_deposito)[0]
+        alta = _alta_producto(plan, indice)
+        productos.append(
+            (
+                producto_id,
+                f"{tipo} {rng.choice(LINEAS)} {material.lower()}",
+                f"{prefijo}-{producto_id:07d}",
+                unidad,
+                tipo,
+                material,
+                rng.choices([estado for estado, _ in ESTADOS_FISICOS], weights=[peso for _, peso in ESTADOS_FISICOS])[0],
+                unidad == "set",
+                rng.choice((4, 6, 12)) if unidad == "set" else None,
+                int(objetivo * rng.uniform(0.1, 0.25)),
+                deposito,
+                rng.random() > 0.03,
+                alta,
+            )
+        )
+        movimientos += _ledger_producto(plan, rng, producto_id, objetivo, deposito, alta)
+    return {"productos": (columnas, productos), "movimientos_stock": (_MOVIMIENTO, movimientos)}
+
+
+def _ledger_producto(
+    plan: Plan, rng: random.Random, producto_id: int, objetivo: int, deposito: int, alta: datetime
+) -> list[tuple]:
+    """Stock inicial y luego compras, bajas y ajustes de inventario sin dejar nunca el stock en negativo."""
+    movimientos = [(producto_id, alta, "AJUSTE", objetivo, True, None, deposito, "Stock inicial")]
+    anios = (plan.ahora - alta).total_seconds() / (365 * 86_400)
+    eventos = sorted(
+        (alta + (plan.ahora - alta) * rng.random(), tipo)
+        for tipo, frecuencia in FRECUENCIAS_LEDGER.items()
+        for _ in range(_poisson(rng, frecuencia * anios))
+    )
+    stock = objetivo
+    for fecha, tipo in eventos:
+        if tipo == "INGRESO":
+            cantidad = max(1, int(objetivo * rng.uniform(0.05, 0.2)))
+            movimientos.append((producto_id, fecha, tipo, cantidad, None, None, deposito, "Compra"))
+            stock += cantidad
+        elif tipo == "EGRESO":
+            cantidad = max(1, int(objetivo * rng.uniform(0.005, 0.03)))
+            if cantidad <= stock:
+                movimientos.append((producto_id, fecha, tipo, cantidad, None, deposito, None, "Rotura"))
+                stock -= cantidad
+        else:
+            delta = int(objetivo * rng.uniform(-0.03, 0.03)) or 1
+            if stock + delta >= 0:
+                movimientos.append(
+                    (producto_id, fecha, tipo, abs(delta), delta > 0, deposito, None, "Conteo de inventario")
+                )
+                stock += delta
+    return movimientos
+
+
+def _clientes(plan: Plan, rng: random.Random, desde: int, hasta: int) -> dict[str, tuple[tuple, list]]:
+    columnas = ("id", "nombre", "apellido", "razon_social", "email", "telefono", "fecha_creacion")
+    clientes = []
+    for indice in range(desde, hasta):
+        cliente_id = plan.base_cliente + indice + 1
+        if rng.random() < 0.25:
+            razon_social = f"{rng.choice(RUBROS)} {rng.choice(APELLIDOS)} {rng.choice(('SRL', 'SA', 'SAS'))}"
+            nombre, apellido = razon_social, None
+        else:
+            razon_social, nombre, apellido = None, rng.choice(NOMBRES), rng.choice(APELLIDOS)
+        clientes.append(
+            (
+                cliente_id,
+                nombre,
+                apellido,
+                razon_social,
+                f"cliente{cliente_id}@ejemplo.com",
+                f"+54 11 {rng.randint(4000, 6999)}-{rng.randint(0, 9999):04d}",
+                plan.inicio - timedelta(days=rng.uniform(0, 365)),
+            )
+        )
+    return {"clientes": (columnas, clientes)}
+
+
+def _eventos(plan: Plan, rng: random.Random, desde: int, hasta: int) -> dict[str, tuple[tuple, list]]:
+    """Eventos con su alquiler, los ítems y los movimientos de alquiler y devolución que correspondan."""
+    columnas_evento = ("id", "nombre", "fecha_evento", "hora_evento", "cliente_id", "estado", "fecha_creacion")
+    columnas_alquiler = ("id", "codigo", "cliente_id", "evento_id", "fecha_desde", "fecha_hasta", "estado",
+                         "fecha_creacion")
+    columnas_item = ("alquiler_id", "producto_id", "cantidad", "precio_unitario")
+    demanda_productos = _acumulados(plan.productos, 0.9)
+    demanda_clientes = _acumulados(plan.clientes, 1.1)
+    eventos, alquileres, items, movimientos = [], [], [], []
+    for indice in range(desde, hasta):
+        evento_id, alquiler_id = plan.base_evento + indice + 1, plan.base_alquiler + indice + 1
+        cliente_id = plan.base_cliente + 1 + _elegir(rng, demanda_clientes)
+        dia = _dia_evento(plan, rng)
+        fecha_desde = datetime.combine(dia - timedelta(days=rng.randint(1, 3)), time(9), UTC)
+        fecha_hasta = datetime.combine(dia + timedelta(days=rng.randint(1, 3)), time(18), UTC)
+        creado = min(max(fecha_desde - timedelta(days=rng.uniform(7, 60)), plan.inicio), plan.ahora)
+        confirmado = min(creado + timedelta(days=rng.uniform(0, 5)), fecha_desde, plan.ahora)
+
+        if fecha_hasta <= plan.ahora:
+            estado_evento, estado = "Finalizado", "Finalizado"
+        elif fecha_desde <= plan.ahora:
+            # Se retira (pasa a En curso) en _retirar_iniciados si alcanza el stock.
+            estado_evento, estado = "En curso", "Confirmado"
+        elif rng.random() < 0.7:
+            estado_evento, estado = "Confirmado", "Confirmado"
+        else:
+            estado_evento, estado = "Pendiente", "Borrador"
+        eventos.append(
+            (
+                evento_id,
+                f"{rng.choice(TIPOS_EVENTO)} {rng.choice(APELLIDOS)}",
+                dia,
+                rng.choice((None, time(12), time(13), time(20), time(21))),
+                cliente_id,
+                estado_evento,
+                creado,
+            )
+        )
+        codigo = f"ALQ-{alquiler_id:07d}"
+        alquileres.append((alquiler_id, codigo, cliente_id, evento_id, fecha_desde, fecha_hasta, estado, creado))
+
+        invitados = int(rng.lognormvariate(4.4, 0.6)) + 10
+        elegidos: set[int] = set()
+        for _ in range(1 + min(7, int(rng.expovariate(0.5)))):
+            indice_producto = _elegir(rng, demanda_productos)
+            # Solo productos que ya existían cuando se confirmó el alquiler.
+            if indice_producto in elegidos or _alta_producto(plan, indice_producto) > confirmado:
+                continue
+            elegidos.add(indice_producto)
+            producto_id = plan.base_producto + indice_producto + 1
+            cantidad = max(1, int(invitados * rng.uniform(0.3, 1.2)))
+            items.append((alquiler_id, producto_id, cantidad, _precio(producto_id)))
+            if estado == "Finalizado":
+                movimientos.append((producto_id, fecha_desde, "ALQUILER", cantidad, None, None, None, codigo))
+                devuelto = min(fecha_hasta + timedelta(hours=rng.uniform(1, 30)), plan.ahora)
+                movimientos.append(
+                    (producto_id, devuelto, "DEVOLUCION", cantidad, None, None, None, f"DEV-{codigo}")
+                )
+    return {
+        "eventos": (columnas_evento, eventos),
+        "alquileres": (columnas_alquiler, alquileres),
+        "alquiler_items": (columnas_item, items),
+        "movimientos_stock": (_MOVIMIENTO, movimientos),
+    }
+
+
+_GENERADORES: dict[str, Callable[[Plan, random.Random, int, int], dict[str, tuple[tuple, list]]]] = {
+    "productos": _productos,
+    "clientes": _clientes,
+    "eventos": _eventos,
+}
+
+
+def _bloques(cantidad: int) -> list[tuple[int, int]]:
+    return [(desde, min(desde + FILAS_POR_BLOQUE, cantidad)) for desde in range(0, cantidad, FILAS_POR_BLOQUE)]
+
+
+def _alta_producto(plan: Plan, indice: int) -> datetime:
+    """El 70% del catálogo existe desde el inicio; el resto se incorpora de forma pareja a lo largo del período."""
+    corte = int(plan.productos * 0.7)
+    if indice < corte:
+        return plan.inicio
+    return plan.inicio + (plan.ahora - plan.inicio) * 0.9 * (indice - corte) / max(plan.productos - corte, 1)
+
+
+def _dia_evento(plan: Plan, rng: random.Random) -> date:
+    """Día entre el inicio y seis meses después de `ahora`, con más eventos en fines de semana y temporada alta."""
+    dias = (plan.ahora - plan.inicio).days + 180
+    while True:
+        dia = plan.inicio.date() + timedelta(days=rng.randrange(dias))
+        if rng.random() < PESO_DIA[dia.weekday()] * PESO_MES[dia.month - 1]:
+            return dia
+
+
+@lru_cache(maxsize=4)
+def _acumulados(cantidad: int, exponente: float) -> list[float]:
+    """Pesos acumulados de una distribución Zipf: el elemento k tiene peso 1 / (k + 1) ** exponente."""
+    return list(itertools.accumulate(1 / (rango + 1) ** exponente for rango in range(cantidad)))
+
+
+def _elegir(rng: random.Random, acumulados: list[float]) -> int:
+    return bisect(acumulados, rng.random() * acumulados[-1])
+
+
+def _poisson(rng: random.Random, media: float) -> int:
+    # Suficiente para medias chicas; con medias grandes se aproxima por la normal.
+    if media > 30:
+        return max(0, round(rng.gauss(media, math.sqrt(media))))
+    limite, cantidad, producto = math.exp(-media), 0, rng.random()
+    while producto > limite:
+        cantidad += 1
+        producto *= rng.random()
+    return cantidad
+
+
+def _precio(producto_id: int) -> float:
+    return round(0.5 + producto_id * 7_919 % 1_500 / 100, 2)
@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session
 from app.models.deposito import Deposito
 from app.models.producto import Producto
 from app.schemas.deposito import DepositoCreate, DepositoUpdate
+from app.services import metricas_service
 
 
 def list_depositos_with_counts(db: Session) -> Sequence[tuple[Deposito, int]]:
@@ -32,6 +33,7 @@ def get_deposito_or_404(db: Session, deposito_id: int) -> Deposito:
 def create_deposito(db: Session, deposito_in: DepositoCreate) -> Deposito:
     deposito = Deposito(**deposito_in.model_dump())
     db.add(deposito)
+    metricas_service.acumular(db, cantidad_depositos=1)
     db.commit()
     db.refresh(deposito)
     return deposito
@@ -55,6 +57,7 @@ def delete_deposito(db: Session, deposito: Deposito) -> None:
             detail=f"No se puede eliminar un depósito con productos asociados ({productos_asociados})",
         )
     db.delete(deposito)
+    metricas_service.acumular(db, cantidad_depositos=-1)
     db.commit()
 
 
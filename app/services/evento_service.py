@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import Sequence
 
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
+from app.models.alquiler import Alquiler
+from app.models.cliente import Cliente
 from app.models.evento import Evento
 from app.schemas.evento import EventoCreate, EventoUpdate
+from app.services.pagination import DEFAULT_LIMIT, build_page, paginate_query
+
+_LOAD_OPTIONS = (joinedload(Evento.cliente).load_only(Cliente.nombre),)
 
 
 def list_eventos(
@@ -17,8 +21,10 @@ def list_eventos(
     cliente_id: int | None = None,
     fecha_desde: date | None = None,
     fecha_hasta: date | None = None,
-) -> Sequence[Evento]:
-    query = db.query(Evento)
+    cursor: str | None = None,
+    limit: int = DEFAULT_LIMIT,
+) -> tuple[list[Evento], str | None]:
+    query = db.query(Evento).options(*_LOAD_OPTIONS)
 
     if estado:
         query = query.filter(Evento.estado == estado)
@@ -29,11 +35,12 @@ def list_eventos(
     if fecha_hasta:
         query = query.filter(Evento.fecha_evento <= fecha_hasta)
 
-    return query.order_by(Evento.fecha_evento).all()
+    query = paginate_query(query, orden=Evento.fecha_evento, id_columna=Evento.id, cursor=cursor, limit=limit)
+    return build_page(query.all(), limit=limit, clave=lambda evento: (evento.fecha_evento, evento.id))
 
 
 def get_evento_or_404(db: Session, evento_id: int) -> Evento:
-    evento = db.query(Evento).filter(Evento.id == evento_id).first()
+    evento = db.query(Evento).options(*_LOAD_OPTIONS).filter(Evento.id == evento_id).first()
     if not evento:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Evento no encontrado")
     return evento
@@ -42,23 +49,24 @@ def get_evento_or_404(db: Session, evento_id: int) -> Evento:
 def create_evento(db: Session, evento_in: EventoCreate) -> Evento:
     evento = Evento(**evento_in.model_dump())
     db.add(evento)
+    db.flush()
+    evento_id = evento.id
     db.commit()
-    db.refresh(evento)
-    return evento
+    return get_evento_or_404(db, evento_id)
 
 
 def update_evento(db: Session, evento: Evento, evento_in: EventoUpdate) -> Evento:
     data = evento_in.model_dump(exclude_unset=True)
     for field, value in data.items():
         setattr(evento, field, value)
+    evento_id = evento.id
     db.add(evento)
     db.commit()
-    db.refresh(evento)
-    return evento
+    return get_evento_or_404(db, evento_id)
 
 
 def delete_evento(db: Session, evento: Evento) -> None:
-    if evento.alquileres:
+    if db.query(Alquiler.id).filter(Alquiler.evento_id == evento.id).first():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Evento con alquileres asociados")
     db.delete(evento)
     db.commit()
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Sequence
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+from app.db.session import async_engine, replica_async_engine
+
+FORMATOS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+FILAS_POR_LOTE = 2_000
+
+
+def respuesta_exportacion(consulta: Select, formato: str, nombre: str, *, replica: bool) -> StreamingResponse:
+    """Exporta el resultado de `consulta` a medida que se lee, con memoria constante sin importar su tamaño.
+
+    `replica` es la misma decisión que toma `get_read_db` (`app.api.deps.leer_de_replica`).
+    """
+    return StreamingResponse(
+        _generar(consulta, formato, replica),
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'},
+    )
+
+
+async def _generar(consulta: Select, formato: str, replica: bool) -> AsyncIterator[bytes]:
+    # La respuesta sigue emitiéndose después de cerrar las sesiones de los endpoints: el generador abre su propia
+    # conexión y la mantiene solo mientras dura el cursor del lado del servidor.
+    engine = replica_async_engine if replica and replica_async_engine is not None else async_engine
+    async with engine.connect() as conn:
+        resultado = await conn.stream(consulta.execution_options(yield_per=FILAS_POR_LOTE))
+        columnas = list(resultado.keys())
+        if formato == "csv":
+            yield _csv([columnas])
+        async for filas in resultado.partitions():
+            if formato == "csv":
+                yield _csv([[_texto(valor) for valor in fila] for fila in filas])
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(columnas, fila)), default=_json, ensure_ascii=False) + "\n" for fila in filas
+                ).encode()
+
+
+def _csv(filas: Sequence[Sequence[Any]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(filas)
+    return buffer.getvalue().encode()
+
+
+def _texto(valor: Any) -> Any:
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def _json(valor: Any) -> Any:
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
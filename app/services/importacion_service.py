@@ -0,0 +1,380 @@
+"""Importación masiva de productos desde CSV o XLSX, con upsert por `codigo`.
+
+La primera fila del archivo nombra las columnas (las mismas de `ProductoUpdate`; `codigo` es obligatoria). Las filas
+se validan por lotes, los depósitos se resuelven una sola vez y cada lote se carga con COPY en una tabla temporal
+desde la que se insertan los productos nuevos y se actualizan los existentes; en estos, una celda vacía conserva el
+valor actual. Cada lote se confirma por separado y las filas inválidas se informan con su número sin frenar al resto.
+Leer XLSX requiere el extra `xlsx` (openpyxl).
+
+    python -m app.services.importacion_service catalogo.csv
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import sys
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+import psycopg
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Integer,
+    MetaData,
+    Row,
+    String,
+    Table,
+    any_,
+    func,
+    literal,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models.deposito import Deposito
+from app.models.producto import Producto
+from app.schemas.producto import ProductoCreate, ProductoUpdate
+from app.services import (
+    deposito_service,
+    metricas_service,
+    movimiento_service,
+    producto_service,
+    stock_historico_service,
+)
+
+COLUMNAS = tuple(ProductoUpdate.model_fields)
+COLUMNAS_STOCK = ("stock_actual", "stock_minimo", "stock_rentado", "stock_disponible")
+FILAS_POR_LOTE = 5_000
+
+_LARGOS = {
+    columna.name: columna.type.length
+    for columna in Producto.__table__.c
+    if columna.name in COLUMNAS and getattr(columna.type, "length", None)
+}
+# Rango de las columnas integer de Postgres: un valor fuera de él haría fallar el COPY de todo el lote.
+_ENTEROS = tuple(
+    columna.name for columna in Producto.__table__.c if columna.name in COLUMNAS and isinstance(columna.type, Integer)
+)
+_ENTERO_MAXIMO = 2**31 - 1
+
+# Sin restricciones: las filas llegan ya validadas y las de productos existentes solo traen las columnas a cambiar
+# (más el stock resultante completo).
+_STAGING = Table(
+    "productos_importacion",
+    MetaData(),
+    Column("fila", Integer, primary_key=True),
+    Column("nuevo", Boolean, nullable=False),
+    *(Column(columna.name, columna.type) for columna in Producto.__table__.c if columna.name in COLUMNAS),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+
+def leer_archivo(nombre: str, contenido: bytes) -> Iterator[tuple[int, dict[str, str]]]:
+    """Valida el encabezado y devuelve las filas como (número de fila en la planilla, celdas no vacías)."""
+    filas = _filas_xlsx(contenido) if nombre.lower().endswith(".xlsx") else _filas_csv(contenido)
+    encabezado = [(celda or "").strip().lower() for celda in next(filas, [])]
+    if "codigo" not in encabezado:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El archivo debe tener una columna codigo")
+    desconocidas = set(encabezado) - set(COLUMNAS) - {""}
+    if desconocidas:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Columnas desconocidas: {', '.join(sorted(desconocidas))}",
+        )
+
+    def _datos() -> Iterator[tuple[int, dict[str, str]]]:
+        for numero, celdas in enumerate(filas, start=2):
+            datos = {columna: celda for columna, celda in zip(encabezado, celdas) if columna and celda}
+            if datos:
+                yield numero, datos
+
+    return _datos()
+
+
+def importar_archivo(nombre: str, contenido: bytes, *, usuario_id: int | None = None) -> dict:
+    """Importa el archivo en una sesión propia (síncrona, para poder usar COPY) y devuelve el resumen."""
+    filas = leer_archivo(nombre, contenido)
+    with SessionLocal(info={"usuario_id": usuario_id} if usuario_id is not None else {}) as db:
+        return importar_productos(db, filas, usuario_id=usuario_id)
+
+
+def importar_productos(
+    db: Session,
+    filas: Iterable[tuple[int, dict[str, Any]]],
+    *,
+    usuario_id: int | None = None,
+) -> dict:
+    """Crea o actualiza por `codigo` los productos de `filas`, confirmando cada lote de `FILAS_POR_LOTE`."""
+    resumen = {"procesadas": 0, "creados": 0, "actualizados": 0, "errores": []}
+    depositos = set(db.scalars(select(Deposito.id)))
+    try:
+        deposito_unico: int | None = deposito_service.get_single_deposito_id(db)
+        sin_deposito = ""
+    except HTTPException as exc:
+        deposito_unico, sin_deposito = None, exc.detail
+
+    vistos: dict[str, int] = {}
+    lote: list[tuple[int, dict[str, Any]]] = []
+    for numero, datos in filas:
+        resumen["procesadas"] += 1
+        codigo = datos.get("codigo")
+        if codigo is None:
+            resumen["errores"].append(_error(numero, None, "codigo: obligatorio"))
+        elif codigo in vistos:
+            resumen["errores"].append(_error(numero, codigo, f"Código repetido en el archivo (fila {vistos[codigo]})"))
+        else:
+            vistos[codigo] = numero
+            lote.append((numero, datos))
+        if len(lote) >= FILAS_POR_LOTE:
+            _importar_lote(db, lote, depositos, deposito_unico, sin_deposito, resumen, usuario_id)
+            lote = []
+    if lote:
+        _importar_lote(db, lote, depositos, deposito_unico, sin_deposito, resumen, usuario_id)
+    resumen["errores"].sort(key=lambda error: error["fila"])
+    return resumen
+
+
+def _importar_lote(
+    db: Session,
+    lote: list[tuple[int, dict[str, Any]]],
+    depositos: set[int],
+    deposito_unico: int | None,
+    sin_deposito: str,
+    resumen: dict,
+    usuario_id: int | None,
+) -> None:
+    # Bloquea los existentes antes de leer su stock: los deltas del ledger parten de valores que no cambian después.
+    previos = {
+        fila.codigo: fila
+        for fila in db.execute(
+            select(
+                Producto.id,
+                Producto.codigo,
+                Producto.stock_actual,
+                Producto.stock_minimo,
+                Producto.stock_rentado,
+                Producto.stock_disponible,
+            )
+            .where(Producto.codigo == any_(literal([datos["codigo"] for _, datos in lote], ARRAY(String))))
+            .order_by(Producto.id)
+            .with_for_update()
+        )
+    }
+
+    validas = []
+    for numero, datos in lote:
+        previo = previos.get(datos["codigo"])
+        try:
+            validas.append(_resolver(numero, datos, previo, depositos, deposito_unico, sin_deposito))
+        except ValueError as exc:
+            resumen["errores"].append(_error(numero, datos["codigo"], str(exc)))
+    if not validas:
+        db.rollback()
+        return
+
+    try:
+        _STAGING.create(db.connection())
+        _copiar(db, validas)
+        creados = dict(
+            db.execute(
+                insert(Producto)
+                .from_select(COLUMNAS, select(*(_STAGING.c[columna] for columna in COLUMNAS)).where(_STAGING.c.nuevo))
+                .on_conflict_do_nothing(index_elements=[Producto.codigo])
+                .returning(Producto.codigo, Producto.id)
+            ).all()
+        )
+        db.execute(
+            update(Producto)
+            .where(Producto.codigo == _STAGING.c.codigo, _STAGING.c.nuevo.is_(False))
+            .values(
+                {
+                    columna: func.coalesce(_STAGING.c[columna], Producto.__table__.c[columna])
+                    for columna in COLUMNAS
+                    if columna != "codigo"
+                }
+            )
+            .execution_options(synchronize_session=False)
+        )
+    except (DBAPIError, psycopg.Error) as exc:
+        # El COPY corre sobre el cursor de psycopg: sus errores no llegan envueltos en DBAPIError.
+        db.rollback()
+        detalle = f"Lote rechazado por la base: {getattr(exc, 'orig', exc)}"
+        resumen["errores"].extend(_error(fila["fila"], fila["codigo"], detalle) for fila in validas)
+        return
+
+    cambios = []
+    stock_total = alertas = 0
+    for fila in validas:
+        previo = previos.get(fila["codigo"])
+        if previo is None:
+            if fila["codigo"] not in creados:
+                # Otra operación dio de alta el mismo código después de leer los existentes.
+                resumen["errores"].append(
+                    _error(fila["fila"], fila["codigo"], "Código dado de alta durante la importación; reintentar")
+                )
+                continue
+            producto_id, actual_previo, rentado_previo, alerta_previa = creados[fila["codigo"]], 0, 0, False
+            resumen["creados"] += 1
+        else:
+            producto_id, actual_previo, rentado_previo = previo.id, previo.stock_actual, previo.stock_rentado
+            alerta_previa = previo.stock_disponible <= previo.stock_minimo
+            resumen["actualizados"] += 1
+        cambios.append((producto_id, fila["stock_actual"] - actual_previo, fila["stock_rentado"] - rentado_previo))
+        stock_total += fila["stock_actual"] - actual_previo
+        alertas += int(fila["stock_disponible"] <= fila["stock_minimo"]) - int(alerta_previa)
+
+    metricas_service.acumular(
+        db, total_productos=len(creados), stock_total=stock_total, cantidad_alertas_stock_bajo=alertas
+    )
+    movimiento_service.registrar_cambios_en_ledger(
+        db, cambios, referencia="Importación de productos", usuario_id=usuario_id
+    )
+    # Como en el alta, cada producto nuevo parte de un snapshot; los existentes solo si cambió su stock.
+    nuevos = set(creados.values())
+    stock_historico_service.registrar_snapshots(
+        db, [producto_id for producto_id, actual, rentado in cambios if producto_id in nuevos or actual or rentado]
+    )
+    db.commit()
+
+
+def _resolver(
+    numero: int,
+    datos: dict[str, Any],
+    previo: Row | None,
+    depositos: set[int],
+    deposito_unico: int | None,
+    sin_deposito: str,
+) -> dict[str, Any]:
+    """Valida la fila y devuelve los valores a cargar; para un existente, el stock resultante completo."""
+    try:
+        if previo is None:
+            valores = ProductoCreate.model_validate(datos).model_dump()
+        else:
+            valores = ProductoUpdate.model_validate(datos).model_dump(exclude_unset=True)
+    except ValidationError as exc:
+        raise ValueError("; ".join(_mensaje(error) for error in exc.errors())) from None
+
+    for columna, largo in _LARGOS.items():
+        if valores.get(columna) and len(valores[columna]) > largo:
+            raise ValueError(f"{columna}: supera los {largo} caracteres")
+    for columna in _ENTEROS:
+        if valores.get(columna) is not None and not -_ENTERO_MAXIMO - 1 <= valores[columna] <= _ENTERO_MAXIMO:
+            raise ValueError(f"{columna}: fuera de rango (máximo {_ENTERO_MAXIMO})")
+
+    if previo is None:
+        if valores["deposito_principal_id"] is None:
+            if deposito_unico is None:
+                raise ValueError(sin_deposito)
+            valores["deposito_principal_id"] = deposito_unico
+        if valores["stock_disponible"] is None:
+            valores["stock_disponible"] = max(valores["stock_actual"] - valores["stock_rentado"], 0)
+    else:
+        # Mismo criterio que update_producto: el disponible se recalcula si cambia el stock y no viene informado.
+        for columna in COLUMNAS_STOCK:
+            valores.setdefault(columna, getattr(previo, columna))
+        if "stock_disponible" not in datos and {"stock_actual", "stock_rentado"} & datos.keys():
+            valores["stock_disponible"] = max(valores["stock_actual"] - valores["stock_rentado"], 0)
+    if "deposito_principal_id" in valores and valores["deposito_principal_id"] not in depositos:
+        raise ValueError("Depósito no encontrado")
+    try:
+        producto_service.validar_stock(valores["stock_actual"], valores["stock_rentado"], valores["stock_disponible"])
+    except HTTPException as exc:
+        raise ValueError(exc.detail) from None
+    return {**dict.fromkeys(COLUMNAS), **valores, "fila": numero, "nuevo": previo is None}
+
+
+def _copiar(db: Session, filas: list[dict[str, Any]]) -> None:
+    columnas = [columna.name for columna in _STAGING.c]
+    with (
+        db.connection().connection.driver_connection.cursor() as cursor,
+        cursor.copy(f"COPY {_STAGING.name} ({', '.join(columnas)}) FROM STDIN") as copia,
+    ):
+        for fila in filas:
+            copia.write_row([fila[columna] for columna in columnas])
+
+
+def _filas_csv(contenido: bytes) -> Iterator[list[str]]:
+    try:
+        texto = contenido.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El CSV debe estar codificado en UTF-8 (en Excel: Guardar como «CSV UTF-8»)",
+        ) from None
+    try:
+        dialecto = csv.Sniffer().sniff(texto[:4096].split("\n", 1)[0], delimiters=",;\t")
+    except csv.Error:
+        dialecto = csv.excel
+    for celdas in csv.reader(io.StringIO(texto), dialecto):
+        yield [celda.strip() for celda in celdas]
+
+
+def _filas_xlsx(contenido: bytes) -> Iterator[list[str]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Importar XLSX requiere instalar el extra xlsx (openpyxl)",
+        ) from None
+    libro = load_workbook(io.BytesIO(contenido), read_only=True, data_only=True)
+    try:
+        for celdas in libro.active.iter_rows(values_only=True):
+            yield [_celda(celda) for celda in celdas]
+    finally:
+        libro.close()
+
+
+def _celda(valor: Any) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, bool):
+        return "true" if valor else "false"
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+
+def _mensaje(error: dict) -> str:
+    campo = ".".join(str(parte) for parte in error["loc"])
+    return f"{campo}: {'obligatorio' if error['type'] == 'missing' else error['msg']}"
+
+
+def _error(fila: int, codigo: str | None, error: str) -> dict:
+    return {"fila": fila, "codigo": codigo, "error": error}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Importa productos desde un CSV o XLSX (upsert por codigo)")
+    parser.add_argument("archivo", help="Ruta del CSV o XLSX")
+    parser.add_argument("--salida", help="Archivo donde guardar el resumen JSON (por defecto, stdout)")
+    args = parser.parse_args()
+
+    with open(args.archivo, "rb") as archivo:
+        contenido = archivo.read()
+    try:
+        resumen = importar_archivo(args.archivo, contenido)
+    except HTTPException as exc:
+        print(exc.detail, file=sys.stderr)
+        return 2
+    contenido_json = json.dumps(resumen, ensure_ascii=False, indent=2)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as salida:
+            salida.write(contenido_json + "\n")
+    else:
+        print(contenido_json)
+    return 1 if resumen["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
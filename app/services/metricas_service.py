@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import random
+
+from sqlalchemy import delete, event, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models.alquiler import Alquiler
+from app.models.deposito import Deposito
+from app.models.metrica import MetricaDashboard
+from app.models.producto import Producto
+from app.services.disponibilidad_service import ESTADOS_RESERVA
+
+METRICAS_SHARDS = 16
+CLAVES = (
+    "total_productos",
+    "stock_total",
+    "cantidad_alertas_stock_bajo",
+    "cantidad_depositos",
+    "ordenes_alquiler_activas",
+)
+
+_PENDIENTES = "metricas_pendientes"
+
+
+def acumular(db: Session, **deltas: int) -> None:
+    """Suma variaciones de métricas a la transacción en curso; se vuelcan a la tabla justo antes del commit."""
+    pendientes = db.info.setdefault(_PENDIENTES, {})
+    for clave, delta in deltas.items():
+        if delta:
+            pendientes[clave] = pendientes.get(clave, 0) + delta
+
+
+def obtener_metricas(db: Session) -> dict[str, int]:
+    filas = db.execute(
+        select(MetricaDashboard.clave, func.sum(MetricaDashboard.valor)).group_by(MetricaDashboard.clave)
+    ).all()
+    metricas = dict.fromkeys(CLAVES, 0)
+    metricas.update({clave: int(total) for clave, total in filas})
+    return metricas
+
+
+def reconciliar_metricas(db: Session) -> dict[str, int]:
+    """Recalcula las métricas desde las tablas de origen y devuelve la deriva corregida por clave.
+
+    El bloqueo EXCLUSIVE espera a las transacciones que ya volcaron sus deltas y hace esperar a las que aún no lo
+    hicieron, de modo que ninguna variación se cuenta dos veces ni se pierde.
+    """
+    db.execute(text("LOCK TABLE metricas_dashboard IN EXCLUSIVE MODE"))
+    actuales = obtener_metricas(db)
+    reales = _calcular_metricas(db)
+
+    db.execute(delete(MetricaDashboard))
+    db.execute(insert(MetricaDashboard), [{"clave": clave, "shard": 0, "valor": valor} for clave, valor in reales.items()])
+    db.commit()
+    return {clave: reales[clave] - actuales[clave] for clave in CLAVES if reales[clave] != actuales[clave]}
+
+
+def _calcular_metricas(db: Session) -> dict[str, int]:
+    fila = db.execute(
+        select(
+            select(func.count(Producto.id)).scalar_subquery().label("total_productos"),
+            select(func.coalesce(func.sum(Producto.stock_actual), 0)).scalar_subquery().label("stock_total"),
+            select(func.count(Producto.id))
+            .where(Producto.stock_disponible <= Producto.stock_minimo)
+            .scalar_subquery()
+            .label("cantidad_alertas_stock_bajo"),
+            select(func.count(Deposito.id)).scalar_subquery().label("cantidad_depositos"),
+            select(func.count(Alquiler.id))
+            .where(Alquiler.estado.in_(ESTADOS_RESERVA))
+            .scalar_subquery()
+            .label("ordenes_alquiler_activas"),
+        )
+    ).one()
+    return {clave: int(valor) for clave, valor in fila._mapping.items()}
+
+
+@event.listens_for(Session, "before_commit")
+def _volcar_pendientes(session: Session) -> None:
+    pendientes = session.info.pop(_PENDIENTES, None)
+    if not pendientes:
+        return
+    # Un único shard por transacción y filas ordenadas por clave: los bloqueos se toman siempre en el mismo orden.
+    shard = random.randrange(METRICAS_SHARDS)
+    stmt = insert(MetricaDashboard).values(
+        [{"clave": clave, "shard": shard, "valor": valor} for clave, valor in sorted(pendientes.items())]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MetricaDashboard.clave, MetricaDashboard.shard],
+        set_={"valor": MetricaDashboard.valor + stmt.excluded.valor},
+    )
+    session.execute(stmt)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _descartar_pendientes(session: Session, transaction) -> None:
+    # Rollback o close sin commit: las variaciones no deben pasar a la próxima transacción de la misma sesión.
+    if transaction.parent is None:
+        session.info.pop(_PENDIENTES, None)
+
+
+def main() -> None:
+    db = SessionLocal()
+    try:
+        correcciones = reconciliar_metricas(db)
+    finally:
+        db.close()
+    if correcciones:
+        print(f"Métricas corregidas: {correcciones}")
+    else:
+        print("Métricas sin deriva")
+
+
+if __name__ == "__main__":
+    main()
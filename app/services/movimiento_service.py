@@ -1,17 +1,40 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Sequence
+from collections.abc import Iterable, Sequence
+from datetime import UTC, datetime, timedelta
+from typing import NoReturn
 
 from fastapi import HTTPException, status
+from sqlalchemy import (
+    Integer,
+    Row,
+    Select,
+    case,
+    func,
+    insert,
+    literal,
+    null,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.models.movimiento import MovimientoStock
 from app.models.producto import Producto
-from app.schemas.movimiento import MovimientoCreate
-from app.services import deposito_service
+from app.schemas.movimiento import MovimientoCreate, MovimientoRead
+from app.services import (
+    deposito_service,
+    metricas_service,
+    reportes_service,
+    stock_historico_service,
+)
+from app.services.pagination import DEFAULT_LIMIT, build_page, paginate_query
 
 VALID_TYPES = {"INGRESO", "EGRESO", "AJUSTE", "ALQUILER", "DEVOLUCION"}
+_COLUMNAS_LISTADO = tuple(getattr(MovimientoStock, campo) for campo in MovimientoRead.model_fields)
 
 
 def list_movimientos(
@@ -22,24 +45,64 @@ def list_movimientos(
     tipo: str | None = None,
     producto_id: int | None = None,
     deposito_id: int | None = None,
-) -> Sequence[MovimientoStock]:
-    query = db.query(MovimientoStock)
+    cursor: str | None = None,
+    limit: int = DEFAULT_LIMIT,
+) -> tuple[list[Row], str | None]:
+    """Lista movimientos desde `fecha_desde`, por defecto los últimos `MOVIMIENTOS_DIAS_POR_DEFECTO` días.
 
-    if fecha_desde:
-        query = query.filter(MovimientoStock.fecha >= fecha_desde)
-    if fecha_hasta:
-        query = query.filter(MovimientoStock.fecha <= fecha_hasta)
-    if tipo:
-        query = query.filter(MovimientoStock.tipo == tipo.upper())
-    if producto_id:
-        query = query.filter(MovimientoStock.producto_id == producto_id)
-    if deposito_id:
-        query = query.filter(
-            (MovimientoStock.deposito_origen_id == deposito_id)
-            | (MovimientoStock.deposito_destino_id == deposito_id)
+    La tabla está particionada por mes: acotar siempre la fecha permite descartar las particiones viejas.
+    """
+    if fecha_desde is None:
+        fecha_desde = datetime.now(UTC) - timedelta(days=settings.movimientos_dias_por_defecto)
+    query = select(*_COLUMNAS_LISTADO).where(
+        *_filtros(
+            fecha_desde=fecha_desde,
+            fecha_hasta=fecha_hasta,
+            tipo=tipo,
+            producto_id=producto_id,
+            deposito_id=deposito_id,
         )
+    )
+    query = paginate_query(
+        query, orden=MovimientoStock.fecha, id_columna=MovimientoStock.id, cursor=cursor, limit=limit, descendente=True
+    )
+    return build_page(db.execute(query).all(), limit=limit, clave=lambda fila: (fila.fecha, fila.id))
 
-    return query.order_by(MovimientoStock.fecha.desc()).all()
+
+def consulta_exportacion(
+    *,
+    fecha_desde: datetime | None = None,
+    fecha_hasta: datetime | None = None,
+    tipo: str | None = None,
+    producto_id: int | None = None,
+    deposito_id: int | None = None,
+) -> Select:
+    """Columnas del ledger para exportar, en orden cronológico y sin ventana de fechas por defecto."""
+    return (
+        select(
+            MovimientoStock.id,
+            MovimientoStock.fecha,
+            MovimientoStock.producto_id,
+            MovimientoStock.tipo,
+            MovimientoStock.cantidad,
+            MovimientoStock.ajuste_positivo,
+            MovimientoStock.deposito_origen_id,
+            MovimientoStock.deposito_destino_id,
+            MovimientoStock.referencia,
+            MovimientoStock.observaciones,
+            MovimientoStock.usuario_id,
+        )
+        .where(
+            *_filtros(
+                fecha_desde=fecha_desde,
+                fecha_hasta=fecha_hasta,
+                tipo=tipo,
+                producto_id=producto_id,
+                deposito_id=deposito_id,
+            )
+        )
+        .order_by(MovimientoStock.fecha, MovimientoStock.id)
+    )
 
 
 def get_movimiento_or_404(db: Session, movimiento_id: int) -> MovimientoStock:
@@ -56,74 +119,274 @@ def create_movimiento(
     usuario_id: int | None = None,
     auto_commit: bool = True,
 ) -> MovimientoStock:
+    movimientos = create_movimientos_bulk(db, [movimiento_in], usuario_id=usuario_id, auto_commit=auto_commit)
+    return movimientos[0]
+
+
+def create_movimientos_bulk(
+    db: Session,
+    movimientos_in: Sequence[MovimientoCreate],
+    *,
+    usuario_id: int | None = None,
+    auto_commit: bool = True,
+) -> list[MovimientoStock]:
+    """Registra un lote de movimientos con semántica todo-o-nada.
+
+    El stock de todos los productos se actualiza en un solo UPDATE condicional que bloquea las filas en orden
+    ascendente de id: confirmaciones concurrentes toman los bloqueos siempre en el mismo orden y no pueden
+    interbloquearse.
+    """
+    if not movimientos_in:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No hay movimientos para registrar")
+    tipos = [_validar_movimiento(movimiento_in) for movimiento_in in movimientos_in]
+
+    delta_stock, delta_alertas, snapshot_pendiente = _aplicar_movimientos(db, movimientos_in, tipos)
+    metricas_service.acumular(db, stock_total=delta_stock, cantidad_alertas_stock_bajo=delta_alertas)
+
+    default_deposito_id = deposito_service.get_single_deposito_id_if_any(db)
+    ahora = datetime.now(UTC)
+    filas = []
+    for movimiento_in, tipo in zip(movimientos_in, tipos):
+        movimiento_data = movimiento_in.model_dump()
+        # El signo del ajuste se guarda explícito para poder reproducir el ledger.
+        movimiento_data["ajuste_positivo"] = movimiento_in.ajuste_positivo is not False if tipo == "AJUSTE" else None
+        if default_deposito_id:
+            if movimiento_data.get("deposito_origen_id") is None:
+                movimiento_data["deposito_origen_id"] = default_deposito_id
+            if movimiento_data.get("deposito_destino_id") is None:
+                movimiento_data["deposito_destino_id"] = default_deposito_id
+        movimiento_data["tipo"] = tipo
+        if movimiento_data.get("fecha") is None:
+            movimiento_data["fecha"] = ahora
+        if usuario_id:
+            movimiento_data["usuario_id"] = usuario_id
+        filas.append(movimiento_data)
+
+    movimientos = list(
+        db.scalars(insert(MovimientoStock).returning(MovimientoStock, sort_by_parameter_order=True), filas)
+    )
+    reportes_service.acumular_movimientos(db, movimientos)
+    # Un movimiento con fecha explícita puede ser anterior a snapshots ya registrados del producto.
+    fechados = [
+        (movimiento.producto_id, movimiento.fecha, *_deltas(tipo, movimiento.cantidad, movimiento.ajuste_positivo)[:2])
+        for movimiento, movimiento_in, tipo in zip(movimientos, movimientos_in, tipos)
+        if movimiento_in.fecha is not None
+    ]
+    if fechados:
+        stock_historico_service.corregir_snapshots(db, fechados)
+    if snapshot_pendiente:
+        stock_historico_service.registrar_snapshots(db, snapshot_pendiente, fecha=ahora)
+
+    if auto_commit:
+        # El RETURNING ya trajo todas las columnas: fuera de la sesión el commit no las expira y no hace falta
+        # releerlas de la tabla particionada.
+        for movimiento in movimientos:
+            db.expunge(movimiento)
+        db.commit()
+    return movimientos
+
+
+def registrar_en_ledger(
+    db: Session,
+    producto_id: int,
+    *,
+    delta_actual: int,
+    delta_rentado: int,
+    referencia: str,
+    usuario_id: int | None = None,
+) -> None:
+    """Deja en el ledger un cambio de stock ya aplicado al producto (alta o edición directa) sin volver a aplicarlo.
+
+    Así la suma de `movimientos_stock` sigue coincidiendo con los contadores del producto.
+    """
+    registrar_cambios_en_ledger(
+        db, [(producto_id, delta_actual, delta_rentado)], referencia=referencia, usuario_id=usuario_id
+    )
+
+
+def registrar_cambios_en_ledger(
+    db: Session,
+    cambios: Iterable[tuple[int, int, int]],
+    *,
+    referencia: str,
+    usuario_id: int | None = None,
+) -> None:
+    """Como `registrar_en_ledger` para varios (producto_id, delta_actual, delta_rentado), en una sola sentencia que
+    también suma los movimientos al rollup diario."""
+    columnas = ([], [], [])
+    for cambio in cambios:
+        if cambio[1] or cambio[2]:
+            for columna, valor in zip(columnas, cambio):
+                columna.append(valor)
+    if not columnas[0]:
+        return
+
+    cambio = (
+        func.unnest(*(literal(valores, ARRAY(Integer)) for valores in columnas))
+        .table_valued("producto_id", "delta_actual", "delta_rentado")
+        .render_derived()
+    )
+    ajustes = select(
+        cambio.c.producto_id,
+        literal("AJUSTE").label("tipo"),
+        func.abs(cambio.c.delta_actual).label("cantidad"),
+        (cambio.c.delta_actual > 0).label("ajuste_positivo"),
+    ).where(cambio.c.delta_actual != 0)
+    rentados = select(
+        cambio.c.producto_id,
+        case((cambio.c.delta_rentado > 0, "ALQUILER"), else_="DEVOLUCION"),
+        func.abs(cambio.c.delta_rentado),
+        null(),
+    ).where(cambio.c.delta_rentado != 0)
+    filas = union_all(ajustes, rentados).subquery()
+    insertados = (
+        insert(MovimientoStock)
+        .from_select(
+            ["producto_id", "tipo", "cantidad", "ajuste_positivo", "referencia", "usuario_id"],
+            select(filas, literal(referencia), literal(usuario_id, Integer)),
+        )
+        .returning(
+            MovimientoStock.fecha,
+            MovimientoStock.producto_id,
+            MovimientoStock.tipo,
+            MovimientoStock.cantidad,
+            MovimientoStock.ajuste_positivo,
+            MovimientoStock.deposito_origen_id,
+            MovimientoStock.deposito_destino_id,
+        )
+        .cte("insertados")
+    )
+    reportes_service.acumular_insertados(db, insertados)
+
+
+def _validar_movimiento(movimiento_in: MovimientoCreate) -> str:
     tipo = movimiento_in.tipo.upper()
     if tipo not in VALID_TYPES:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tipo de movimiento inválido")
     if movimiento_in.cantidad <= 0:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cantidad debe ser positiva")
+    return tipo
 
-    producto = db.query(Producto).filter(Producto.id == movimiento_in.producto_id).with_for_update().first()
-    if not producto:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado")
 
-    cantidad = movimiento_in.cantidad
-
-    if tipo == "INGRESO":
-        producto.stock_actual += cantidad
-        producto.stock_disponible += cantidad
-    elif tipo == "EGRESO":
-        _ensure_stock(producto, cantidad)
-        producto.stock_actual -= cantidad
-        producto.stock_disponible -= cantidad
-    elif tipo == "AJUSTE":
-        if movimiento_in.ajuste_positivo is False:
-            _ensure_stock(producto, cantidad)
-            producto.stock_actual -= cantidad
-            producto.stock_disponible = max(producto.stock_disponible - cantidad, 0)
-        else:
-            producto.stock_actual += cantidad
-            producto.stock_disponible += cantidad
-    elif tipo == "ALQUILER":
-        if producto.stock_disponible < cantidad:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Stock insuficiente para alquiler")
-        producto.stock_rentado += cantidad
-        producto.stock_disponible -= cantidad
-    elif tipo == "DEVOLUCION":
-        if producto.stock_rentado < cantidad:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cantidad devuelta mayor al rentado")
-        producto.stock_rentado -= cantidad
-        producto.stock_disponible += cantidad
-
-    max_disponible = max(producto.stock_actual - producto.stock_rentado, 0)
-    producto.stock_disponible = max(min(producto.stock_disponible, max_disponible), 0)
-
-    movimiento_data = movimiento_in.model_dump(exclude={"ajuste_positivo"})
+def _aplicar_movimientos(
+    db: Session, movimientos_in: Sequence[MovimientoCreate], tipos: Sequence[str]
+) -> tuple[int, int, set[int]]:
+    """Aplica el lote y devuelve la variación de stock total y de alertas de stock bajo que produjo, y los productos
+    que ya acumularon movimientos suficientes para un snapshot nuevo.
 
-    default_deposito_id = deposito_service.get_single_deposito_id_if_any(db)
-    if default_deposito_id:
-        if movimiento_data.get("deposito_origen_id") is None:
-            movimiento_data["deposito_origen_id"] = default_deposito_id
-        if movimiento_data.get("deposito_destino_id") is None:
-            movimiento_data["deposito_destino_id"] = default_deposito_id
-
-    movimiento_data["tipo"] = tipo
-    if movimiento_data.get("fecha") is None:
-        movimiento_data["fecha"] = datetime.now(timezone.utc)
-    if usuario_id:
-        movimiento_data["usuario_id"] = usuario_id
-
-    movimiento = MovimientoStock(**movimiento_data)
-    db.add(movimiento)
-    db.add(producto)
+    Las variaciones se suman por producto y se aplican con un UPDATE ... FROM unnest(...) cuyas condiciones de stock
+    van en el WHERE: si algún producto no las cumple queda sin actualizar y se rechaza el lote.
+    """
+    # (actual, rentado, disponible, movimientos) por producto.
+    deltas: dict[int, list[int]] = {}
+    for movimiento_in, tipo in zip(movimientos_in, tipos):
+        delta = deltas.setdefault(movimiento_in.producto_id, [0, 0, 0, 0])
+        for posicion, valor in enumerate((*_deltas(tipo, movimiento_in.cantidad, movimiento_in.ajuste_positivo), 1)):
+            delta[posicion] += valor
+    ids = sorted(deltas)
+
+    lote = (
+        func.unnest(
+            literal(ids, ARRAY(Integer)),
+            *(literal([deltas[producto_id][posicion] for producto_id in ids], ARRAY(Integer)) for posicion in range(4)),
+        )
+        .table_valued("producto_id", "delta_actual", "delta_rentado", "delta_disponible", "movimientos")
+        .render_derived()
+    )
+    # MATERIALIZED: el CTE bloquea todas las filas, en orden de id, antes de que el UPDATE las modifique.
+    bloqueados = (
+        select(Producto.id, Producto.stock_disponible.label("disponible_previo"))
+        .where(Producto.id.in_(ids))
+        .order_by(Producto.id)
+        .with_for_update()
+        .cte("bloqueados")
+        .prefix_with("MATERIALIZED")
+    )
+    nuevo_actual = Producto.stock_actual + lote.c.delta_actual
+    nuevo_rentado = Producto.stock_rentado + lote.c.delta_rentado
+    nuevo_disponible = Producto.stock_disponible + lote.c.delta_disponible
+    actualizados = db.execute(
+        update(Producto)
+        .where(
+            Producto.id == bloqueados.c.id,
+            Producto.id == lote.c.producto_id,
+            nuevo_actual >= 0,
+            nuevo_rentado >= 0,
+            nuevo_disponible >= 0,
+        )
+        .values(
+            stock_actual=nuevo_actual,
+            stock_rentado=nuevo_rentado,
+            stock_disponible=func.greatest(func.least(nuevo_disponible, nuevo_actual - nuevo_rentado), 0),
+            movimientos_sin_snapshot=Producto.movimientos_sin_snapshot + lote.c.movimientos,
+        )
+        .returning(
+            Producto.id,
+            bloqueados.c.disponible_previo,
+            Producto.stock_disponible,
+            Producto.stock_minimo,
+            Producto.movimientos_sin_snapshot,
+        )
+    ).all()
+    if len(actualizados) != len(ids):
+        rechazado = min(set(ids) - {fila.id for fila in actualizados})
+        tipos_rechazado = {
+            tipo for movimiento_in, tipo in zip(movimientos_in, tipos) if movimiento_in.producto_id == rechazado
+        }
+        _rechazar(db, rechazado, deltas[rechazado], tipos_rechazado)
+
+    delta_stock = sum(delta[0] for delta in deltas.values())
+    delta_alertas = sum(
+        int(fila.stock_disponible <= fila.stock_minimo) - int(fila.disponible_previo <= fila.stock_minimo)
+        for fila in actualizados
+    )
+    cada = settings.stock_snapshot_cada_movimientos
+    snapshot_pendiente = {fila.id for fila in actualizados if fila.movimientos_sin_snapshot >= cada > 0}
+    return delta_stock, delta_alertas, snapshot_pendiente
+
+
+def _rechazar(db: Session, producto_id: int, delta: list[int], tipos: set[str]) -> NoReturn:
+    """Responde con el motivo por el que el producto no pasó las condiciones del UPDATE (ya está bloqueado)."""
+    stock = db.execute(select(Producto.stock_rentado).where(Producto.id == producto_id)).first()
+    if stock is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado")
+    if stock.stock_rentado + delta[1] < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cantidad devuelta mayor al rentado")
+    if "ALQUILER" in tipos and delta[0] >= 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Stock insuficiente para alquiler")
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Stock insuficiente")
 
-    if auto_commit:
-        db.commit()
-        db.refresh(movimiento)
-    else:
-        db.flush()
-    return movimiento
 
+def _deltas(tipo: str, cantidad: int, ajuste_positivo: bool | None) -> tuple[int, int, int]:
+    """Devuelve la variación de (stock_actual, stock_rentado, stock_disponible) que produce un movimiento."""
+    if tipo == "INGRESO" or (tipo == "AJUSTE" and ajuste_positivo is not False):
+        return cantidad, 0, cantidad
+    if tipo in {"EGRESO", "AJUSTE"}:
+        return -cantidad, 0, -cantidad
+    if tipo == "ALQUILER":
+        return 0, cantidad, -cantidad
+    return 0, -cantidad, cantidad
 
-def _ensure_stock(producto: Producto, cantidad: int) -> None:
-    if producto.stock_actual < cantidad or producto.stock_disponible < cantidad:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Stock insuficiente")
+
+def _filtros(
+    *,
+    fecha_desde: datetime | None,
+    fecha_hasta: datetime | None,
+    tipo: str | None,
+    producto_id: int | None,
+    deposito_id: int | None,
+) -> list:
+    filtros = []
+    if fecha_desde:
+        filtros.append(MovimientoStock.fecha >= fecha_desde)
+    if fecha_hasta:
+        filtros.append(MovimientoStock.fecha <= fecha_hasta)
+    if tipo:
+        filtros.append(MovimientoStock.tipo == tipo.upper())
+    if producto_id:
+        filtros.append(MovimientoStock.producto_id == producto_id)
+    if deposito_id:
+        filtros.append(
+            (MovimientoStock.deposito_origen_id == deposito_id) | (MovimientoStock.deposito_destino_id == deposito_id)
+        )
+    return filtros
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from collections.abc import Callable, Sequence
+from datetime import date, datetime
+from typing import Any, TypeVar
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+T = TypeVar("T")
+
+
+def encode_cursor(valor: Any, id_: int) -> str:
+    if isinstance(valor, (date, datetime)):
+        valor = valor.isoformat()
+    raw = json.dumps([valor, id_], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, tipo: type) -> tuple[Any, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valor, id_ = json.loads(raw)
+        if tipo is datetime:
+            valor = datetime.fromisoformat(valor)
+        elif tipo is date:
+            valor = date.fromisoformat(valor)
+        return valor, int(id_)
+    except (ValueError, TypeError, binascii.Error) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido") from exc
+
+
+def paginate_query(query, *, orden, id_columna, cursor: str | None, limit: int, descendente: bool = False):
+    """Aplica el filtro keyset sobre (orden, id) y limita a limit + 1 filas para detectar la página siguiente."""
+    if cursor:
+        valor, ultimo_id = decode_cursor(cursor, orden.type.python_type)
+        clave = tuple_(orden, id_columna)
+        limite = tuple_(valor, ultimo_id)
+        query = query.filter(clave < limite if descendente else clave > limite)
+
+    if descendente:
+        query = query.order_by(orden.desc(), id_columna.desc())
+    else:
+        query = query.order_by(orden, id_columna)
+    return query.limit(limit + 1)
+
+
+def build_page(filas: Sequence[T], *, limit: int, clave: Callable[[T], tuple[Any, int]]) -> tuple[list[T], str | None]:
+    items = list(filas[:limit])
+    next_cursor = encode_cursor(*clave(items[-1])) if len(filas) > limit else None
+    return items, next_cursor
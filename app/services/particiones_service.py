@@ -0,0 +1,203 @@
+"""Mantenimiento de las particiones mensuales de `movimientos_stock`.
+
+Crea por adelantado las particiones de los próximos meses y aplica la retención configurada sobre las antiguas.
+Pensado para correr en una tarea periódica (por ejemplo diaria):
+
+    python -m app.services.particiones_service
+"""
+from __future__ import annotations
+
+import argparse
+import re
+from datetime import UTC, date, datetime, time
+
+from sqlalchemy import case, func, insert, literal, null, select, text, union_all
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.movimiento import MovimientoStock
+from app.models.stock_snapshot import StockSnapshot
+from app.services import stock_historico_service
+
+TABLA = "movimientos_stock"
+PARTICION_DEFAULT = f"{TABLA}_default"
+ACCIONES_RETENCION = {"detach", "drop"}
+# Movimientos que resumen, por producto, lo que sumaban las particiones retiradas.
+REFERENCIA_SALDO = "Saldo de particiones retiradas"
+
+_PATRON_PARTICION = re.compile(rf"^{TABLA}_p(\d{{4}})(\d{{2}})$")
+# Clave arbitraria del advisory lock que serializa el mantenimiento entre procesos.
+_LOCK_PARTICIONES = 7_114_001
+
+
+def nombre_particion(mes: date) -> str:
+    return f"{TABLA}_p{mes:%Y%m}"
+
+
+def sumar_meses(mes: date, meses: int) -> date:
+    total = mes.year * 12 + mes.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def listar_particiones(db: Session) -> dict[date, str]:
+    """Particiones mensuales adjuntas, por primer día del mes que cubren."""
+    nombres = db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:tabla AS regclass)"
+        ),
+        {"tabla": TABLA},
+    ).scalars()
+    particiones = {}
+    for nombre in nombres:
+        coincidencia = _PATRON_PARTICION.match(nombre)
+        if coincidencia:
+            particiones[date(int(coincidencia[1]), int(coincidencia[2]), 1)] = nombre
+    return particiones
+
+
+def crear_particiones(db: Session, *, desde: date | None = None, hoy: date | None = None) -> list[str]:
+    """Crea las particiones faltantes desde `desde` hasta `MOVIMIENTOS_PARTICIONES_ADELANTE` meses después de hoy.
+
+    Si la partición default ya tiene filas de un mes nuevo (fechas cargadas a futuro, o meses sin partición),
+    se mueven a la partición creada antes de adjuntarla.
+    """
+    mes_actual = (hoy or date.today()).replace(day=1)
+    mes = (desde or mes_actual).replace(day=1)
+    hasta = sumar_meses(mes_actual, settings.movimientos_particiones_adelante)
+
+    db.execute(text("SELECT pg_advisory_xact_lock(:clave)"), {"clave": _LOCK_PARTICIONES})
+    existentes = listar_particiones(db)
+    creadas = []
+    while mes <= hasta:
+        siguiente = sumar_meses(mes, 1)
+        if mes not in existentes:
+            _crear_particion(db, nombre_particion(mes), mes, siguiente)
+            creadas.append(nombre_particion(mes))
+        mes = siguiente
+    db.commit()
+    return creadas
+
+
+def aplicar_retencion(db: Session, *, hoy: date | None = None) -> list[str]:
+    """Desadjunta o elimina las particiones más viejas que `MOVIMIENTOS_RETENCION_MESES` (0 = conservar todo).
+
+    Con la acción `detach` la partición queda como tabla independiente para archivarla (pg_dump) y borrarla
+    después; con `drop` se elimina directamente. Antes se registra el saldo de lo retirado (ver `_registrar_saldos`),
+    así la suma del ledger sigue coincidiendo con los contadores de `productos`.
+    """
+    meses = settings.movimientos_retencion_meses
+    accion = settings.movimientos_retencion_accion.lower()
+    if meses <= 0:
+        return []
+    if accion not in ACCIONES_RETENCION:
+        raise ValueError(f"MOVIMIENTOS_RETENCION_ACCION inválida: {accion}")
+
+    limite = sumar_meses((hoy or date.today()).replace(day=1), -meses)
+    db.execute(text("SELECT pg_advisory_xact_lock(:clave)"), {"clave": _LOCK_PARTICIONES})
+    retiradas = [nombre for mes, nombre in sorted(listar_particiones(db).items()) if mes < limite]
+    if retiradas:
+        _registrar_saldos(db, retiradas, datetime.combine(limite, time(), UTC))
+    for nombre in retiradas:
+        if accion == "drop":
+            db.execute(text(f"DROP TABLE {nombre}"))
+        else:
+            db.execute(text(f"ALTER TABLE {TABLA} DETACH PARTITION {nombre}"))
+    db.commit()
+    return retiradas
+
+
+def _registrar_saldos(db: Session, particiones: list[str], limite: datetime) -> None:
+    """Resume las particiones a retirar en un movimiento de saldo por producto, fechado en `limite`.
+
+    También guarda un snapshot en `limite` con lo que suma el ledger hasta ese momento: el stock histórico de ahí en
+    adelante parte de él sin volver a contar el saldo ni los movimientos retirados.
+    """
+    retirados = (
+        select(
+            MovimientoStock.producto_id,
+            func.sum(stock_historico_service.DELTA_ACTUAL).label("actual"),
+            func.sum(stock_historico_service.DELTA_RENTADO).label("rentado"),
+        )
+        .where(text(f"{TABLA}.tableoid = ANY(CAST(:particiones AS regclass[]))").bindparams(particiones=particiones))
+        .group_by(MovimientoStock.producto_id)
+        .cte("retirados")
+    )
+    momento = literal(limite, StockSnapshot.fecha.type)
+    db.execute(
+        insert(StockSnapshot).from_select(
+            ["producto_id", "fecha", "stock_actual", "stock_rentado"],
+            select(
+                MovimientoStock.producto_id,
+                momento,
+                func.sum(stock_historico_service.DELTA_ACTUAL),
+                func.sum(stock_historico_service.DELTA_RENTADO),
+            )
+            .where(MovimientoStock.fecha <= limite, MovimientoStock.producto_id.in_(select(retirados.c.producto_id)))
+            .group_by(MovimientoStock.producto_id),
+        )
+    )
+    ajustes = select(
+        retirados.c.producto_id,
+        literal("AJUSTE"),
+        func.abs(retirados.c.actual),
+        retirados.c.actual > 0,
+    ).where(retirados.c.actual != 0)
+    rentados = select(
+        retirados.c.producto_id,
+        case((retirados.c.rentado > 0, "ALQUILER"), else_="DEVOLUCION"),
+        func.abs(retirados.c.rentado),
+        null(),
+    ).where(retirados.c.rentado != 0)
+    filas = union_all(ajustes, rentados).subquery()
+    db.execute(
+        insert(MovimientoStock).from_select(
+            ["producto_id", "tipo", "cantidad", "ajuste_positivo", "fecha", "referencia"],
+            select(filas, momento, literal(REFERENCIA_SALDO)),
+        )
+    )
+
+
+def _crear_particion(db: Session, nombre: str, desde: date, hasta: date) -> None:
+    rango = f"FROM ('{desde:%Y-%m-%d} 00:00+00') TO ('{hasta:%Y-%m-%d} 00:00+00')"
+    filtro = {"desde": f"{desde:%Y-%m-%d} 00:00+00", "hasta": f"{hasta:%Y-%m-%d} 00:00+00"}
+    en_default = db.execute(
+        text(f"SELECT 1 FROM {PARTICION_DEFAULT} WHERE fecha >= :desde AND fecha < :hasta LIMIT 1"), filtro
+    ).first()
+    if not en_default:
+        db.execute(text(f"CREATE TABLE {nombre} PARTITION OF {TABLA} FOR VALUES {rango}"))
+        return
+
+    db.execute(text(f"CREATE TABLE {nombre} (LIKE {TABLA} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(
+        text(
+            f"WITH movidas AS (DELETE FROM {PARTICION_DEFAULT} WHERE fecha >= :desde AND fecha < :hasta RETURNING *) "
+            f"INSERT INTO {nombre} SELECT * FROM movidas"
+        ),
+        filtro,
+    )
+    db.execute(text(f"ALTER TABLE {TABLA} ATTACH PARTITION {nombre} FOR VALUES {rango}"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Crea particiones futuras de movimientos y aplica la retención")
+    parser.add_argument(
+        "--desde", type=date.fromisoformat, help="Crear también particiones desde este mes (AAAA-MM-DD)"
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        creadas = crear_particiones(db, desde=args.desde)
+        retiradas = aplicar_retencion(db)
+    finally:
+        db.close()
+    print(f"Particiones creadas: {', '.join(creadas) or 'ninguna'}")
+    if retiradas:
+        accion = "eliminadas" if settings.movimientos_retencion_accion.lower() == "drop" else "desadjuntadas"
+        print(f"Particiones {accion}: {', '.join(retiradas)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Perfiles de requests puntuales con pyinstrument (dependencia opcional: `pip install -e ".[profiling]"`).
+
+Un admin envía el header `X-Perfil: 1` y ese request corre bajo el profiler de muestreo. La sesión se guarda en
+`PROFILING_DIR` y se descarga desde `GET /api/perfiles/{id}` como speedscope (flame graph en
+https://www.speedscope.app) o como HTML de pyinstrument.
+"""
+from __future__ import annotations
+
+import json
+import re
+from datetime import UTC, datetime
+from pathlib import Path
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+HEADER = "x-perfil"
+FORMATOS = ("speedscope", "html")
+_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def iniciar():
+    """Arranca un profiler en el contexto async actual; las corrutinas que espera el request quedan incluidas."""
+    try:
+        from pyinstrument import Profiler
+    except ImportError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Perfilado no disponible: instalar el extra `profiling` (pyinstrument)",
+        ) from exc
+    profiler = Profiler(interval=settings.profiling_interval_ms / 1000, async_mode="enabled")
+    try:
+        profiler.start()
+    except RuntimeError as exc:
+        # pyinstrument admite un solo profiler activo por hilo: dos requests perfilados a la vez en el mismo worker.
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Ya hay un request perfilándose en este proceso; reintentar"
+        ) from exc
+    return profiler
+
+
+def guardar(sesion, perfil_id: str, *, metodo: str, ruta: str, path: str, usuario_id: int) -> dict:
+    """Guarda la sesión de `profiler.stop()`, que debe llamarse en el mismo hilo que `iniciar`."""
+    directorio = _directorio()
+    sesion.save(str(directorio / f"{perfil_id}.pyisession"))
+    datos = {
+        "id": perfil_id,
+        "fecha": datetime.now(UTC).isoformat(),
+        "metodo": metodo,
+        "ruta": ruta,
+        "path": path,
+        "duracion_ms": round(sesion.duration * 1000, 3),
+        "muestras": sesion.sample_count,
+        "usuario_id": usuario_id,
+    }
+    (directorio / f"{perfil_id}.json").write_text(json.dumps(datos), encoding="utf-8")
+    _recortar(directorio)
+    return datos
+
+
+def listar_perfiles() -> list[dict]:
+    """Perfiles guardados, del más reciente al más antiguo."""
+    return [json.loads(archivo.read_text(encoding="utf-8")) for archivo in _metadatos(_directorio())]
+
+
+def renderizar(perfil_id: str, formato: str) -> str:
+    from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+    from pyinstrument.session import Session
+
+    archivo = _directorio() / f"{perfil_id}.pyisession"
+    if not _ID.match(perfil_id) or not archivo.exists():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil no encontrado")
+    renderer = SpeedscopeRenderer() if formato == "speedscope" else HTMLRenderer()
+    return renderer.render(Session.load(str(archivo)))
+
+
+def _directorio() -> Path:
+    directorio = Path(settings.profiling_dir)
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def _metadatos(directorio: Path) -> list[Path]:
+    return sorted(directorio.glob("*.json"), key=lambda archivo: archivo.stat().st_mtime, reverse=True)
+
+
+def _recortar(directorio: Path) -> None:
+    for archivo in _metadatos(directorio)[settings.profiling_max_files :]:
+        archivo.with_suffix(".pyisession").unlink(missing_ok=True)
+        archivo.unlink(missing_ok=True)
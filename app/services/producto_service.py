@@ -3,15 +3,32 @@ from __future__ import annotations
 from typing import Sequence
 
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, Select, select
+from sqlalchemy.orm import Session, joinedload
 
+from app.models.deposito import Deposito
 from app.models.producto import Producto
-from app.schemas.producto import ProductoCreate, ProductoUpdate
-from app.services import deposito_service
+from app.schemas.producto import ProductoCreate, ProductoRead, ProductoUpdate
+from app.services import (
+    deposito_service,
+    metricas_service,
+    movimiento_service,
+    stock_historico_service,
+)
+from app.services.busqueda import filtro_busqueda, relevancia
+from app.services.pagination import DEFAULT_LIMIT, build_page, paginate_query
+
+_LOAD_OPTIONS = (joinedload(Producto.deposito_principal).load_only(Deposito.nombre),)
+# Solo las columnas de ProductoRead: el listado arma filas Core sin instanciar objetos ORM.
+_COLUMNAS_LISTADO = (
+    *(getattr(Producto, campo) for campo in ProductoRead.model_fields if campo != "deposito_nombre"),
+    Deposito.nombre.label("deposito_nombre"),
+)
+_COLUMNAS_STOCK = ("stock_actual", "stock_rentado", "stock_disponible")
 
 
 def get_producto_or_404(db: Session, producto_id: int) -> Producto:
-    producto = db.query(Producto).filter(Producto.id == producto_id).first()
+    producto = db.query(Producto).options(*_LOAD_OPTIONS).filter(Producto.id == producto_id).first()
     if not producto:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado")
     return producto
@@ -26,24 +43,90 @@ def list_productos(
     deposito_principal_id: int | None = None,
     stock_bajo: bool | None = None,
     activo: bool | None = None,
-) -> Sequence[Producto]:
-    query = db.query(Producto)
+    cursor: str | None = None,
+    limit: int = DEFAULT_LIMIT,
+) -> tuple[list[Row], str | None]:
+    """Lista productos por nombre; con `search` ordena por relevancia y el cursor recorre (relevancia, id).
+
+    Devuelve filas con las columnas de `ProductoRead`, incluido `deposito_nombre`.
+    """
+    query = select(*_COLUMNAS_LISTADO).outerjoin(Producto.deposito_principal)
 
     if search:
-        like = f"%{search}%"
-        query = query.filter((Producto.nombre.ilike(like)) | (Producto.codigo.ilike(like)))
-    if categoria:
-        query = query.filter(Producto.categoria == categoria)
-    if tipo_vajilla:
-        query = query.filter(Producto.tipo_vajilla == tipo_vajilla)
-    if deposito_principal_id:
-        query = query.filter(Producto.deposito_principal_id == deposito_principal_id)
-    if stock_bajo:
-        query = query.filter(Producto.stock_disponible <= Producto.stock_minimo)
-    if activo is not None:
-        query = query.filter(Producto.activo == activo)
+        query = query.where(filtro_busqueda(search, Producto.nombre, Producto.codigo))
+    query = query.where(
+        *_filtros(
+            categoria=categoria,
+            tipo_vajilla=tipo_vajilla,
+            deposito_principal_id=deposito_principal_id,
+            stock_bajo=stock_bajo,
+            activo=activo,
+        )
+    )
+
+    if search:
+        puntaje = relevancia(search, Producto.nombre, Producto.codigo)
+        query = paginate_query(
+            query.add_columns(puntaje.label("puntaje")),
+            orden=puntaje,
+            id_columna=Producto.id,
+            cursor=cursor,
+            limit=limit,
+            descendente=True,
+        )
+        return build_page(db.execute(query).all(), limit=limit, clave=lambda fila: (fila.puntaje, fila.id))
 
-    return query.order_by(Producto.nombre).all()
+    query = paginate_query(query, orden=Producto.nombre, id_columna=Producto.id, cursor=cursor, limit=limit)
+    return build_page(db.execute(query).all(), limit=limit, clave=lambda fila: (fila.nombre, fila.id))
+
+
+def consulta_exportacion(
+    *,
+    categoria: str | None = None,
+    tipo_vajilla: str | None = None,
+    deposito_principal_id: int | None = None,
+    stock_bajo: bool | None = None,
+    activo: bool | None = None,
+) -> Select:
+    return (
+        select(
+            Producto.id,
+            Producto.codigo,
+            Producto.nombre,
+            Producto.categoria,
+            Producto.tipo_vajilla,
+            Producto.material,
+            Producto.unidad_medida,
+            Producto.estado_fisico,
+            Producto.stock_actual,
+            Producto.stock_minimo,
+            Producto.stock_rentado,
+            Producto.stock_disponible,
+            Producto.deposito_principal_id,
+            Producto.activo,
+        )
+        .where(
+            *_filtros(
+                categoria=categoria,
+                tipo_vajilla=tipo_vajilla,
+                deposito_principal_id=deposito_principal_id,
+                stock_bajo=stock_bajo,
+                activo=activo,
+            )
+        )
+        .order_by(Producto.id)
+    )
+
+
+def autocomplete_productos(db: Session, termino: str, *, limit: int = 10) -> Sequence[Row]:
+    """Mejores coincidencias activas por nombre o código, solo con las columnas que muestra el buscador."""
+    return (
+        db.query(Producto.id, Producto.codigo, Producto.nombre)
+        .filter(Producto.activo.is_(True), filtro_busqueda(termino, Producto.nombre, Producto.codigo))
+        .order_by(relevancia(termino, Producto.nombre, Producto.codigo).desc(), Producto.nombre)
+        .limit(limit)
+        .all()
+    )
 
 
 def create_producto(db: Session, producto_in: ProductoCreate) -> Producto:
@@ -61,12 +144,28 @@ def create_producto(db: Session, producto_in: ProductoCreate) -> Producto:
 
     if data.get("stock_disponible") is None:
         data["stock_disponible"] = max(data.get("stock_actual", 0) - data.get("stock_rentado", 0), 0)
+    validar_stock(data["stock_actual"], data["stock_rentado"], data["stock_disponible"])
 
     producto = Producto(**data)
     db.add(producto)
+    metricas_service.acumular(
+        db,
+        total_productos=1,
+        stock_total=producto.stock_actual,
+        cantidad_alertas_stock_bajo=int(producto.stock_disponible <= producto.stock_minimo),
+    )
+    db.flush()
+    producto_id = producto.id
+    movimiento_service.registrar_en_ledger(
+        db,
+        producto_id,
+        delta_actual=producto.stock_actual,
+        delta_rentado=producto.stock_rentado,
+        referencia="Alta de producto",
+    )
+    stock_historico_service.registrar_snapshots(db, [producto_id])
     db.commit()
-    db.refresh(producto)
-    return producto
+    return get_producto_or_404(db, producto_id)
 
 
 def update_producto(db: Session, producto: Producto, producto_in: ProductoUpdate) -> Producto:
@@ -76,6 +175,17 @@ def update_producto(db: Session, producto: Producto, producto_in: ProductoUpdate
         if db.query(Producto).filter(Producto.codigo == update_data["codigo"], Producto.id != producto.id).first():
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Código de producto duplicado")
 
+    # Relee el stock con lock hasta el commit y aplica lo pedido como diferencia sobre lo que se había leído: un
+    # movimiento registrado mientras tanto no se pisa, y los deltas del ledger parten del valor vigente.
+    leidos = {campo: getattr(producto, campo) for campo in _COLUMNAS_STOCK}
+    db.refresh(producto, list(_COLUMNAS_STOCK), with_for_update=True)
+    for campo in _COLUMNAS_STOCK:
+        if update_data.get(campo) is not None:
+            update_data[campo] += getattr(producto, campo) - leidos[campo]
+    stock_previo = producto.stock_actual
+    rentado_previo = producto.stock_rentado
+    alerta_previa = producto.stock_disponible <= producto.stock_minimo
+
     for field, value in update_data.items():
         setattr(producto, field, value)
 
@@ -83,28 +193,76 @@ def update_producto(db: Session, producto: Producto, producto_in: ProductoUpdate
         if {"stock_actual", "stock_rentado"} & update_data.keys():
             producto.stock_disponible = max(producto.stock_actual - producto.stock_rentado, 0)
 
-    if producto.stock_disponible < 0:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Stock disponible no puede ser negativo")
+    validar_stock(producto.stock_actual, producto.stock_rentado, producto.stock_disponible)
+    metricas_service.acumular(
+        db,
+        stock_total=producto.stock_actual - stock_previo,
+        cantidad_alertas_stock_bajo=int(producto.stock_disponible <= producto.stock_minimo) - int(alerta_previa),
+    )
 
+    producto_id = producto.id
     db.add(producto)
+    movimiento_service.registrar_en_ledger(
+        db,
+        producto_id,
+        delta_actual=producto.stock_actual - stock_previo,
+        delta_rentado=producto.stock_rentado - rentado_previo,
+        referencia="Edición de stock",
+    )
     db.commit()
-    db.refresh(producto)
-    return producto
+    return get_producto_or_404(db, producto_id)
 
 
 def soft_delete_producto(db: Session, producto: Producto) -> Producto:
+    producto_id = producto.id
     producto.activo = False
     db.add(producto)
     db.commit()
-    db.refresh(producto)
-    return producto
+    return get_producto_or_404(db, producto_id)
 
 
 def get_low_stock(db: Session) -> Sequence[Producto]:
     return (
         db.query(Producto)
+        .options(*_LOAD_OPTIONS)
         .filter(Producto.activo.is_(True))
         .filter(Producto.stock_disponible <= Producto.stock_minimo)
         .order_by(Producto.stock_disponible)
         .all()
     )
+
+
+def validar_stock(stock_actual: int, stock_rentado: int, stock_disponible: int) -> None:
+    if stock_actual < 0 or stock_rentado < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El stock no puede ser negativo")
+    if stock_disponible < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Stock disponible no puede ser negativo")
+    if stock_rentado > stock_actual:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Stock rentado no puede superar al stock actual")
+    if stock_disponible > stock_actual - stock_rentado:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Stock disponible no puede superar al stock actual menos el rentado",
+        )
+
+
+def _filtros(
+    *,
+    categoria: str | None,
+    tipo_vajilla: str | None,
+    deposito_principal_id: int | None,
+    stock_bajo: bool | None,
+    activo: bool | None,
+) -> list:
+    filtros = []
+    if categoria:
+        filtros.append(Producto.categoria == categoria)
+    if tipo_vajilla:
+        filtros.append(Producto.tipo_vajilla == tipo_vajilla)
+    if deposito_principal_id:
+        filtros.append(Producto.deposito_principal_id == deposito_principal_id)
+    if stock_bajo:
+        filtros.append(Producto.stock_disponible <= Producto.stock_minimo)
+    if activo is not None:
+        filtros.append(Producto.activo == activo)
+    return filtros
@@ -0,0 +1,179 @@
+"""Reconciliación de los contadores de stock de `productos` contra el ledger `movimientos_stock`.
+
+Recalcula `stock_actual` y `stock_rentado` sumando los movimientos de cada producto, en bloques de productos
+repartidos en un pool de procesos, y controla que `stock_disponible` no supere lo que queda libre. Cada bloque se
+lee en una sola consulta sin bloqueos; con `--reparar` las correcciones se aplican en transacciones cortas con
+compare-and-set sobre los valores leídos, de modo que un producto que cambió mientras tanto se informa como
+conflicto en lugar de pisarse. Las particiones que retira la retención quedan resumidas en movimientos de saldo
+(`particiones_service.aplicar_retencion`), así que la suma del ledger sigue siendo el saldo completo. Imprime (o
+guarda con `--salida`) un resumen en JSON.
+
+    python -m app.services.reconcile --reparar --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal, engine
+from app.models.movimiento import MovimientoStock
+from app.models.producto import Producto
+from app.services import metricas_service, stock_historico_service
+
+TAMANO_BLOQUE = 1_000
+MAX_MUESTRAS = 20
+# Espera máxima por un bloqueo de fila al reparar: un producto con movimientos en curso se reintenta en otra corrida.
+LOCK_TIMEOUT_MS = 2_000
+
+
+def bloques(db: Session, tamano: int = TAMANO_BLOQUE) -> list[tuple[int, int]]:
+    """Rangos de ids (desde, hasta) con `tamano` productos cada uno."""
+    ids = db.execute(select(Producto.id).order_by(Producto.id)).scalars().all()
+    return [(ids[inicio], ids[min(inicio + tamano, len(ids)) - 1]) for inicio in range(0, len(ids), tamano)]
+
+
+def reconciliar_bloque(desde: int, hasta: int, reparar: bool = False) -> dict:
+    """Compara los productos con id en [desde, hasta] contra el ledger y, si se pide, corrige la deriva."""
+    ledger = (
+        select(
+            MovimientoStock.producto_id,
+            func.sum(stock_historico_service.DELTA_ACTUAL).label("actual"),
+            func.sum(stock_historico_service.DELTA_RENTADO).label("rentado"),
+        )
+        .where(MovimientoStock.producto_id.between(desde, hasta))
+        .group_by(MovimientoStock.producto_id)
+        .subquery()
+    )
+    consulta = (
+        select(
+            Producto.id,
+            Producto.stock_actual,
+            Producto.stock_rentado,
+            Producto.stock_disponible,
+            func.coalesce(ledger.c.actual, 0).label("esperado_actual"),
+            func.coalesce(ledger.c.rentado, 0).label("esperado_rentado"),
+        )
+        .outerjoin(ledger, ledger.c.producto_id == Producto.id)
+        .where(Producto.id.between(desde, hasta))
+    )
+
+    resumen = {"productos": 0, "con_deriva": 0, "reparados": 0, "conflictos": 0, "muestras": []}
+    derivas = []
+    with SessionLocal() as db:
+        for fila in db.execute(consulta):
+            resumen["productos"] += 1
+            libre = max(fila.esperado_actual - fila.esperado_rentado, 0)
+            if (
+                fila.stock_actual == fila.esperado_actual
+                and fila.stock_rentado == fila.esperado_rentado
+                and fila.stock_disponible <= libre
+            ):
+                continue
+            resumen["con_deriva"] += 1
+            derivas.append(fila)
+            if len(resumen["muestras"]) < MAX_MUESTRAS:
+                resumen["muestras"].append(
+                    {
+                        "producto_id": fila.id,
+                        "stock_actual": [fila.stock_actual, fila.esperado_actual],
+                        "stock_rentado": [fila.stock_rentado, fila.esperado_rentado],
+                        "stock_disponible": [fila.stock_disponible, min(fila.stock_disponible, libre)],
+                    }
+                )
+        db.rollback()
+
+        if reparar and derivas:
+            resumen["reparados"], resumen["conflictos"] = _reparar(db, derivas)
+    return resumen
+
+
+def _reparar(db: Session, derivas: list) -> tuple[int, int]:
+    """Aplica los valores esperados solo donde los contadores siguen como se leyeron; devuelve (reparados, conflictos)."""
+    reparados = 0
+    for fila in derivas:
+        disponible = min(fila.stock_disponible, max(fila.esperado_actual - fila.esperado_rentado, 0))
+        try:
+            db.execute(text(f"SET LOCAL lock_timeout = {LOCK_TIMEOUT_MS}"))
+            minimo = db.execute(
+                update(Producto)
+                .where(
+                    Producto.id == fila.id,
+                    Producto.stock_actual == fila.stock_actual,
+                    Producto.stock_rentado == fila.stock_rentado,
+                    Producto.stock_disponible == fila.stock_disponible,
+                )
+                .values(
+                    stock_actual=fila.esperado_actual,
+                    stock_rentado=fila.esperado_rentado,
+                    stock_disponible=disponible,
+                )
+                .returning(Producto.stock_minimo)
+                .execution_options(synchronize_session=False)
+            ).scalar()
+            if minimo is not None:
+                metricas_service.acumular(
+                    db,
+                    stock_total=fila.esperado_actual - fila.stock_actual,
+                    cantidad_alertas_stock_bajo=int(disponible <= minimo) - int(fila.stock_disponible <= minimo),
+                )
+                # El historial parte del valor corregido a partir de ahora.
+                stock_historico_service.registrar_snapshots(db, [fila.id])
+                reparados += 1
+            db.commit()
+        except (OperationalError, IntegrityError):
+            # Bloqueo ocupado o saldo del ledger inválido (negativo): queda como conflicto para revisar.
+            db.rollback()
+    return reparados, len(derivas) - reparados
+
+
+def _inicializar_worker() -> None:
+    # Las conexiones heredadas del proceso padre no se pueden compartir entre procesos.
+    engine.dispose(close=False)
+
+
+def reconciliar(*, reparar: bool = False, workers: int | None = None, tamano_bloque: int = TAMANO_BLOQUE) -> dict:
+    inicio = time.monotonic()
+    with SessionLocal() as db:
+        rangos = bloques(db, tamano_bloque)
+
+    total = {"bloques": len(rangos), "productos": 0, "con_deriva": 0, "reparados": 0, "conflictos": 0, "muestras": []}
+    if rangos:
+        desdes, hastas = zip(*rangos)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker) as pool:
+            for resumen in pool.map(reconciliar_bloque, desdes, hastas, [reparar] * len(rangos)):
+                for clave in ("productos", "con_deriva", "reparados", "conflictos"):
+                    total[clave] += resumen[clave]
+                total["muestras"].extend(resumen["muestras"][: MAX_MUESTRAS - len(total["muestras"])])
+    total["segundos"] = round(time.monotonic() - inicio, 2)
+    return total
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reparar", action="store_true", help="Corregir la deriva además de informarla")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Procesos en paralelo")
+    parser.add_argument("--bloque", type=int, default=TAMANO_BLOQUE, help="Productos por bloque")
+    parser.add_argument("--salida", help="Archivo donde guardar el resumen JSON (por defecto, stdout)")
+    args = parser.parse_args()
+
+    resumen = reconciliar(reparar=args.reparar, workers=args.workers, tamano_bloque=args.bloque)
+    contenido = json.dumps(resumen, ensure_ascii=False, indent=2)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(contenido + "\n")
+    else:
+        print(contenido)
+    pendientes = resumen["con_deriva"] - resumen["reparados"]
+    return 1 if pendientes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""Reportes de movimientos sobre el rollup diario `movimientos_diarios`.
+
+El rollup guarda una fila por (día, producto, depósito, tipo) con la cantidad sumada (con signo en los ajustes) y
+la cantidad de movimientos. Se mantiene al registrar cada movimiento; para cargar o corregir un rango de días desde
+el ledger:
+
+    python -m app.services.reportes_service --desde 2024-01-01 --hasta 2024-12-31
+"""
+from __future__ import annotations
+
+import argparse
+from collections.abc import Iterable, Sequence
+from datetime import UTC, date, datetime, time, timedelta
+
+from fastapi import HTTPException, status
+from sqlalchemy import (
+    CTE,
+    ColumnElement,
+    Date,
+    Row,
+    and_,
+    case,
+    cast,
+    delete,
+    func,
+    literal,
+    select,
+    text,
+)
+from sqlalchemy.dialects.postgresql import Insert, insert
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models.movimiento import MovimientoStock
+from app.models.movimiento_diario import MovimientoDiario
+from app.services import particiones_service
+
+INTERVALOS = {"dia": "day", "semana": "week", "mes": "month", "trimestre": "quarter", "anio": "year"}
+AGRUPACIONES = {
+    "producto": MovimientoDiario.producto_id,
+    "deposito": MovimientoDiario.deposito_id,
+    "tipo": MovimientoDiario.tipo,
+}
+_TIPOS_ENTRANTES = ("INGRESO", "DEVOLUCION")
+
+
+# Mismos criterios que _clave/_cantidad, en SQL: sobre el ledger o sobre las columnas que devuelve un INSERT.
+def _dia(c) -> ColumnElement:
+    return cast(func.timezone("UTC", c.fecha), Date)
+
+
+def _deposito(c) -> ColumnElement:
+    return case(
+        (c.tipo.in_(_TIPOS_ENTRANTES), func.coalesce(c.deposito_destino_id, c.deposito_origen_id, 0)),
+        else_=func.coalesce(c.deposito_origen_id, c.deposito_destino_id, 0),
+    )
+
+
+def _cantidad_con_signo(c) -> ColumnElement:
+    return case((and_(c.tipo == "AJUSTE", c.ajuste_positivo.is_(False)), -c.cantidad), else_=c.cantidad)
+
+
+_DIA = _dia(MovimientoStock.__table__.c)
+_DEPOSITO = _deposito(MovimientoStock.__table__.c)
+_CANTIDAD = _cantidad_con_signo(MovimientoStock.__table__.c)
+
+
+def acumular_movimientos(db: Session, movimientos: Iterable[MovimientoStock]) -> None:
+    """Suma movimientos recién insertados al rollup dentro de la transacción en curso."""
+    totales: dict[tuple, list[int]] = {}
+    for movimiento in movimientos:
+        total = totales.setdefault(_clave(movimiento), [0, 0])
+        total[0] += _cantidad(movimiento)
+        total[1] += 1
+    if not totales:
+        return
+    # Filas ordenadas por clave: transacciones concurrentes bloquean las filas del rollup siempre en el mismo orden.
+    stmt = insert(MovimientoDiario).values(
+        [
+            {
+                "dia": dia,
+                "producto_id": producto_id,
+                "deposito_id": deposito_id,
+                "tipo": tipo,
+                "cantidad": cantidad,
+                "movimientos": cantidad_movimientos,
+            }
+            for (dia, producto_id, deposito_id, tipo), (cantidad, cantidad_movimientos) in sorted(totales.items())
+        ]
+    )
+    db.execute(_sumar_si_existe(stmt))
+
+
+def acumular_insertados(db: Session, insertados: CTE) -> None:
+    """Como `acumular_movimientos`, sumando en SQL las filas de un `INSERT ... RETURNING` del ledger (como CTE)."""
+    dia, deposito = _dia(insertados.c), _deposito(insertados.c)
+    clave = (dia, insertados.c.producto_id, deposito, insertados.c.tipo)
+    agregados = (
+        select(*clave, func.sum(_cantidad_con_signo(insertados.c)), func.count())
+        .group_by(*clave)
+        .order_by(*clave)
+    )
+    stmt = insert(MovimientoDiario).from_select(
+        ["dia", "producto_id", "deposito_id", "tipo", "cantidad", "movimientos"], agregados
+    )
+    db.execute(_sumar_si_existe(stmt.add_cte(insertados)))
+
+
+def recalcular_dias(db: Session, desde: date, hasta: date) -> int:
+    """Reconstruye el rollup de [desde, hasta] desde el ledger, un día por transacción; devuelve las filas escritas.
+
+    El bloqueo SHARE ROW EXCLUSIVE hace esperar a los movimientos que aún no sumaron al rollup, que se agregan
+    recién después de reemplazar el día: ninguno se pierde ni se cuenta dos veces.
+    """
+    filas = 0
+    dia = desde
+    while dia <= hasta:
+        db.execute(text("LOCK TABLE movimientos_diarios IN SHARE ROW EXCLUSIVE MODE"))
+        db.execute(delete(MovimientoDiario).where(MovimientoDiario.dia == dia))
+        agregados = (
+            select(
+                literal(dia, Date()).label("dia"),
+                MovimientoStock.producto_id,
+                _DEPOSITO.label("deposito_id"),
+                MovimientoStock.tipo,
+                func.sum(_CANTIDAD).label("cantidad"),
+                func.count().label("movimientos"),
+            )
+            .where(
+                MovimientoStock.fecha >= datetime.combine(dia, time(), UTC),
+                MovimientoStock.fecha < datetime.combine(dia + timedelta(days=1), time(), UTC),
+                # Los días retirados conservan su rollup: el saldo que los resume no es un movimiento del día.
+                MovimientoStock.referencia.is_distinct_from(particiones_service.REFERENCIA_SALDO),
+            )
+            .group_by(MovimientoStock.producto_id, _DEPOSITO, MovimientoStock.tipo)
+        )
+        resultado = db.execute(
+            insert(MovimientoDiario)
+            .from_select(["dia", "producto_id", "deposito_id", "tipo", "cantidad", "movimientos"], agregados)
+            .execution_options(preserve_rowcount=True)
+        )
+        filas += resultado.rowcount
+        db.commit()
+        dia += timedelta(days=1)
+    return filas
+
+
+def reporte_movimientos(
+    db: Session,
+    *,
+    desde: date,
+    hasta: date,
+    intervalo: str = "dia",
+    dias: int | None = None,
+    agrupar: Sequence[str] = ("tipo",),
+    producto_id: int | None = None,
+    deposito_id: int | None = None,
+    tipo: str | None = None,
+) -> Sequence[Row]:
+    """Totales por período y serie. `dias` usa períodos fijos de N días contados desde `desde`."""
+    if hasta < desde:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="hasta debe ser posterior a desde")
+    if intervalo not in INTERVALOS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Intervalo inválido")
+    if set(agrupar) - AGRUPACIONES.keys():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Agrupación inválida")
+
+    if dias:
+        # Restar fechas da días enteros: el período es el múltiplo de N días más cercano desde `desde`.
+        periodo = literal(desde, Date()) + (MovimientoDiario.dia - literal(desde, Date())) // dias * dias
+    else:
+        periodo = cast(func.date_trunc(INTERVALOS[intervalo], MovimientoDiario.dia), Date)
+    series = [AGRUPACIONES[nombre] for nombre in agrupar]
+
+    query = select(
+        periodo.label("periodo"),
+        *series,
+        func.sum(MovimientoDiario.cantidad).label("cantidad"),
+        func.sum(MovimientoDiario.movimientos).label("movimientos"),
+    ).where(MovimientoDiario.dia >= desde, MovimientoDiario.dia <= hasta)
+    if producto_id:
+        query = query.where(MovimientoDiario.producto_id == producto_id)
+    if deposito_id is not None:
+        query = query.where(MovimientoDiario.deposito_id == deposito_id)
+    if tipo:
+        query = query.where(MovimientoDiario.tipo == tipo.upper())
+
+    return db.execute(query.group_by(periodo, *series).order_by(periodo, *series)).all()
+
+
+def _sumar_si_existe(stmt: Insert) -> Insert:
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            MovimientoDiario.dia,
+            MovimientoDiario.producto_id,
+            MovimientoDiario.deposito_id,
+            MovimientoDiario.tipo,
+        ],
+        set_={
+            "cantidad": MovimientoDiario.cantidad + stmt.excluded.cantidad,
+            "movimientos": MovimientoDiario.movimientos + stmt.excluded.movimientos,
+        },
+    )
+
+
+def _clave(movimiento: MovimientoStock) -> tuple[date, int, int, str]:
+    if movimiento.tipo in _TIPOS_ENTRANTES:
+        deposito = movimiento.deposito_destino_id or movimiento.deposito_origen_id
+    else:
+        deposito = movimiento.deposito_origen_id or movimiento.deposito_destino_id
+    return movimiento.fecha.astimezone(UTC).date(), movimiento.producto_id, deposito or 0, movimiento.tipo
+
+
+def _cantidad(movimiento: MovimientoStock) -> int:
+    if movimiento.tipo == "AJUSTE" and movimiento.ajuste_positivo is False:
+        return -movimiento.cantidad
+    return movimiento.cantidad
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recalcula el rollup diario de movimientos desde el ledger")
+    parser.add_argument("--desde", type=date.fromisoformat, help="Primer día (por defecto, el primer movimiento)")
+    parser.add_argument("--hasta", type=date.fromisoformat, default=date.today(), help="Último día (por defecto, hoy)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        desde = args.desde or db.execute(select(func.min(_DIA))).scalar() or args.hasta
+        filas = recalcular_dias(db, desde, args.hasta)
+    finally:
+        db.close()
+    print(f"Rollup recalculado del {desde} al {args.hasta}: {filas} filas")
+
+
+if __name__ == "__main__":
+    main()
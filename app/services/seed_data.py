@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import argparse
+import json
 from datetime import date, datetime, timedelta, timezone
 
 from app.core.security import get_password_hash
@@ -11,7 +13,9 @@ from app.models.evento import Evento
 from app.models.producto import Producto
 from app.models.user import User
 from app.schemas.movimiento import MovimientoCreate
-from app.services.movimiento_service import create_movimiento
+from app.services import datos_sinteticos
+from app.services.metricas_service import reconciliar_metricas
+from app.services.movimiento_service import create_movimiento, registrar_en_ledger
 
 
 def run_seed() -> None:
@@ -66,6 +70,14 @@ def run_seed() -> None:
         )
         db.add(alquiler)
 
+        for producto in productos:
+            registrar_en_ledger(
+                db,
+                producto.id,
+                delta_actual=producto.stock_actual,
+                delta_rentado=producto.stock_rentado or 0,
+                referencia="Stock inicial",
+            )
         create_movimiento(
             db,
             MovimientoCreate(producto_id=productos[0].id, tipo="INGRESO", cantidad=20, referencia="Compra inicial"),
@@ -81,10 +93,29 @@ def run_seed() -> None:
         db.add(admin)
 
         db.commit()
+        reconciliar_metricas(db)
         print("Seed completado")
     finally:
         db.close()
 
 
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Carga datos de ejemplo; con --scale, un dataset sintético a escala")
+    parser.add_argument("--scale", type=int, help="Unidades de escala (500 productos y 600 eventos cada una)")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla: misma semilla, mismos datos")
+    parser.add_argument("--workers", type=int, help="Procesos que generan y cargan en paralelo")
+    parser.add_argument("--anios", type=int, default=3, help="Años de historia")
+    parser.add_argument("--hasta", type=date.fromisoformat, help="Último día de la historia (por defecto, hoy)")
+    args = parser.parse_args()
+
+    if args.scale is None:
+        run_seed()
+        return
+    totales = datos_sinteticos.generar(
+        args.scale, semilla=args.seed, workers=args.workers, anios=args.anios, hasta=args.hasta
+    )
+    print(json.dumps(totales, ensure_ascii=False, indent=2))
+
+
 if __name__ == "__main__":
-    run_seed()
+    main()
@@ -0,0 +1,213 @@
+"""Stock histórico: snapshots por producto y reconstrucción a una fecha reproduciendo solo la cola del ledger.
+
+Se toma un snapshot de un producto al darlo de alta, cada `STOCK_SNAPSHOT_CADA_MOVIMIENTOS` movimientos y en la
+tarea diaria, que cubre los productos con movimientos desde su último snapshot:
+
+    python -m app.services.stock_historico_service
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import UTC, datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import (
+    Integer,
+    Row,
+    and_,
+    any_,
+    case,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models.movimiento import MovimientoStock
+from app.models.producto import Producto
+from app.models.stock_snapshot import StockSnapshot
+from app.services.pagination import DEFAULT_LIMIT, build_page, paginate_query
+
+# Mismo criterio que movimiento_service._deltas, expresado en SQL para sumar sobre el ledger.
+DELTA_ACTUAL = case(
+    (
+        or_(
+            MovimientoStock.tipo == "INGRESO",
+            and_(MovimientoStock.tipo == "AJUSTE", MovimientoStock.ajuste_positivo.is_not(False)),
+        ),
+        MovimientoStock.cantidad,
+    ),
+    (MovimientoStock.tipo.in_(("EGRESO", "AJUSTE")), -MovimientoStock.cantidad),
+    else_=0,
+)
+DELTA_RENTADO = case(
+    (MovimientoStock.tipo == "ALQUILER", MovimientoStock.cantidad),
+    (MovimientoStock.tipo == "DEVOLUCION", -MovimientoStock.cantidad),
+    else_=0,
+)
+
+
+def registrar_snapshots(
+    db: Session, producto_ids: Iterable[int] | None = None, *, fecha: datetime | None = None
+) -> int:
+    """Guarda el stock vigente de los productos indicados (por defecto, los que tienen movimientos sin snapshot).
+
+    El UPDATE toma el bloqueo de fila antes de leer el stock, así que un movimiento concurrente queda entero antes
+    o después del snapshot. No confirma la transacción.
+    """
+    actualizados = update(Producto).values(movimientos_sin_snapshot=0)
+    if producto_ids is None:
+        actualizados = actualizados.where(Producto.movimientos_sin_snapshot > 0)
+    else:
+        # Un único parámetro array: el mismo SQL (y plan) sirve para lotes de cualquier tamaño.
+        actualizados = actualizados.where(Producto.id == any_(literal(list(producto_ids), ARRAY(Integer))))
+    actualizados = actualizados.returning(Producto.id, Producto.stock_actual, Producto.stock_rentado).cte("actualizados")
+
+    momento = literal(fecha, StockSnapshot.fecha.type) if fecha is not None else func.clock_timestamp()
+    insertados = db.scalars(
+        insert(StockSnapshot)
+        .from_select(
+            ["producto_id", "fecha", "stock_actual", "stock_rentado"],
+            select(actualizados.c.id, momento, actualizados.c.stock_actual, actualizados.c.stock_rentado),
+        )
+        .add_cte(actualizados)
+        .returning(StockSnapshot.id)
+    )
+    return len(insertados.all())
+
+
+def corregir_snapshots(db: Session, cambios: Iterable[tuple[int, datetime, int, int]]) -> int:
+    """Suma cambios retroactivos (producto_id, fecha, delta_actual, delta_rentado) a los snapshots desde su fecha.
+
+    Un movimiento con fecha anterior a un snapshot no está en la cola que se reproduce a partir de él: sin esta
+    corrección la reconstrucción lo perdería. Debe ejecutarse con el producto bloqueado, como en
+    `movimiento_service.create_movimientos_bulk`, para que no se registre un snapshot entre medio. No confirma la
+    transacción.
+    """
+    columnas: tuple[list, list, list, list] = ([], [], [], [])
+    for cambio in cambios:
+        if cambio[2] or cambio[3]:
+            for columna, valor in zip(columnas, cambio):
+                columna.append(valor)
+    if not columnas[0]:
+        return 0
+
+    cambio = (
+        func.unnest(
+            literal(columnas[0], ARRAY(Integer)),
+            literal(columnas[1], ARRAY(StockSnapshot.fecha.type)),
+            literal(columnas[2], ARRAY(Integer)),
+            literal(columnas[3], ARRAY(Integer)),
+        )
+        .table_valued("producto_id", "fecha", "delta_actual", "delta_rentado")
+        .render_derived()
+    )
+    # Un snapshot posterior a varios cambios recibe la suma de todos: UPDATE ... FROM aplica una sola fila por destino.
+    afectados = (
+        select(
+            StockSnapshot.id,
+            func.sum(cambio.c.delta_actual).label("delta_actual"),
+            func.sum(cambio.c.delta_rentado).label("delta_rentado"),
+        )
+        .join(cambio, and_(StockSnapshot.producto_id == cambio.c.producto_id, StockSnapshot.fecha >= cambio.c.fecha))
+        .group_by(StockSnapshot.id)
+        .subquery("afectados")
+    )
+    resultado = db.execute(
+        update(StockSnapshot)
+        .where(StockSnapshot.id == afectados.c.id)
+        .values(
+            stock_actual=StockSnapshot.stock_actual + afectados.c.delta_actual,
+            stock_rentado=StockSnapshot.stock_rentado + afectados.c.delta_rentado,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return resultado.rowcount
+
+
+def stock_a_fecha(
+    db: Session, fecha: datetime, *, cursor: str | None = None, limit: int = DEFAULT_LIMIT
+) -> tuple[list[Row], str | None]:
+    """Stock de todo el catálogo existente a `fecha`, paginado por nombre."""
+    fecha = _en_utc(fecha)
+    query = _consulta_stock(fecha).filter(Producto.fecha_creacion <= fecha)
+    query = paginate_query(query, orden=Producto.nombre, id_columna=Producto.id, cursor=cursor, limit=limit)
+    return build_page(db.execute(query).all(), limit=limit, clave=lambda fila: (fila.nombre, fila.producto_id))
+
+
+def stock_producto_a_fecha(db: Session, producto_id: int, fecha: datetime) -> Row:
+    fecha = _en_utc(fecha)
+    fila = db.execute(_consulta_stock(fecha).filter(Producto.id == producto_id)).first()
+    if fila is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado")
+    if fila.fecha_creacion > fecha:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="El producto no existía en esa fecha")
+    return fila
+
+
+def _en_utc(fecha: datetime) -> datetime:
+    # Una fecha sin zona (p. ej. `?fecha=2026-10-01`) se interpreta en UTC, como el resto de las fechas de la API.
+    return fecha if fecha.tzinfo is not None else fecha.replace(tzinfo=UTC)
+
+
+def _consulta_stock(fecha: datetime):
+    """Parte del snapshot más cercano anterior a `fecha` y suma los movimientos posteriores hasta `fecha`.
+
+    Sin snapshot previo (historia anterior a los snapshots) recorre el ledger hacia atrás desde el stock vigente.
+    """
+    snapshot = (
+        select(StockSnapshot.fecha, StockSnapshot.stock_actual, StockSnapshot.stock_rentado)
+        .where(StockSnapshot.producto_id == Producto.id, StockSnapshot.fecha <= fecha)
+        .order_by(StockSnapshot.fecha.desc())
+        .limit(1)
+        .lateral("snapshot")
+    )
+    cola = (
+        select(
+            func.coalesce(func.sum(DELTA_ACTUAL), 0).label("actual"),
+            func.coalesce(func.sum(DELTA_RENTADO), 0).label("rentado"),
+        )
+        .where(
+            MovimientoStock.producto_id == Producto.id,
+            MovimientoStock.fecha > func.coalesce(snapshot.c.fecha, fecha),
+            or_(snapshot.c.fecha.is_(None), MovimientoStock.fecha <= fecha),
+        )
+        .lateral("cola")
+    )
+    signo = case((snapshot.c.fecha.is_(None), -1), else_=1)
+    return (
+        select(
+            Producto.id.label("producto_id"),
+            Producto.codigo,
+            Producto.nombre,
+            Producto.fecha_creacion,
+            literal(fecha, StockSnapshot.fecha.type).label("fecha"),
+            (func.coalesce(snapshot.c.stock_actual, Producto.stock_actual) + signo * cola.c.actual).label("stock_actual"),
+            (func.coalesce(snapshot.c.stock_rentado, Producto.stock_rentado) + signo * cola.c.rentado).label(
+                "stock_rentado"
+            ),
+        )
+        .select_from(Producto)
+        .join(snapshot, true(), isouter=True)
+        .join(cola, true())
+    )
+
+
+def main() -> None:
+    db = SessionLocal()
+    try:
+        cantidad = registrar_snapshots(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Snapshots registrados: {cantidad}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Plugin de pytest para los tests de la API (se carga con `-p app.testing`, ya incluido en `addopts`).
+
+Durante los tests los presupuestos de consultas declarados en las rutas lanzan en vez de solo loguear, y el
+fixture `max_consultas` permite fijar un máximo para cualquier bloque:
+
+    def test_listar_productos(client, max_consultas):
+        with max_consultas(2):
+            client.get("/api/productos/", headers=headers)
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+
+import pytest
+
+from app.core import instrumentacion
+from app.core.config import settings
+
+
+@pytest.fixture(autouse=True)
+def _presupuestos_estrictos(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "query_budget_mode", "raise")
+
+
+@pytest.fixture
+def max_consultas() -> Callable[[int], AbstractContextManager[instrumentacion.ConsultasRequest]]:
+    """Falla el test si el bloque ejecuta más de `maximo` sentencias SQL, listando las repetidas."""
+
+    @contextmanager
+    def _max_consultas(maximo: int) -> Iterator[instrumentacion.ConsultasRequest]:
+        with instrumentacion.observar_consultas() as consultas:
+            yield consultas
+        if consultas.cantidad > maximo:
+            pytest.fail(f"Se esperaban como máximo {maximo} sentencias SQL: {consultas.reporte()}", pytrace=False)
+
+    return _max_consultas
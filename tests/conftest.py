@@ -0,0 +1,105 @@
+"""Fixtures de los tests de la API.
+
+Corren contra la base de `DATABASE_URL` (una base descartable con las migraciones aplicadas: `alembic upgrade head`)
+y crean sus propios datos con códigos únicos, así que no dependen de lo que ya haya cargado. Sin base accesible los
+tests se saltean.
+"""
+from __future__ import annotations
+
+import uuid
+from collections.abc import Callable, Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.security import get_password_hash
+from app.db.session import SessionLocal, engine
+from app.main import app
+from app.models.cliente import Cliente
+from app.models.deposito import Deposito
+from app.models.user import User
+
+ADMIN_EMAIL = "tests@example.com"
+ADMIN_PASSWORD = "tests-admin"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _base_de_datos() -> None:
+    try:
+        with engine.connect() as conexion:
+            conexion.execute(text("SELECT 1 FROM productos LIMIT 1"))
+    except OperationalError as exc:
+        pytest.skip(f"Base de datos no disponible: {exc.orig}")
+
+
+@pytest.fixture(scope="session")
+def client() -> Iterator[TestClient]:
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def headers(client: TestClient) -> dict[str, str]:
+    with SessionLocal() as db:
+        if not db.scalar(select(User.id).where(User.email == ADMIN_EMAIL)):
+            db.add(
+                User(
+                    nombre="Tests",
+                    email=ADMIN_EMAIL,
+                    rol="admin",
+                    hashed_password=get_password_hash(ADMIN_PASSWORD),
+                )
+            )
+            db.commit()
+    respuesta = client.post("/api/auth/login", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+    assert respuesta.status_code == 200, respuesta.text
+    return {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+
+
+@pytest.fixture
+def sufijo() -> str:
+    return uuid.uuid4().hex[:10]
+
+
+@pytest.fixture(scope="session")
+def deposito_id() -> int:
+    with SessionLocal() as db:
+        deposito = Deposito(nombre=f"Depósito tests {uuid.uuid4().hex[:8]}")
+        db.add(deposito)
+        db.commit()
+        return deposito.id
+
+
+@pytest.fixture(scope="session")
+def cliente_id() -> int:
+    with SessionLocal() as db:
+        cliente = Cliente(nombre=f"Cliente tests {uuid.uuid4().hex[:8]}")
+        db.add(cliente)
+        db.commit()
+        return cliente.id
+
+
+@pytest.fixture
+def crear_producto(client: TestClient, headers: dict[str, str], deposito_id: int) -> Callable[..., dict]:
+    """Crea un producto por la API; los campos que se pasen reemplazan a los de ejemplo."""
+
+    def _crear_producto(**campos) -> dict:
+        codigo = campos.pop("codigo", f"T-{uuid.uuid4().hex[:12]}")
+        datos = {
+            "nombre": f"Producto {codigo}",
+            "codigo": codigo,
+            "unidad_medida": "pieza",
+            "tipo_vajilla": "Plato",
+            "material": "Porcelana",
+            "stock_actual": 10,
+            "stock_minimo": 0,
+            "deposito_principal_id": deposito_id,
+            **campos,
+        }
+        respuesta = client.post("/api/productos/", headers=headers, json=datos)
+        assert respuesta.status_code == 201, respuesta.text
+        return respuesta.json()
+
+    return _crear_producto
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.db.session import SessionLocal
+from app.services import alquiler_service, disponibilidad_service
+
+
+@pytest.fixture
+def crear_alquiler(client, headers, cliente_id, sufijo):
+    numeros = iter(range(1000))
+
+    def _crear_alquiler(producto_id: int, cantidad: int, desde: str, hasta: str, *, confirmar: bool = False) -> dict:
+        alquiler = {
+            "codigo": f"T-{sufijo}-{next(numeros)}",
+            "cliente_id": cliente_id,
+            "fecha_desde": desde,
+            "fecha_hasta": hasta,
+            "items": [{"producto_id": producto_id, "cantidad": cantidad}],
+        }
+        respuesta = client.post("/api/alquileres/", headers=headers, json=alquiler)
+        assert respuesta.status_code == 201, respuesta.text
+        if confirmar:
+            respuesta = client.post(f"/api/alquileres/{respuesta.json()['id']}/confirmar", headers=headers)
+            assert respuesta.status_code == 200, respuesta.text
+        return respuesta.json()
+
+    return _crear_alquiler
+
+
+def _stock(client, headers, producto_id: int) -> tuple[int, int, int]:
+    producto = client.get(f"/api/productos/{producto_id}", headers=headers).json()
+    return producto["stock_actual"], producto["stock_rentado"], producto["stock_disponible"]
+
+
+def _disponible(client, headers, producto_id: int, desde: str, hasta: str) -> int:
+    consulta = {"fecha_desde": desde, "fecha_hasta": hasta, "items": [{"producto_id": producto_id, "cantidad": 1}]}
+    respuesta = client.post("/api/alquileres/disponibilidad", headers=headers, json=consulta)
+    assert respuesta.status_code == 200, respuesta.text
+    return respuesta.json()[0]["disponible"]
+
+
+def test_disponibilidad_por_ventana(client, headers, crear_producto, crear_alquiler) -> None:
+    producto_id = crear_producto(stock_actual=10)["id"]
+    crear_alquiler(producto_id, 6, "2030-03-01T00:00:00Z", "2030-03-05T00:00:00Z", confirmar=True)
+
+    assert _disponible(client, headers, producto_id, "2030-03-04T00:00:00Z", "2030-03-10T00:00:00Z") == 4
+    # Intervalos semiabiertos: termina justo cuando empieza la ventana, no se solapa.
+    assert _disponible(client, headers, producto_id, "2030-03-05T00:00:00Z", "2030-03-10T00:00:00Z") == 10
+
+
+def test_fechas_sin_zona_se_toman_en_utc(client, headers, crear_producto, crear_alquiler) -> None:
+    producto_id = crear_producto(stock_actual=10)["id"]
+    alquiler = crear_alquiler(producto_id, 6, "2030-04-01T00:00:00", "2030-04-05T00:00:00", confirmar=True)
+
+    assert alquiler["fecha_desde"] == "2030-04-01T00:00:00Z"
+    assert _disponible(client, headers, producto_id, "2030-04-02T00:00:00", "2030-04-03T00:00:00") == 4
+    respuesta = client.put(
+        f"/api/alquileres/{alquiler['id']}", headers=headers, json={"fecha_hasta": "2030-04-06T00:00:00"}
+    )
+    assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.json()["fecha_hasta"] == "2030-04-06T00:00:00Z"
+
+
+def test_alquiler_que_no_entra_se_rechaza(client, headers, cliente_id, crear_producto, crear_alquiler) -> None:
+    producto_id = crear_producto(stock_actual=10)["id"]
+    crear_alquiler(producto_id, 6, "2030-05-01T00:00:00Z", "2030-05-05T00:00:00Z", confirmar=True)
+    alquiler = {
+        "codigo": f"T-excede-{producto_id}",
+        "cliente_id": cliente_id,
+        "fecha_desde": "2030-05-03T00:00:00",
+        "fecha_hasta": "2030-05-06T00:00:00",
+        "items": [{"producto_id": producto_id, "cantidad": 5}],
+    }
+
+    respuesta = client.post("/api/alquileres/", headers=headers, json=alquiler)
+
+    assert respuesta.status_code == 400
+    assert respuesta.json()["detail"].startswith("Stock insuficiente para las fechas del alquiler")
+
+
+def test_confirmaciones_concurrentes_no_reservan_las_mismas_unidades(
+    monkeypatch, crear_producto, crear_alquiler
+) -> None:
+    producto_id = crear_producto(stock_actual=10)["id"]
+    ids = [
+        crear_alquiler(producto_id, 8, "2030-06-01T00:00:00Z", "2030-06-04T00:00:00Z")["id"],
+        crear_alquiler(producto_id, 8, "2030-06-02T00:00:00Z", "2030-06-05T00:00:00Z")["id"],
+    ]
+    # Cada confirmación espera a la otra después de calcular la disponibilidad. Sin bloqueo las dos calculan sobre
+    # el mismo estado; con bloqueo la segunda sigue esperando el lock, la barrera vence y calcula tras el commit.
+    barrera = threading.Barrier(len(ids))
+    calcular = disponibilidad_service.calcular_disponibilidad
+
+    def calcular_y_esperar(*args, **kwargs):
+        resultado = calcular(*args, **kwargs)
+        try:
+            barrera.wait(1)
+        except threading.BrokenBarrierError:
+            pass
+        return resultado
+
+    monkeypatch.setattr(disponibilidad_service, "calcular_disponibilidad", calcular_y_esperar)
+    resultados: dict[int, object] = {}
+
+    def confirmar(alquiler_id: int) -> None:
+        with SessionLocal() as db:
+            alquiler = alquiler_service.get_alquiler_or_404(db, alquiler_id)
+            try:
+                resultados[alquiler_id] = alquiler_service.confirm_alquiler(db, alquiler).estado
+            except HTTPException as exc:
+                resultados[alquiler_id] = exc.detail
+
+    hilos = [threading.Thread(target=confirmar, args=(alquiler_id,)) for alquiler_id in ids]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(10)
+
+    rechazos = [resultado for resultado in resultados.values() if resultado != "Confirmado"]
+    assert len(resultados) == 2
+    assert len(rechazos) == 1
+    assert rechazos[0].startswith("Stock insuficiente para las fechas del alquiler")
+
+
+def test_reservas_en_fechas_distintas_no_compiten(client, headers, crear_producto, crear_alquiler) -> None:
+    producto_id = crear_producto(stock_actual=10)["id"]
+    primero = crear_alquiler(producto_id, 8, "2030-07-01T00:00:00Z", "2030-07-03T00:00:00Z", confirmar=True)
+    segundo = crear_alquiler(producto_id, 8, "2030-08-01T00:00:00Z", "2030-08-03T00:00:00Z", confirmar=True)
+
+    # Confirmar solo reserva las fechas: el stock no se mueve hasta el retiro.
+    assert (primero["estado"], segundo["estado"]) == ("Confirmado", "Confirmado")
+    assert _stock(client, headers, producto_id) == (10, 0, 10)
+
+
+def test_retiro_y_devolucion_mueven_el_stock(client, headers, crear_producto, crear_alquiler) -> None:
+    producto_id = crear_producto(stock_actual=10)["id"]
+    primero = crear_alquiler(producto_id, 8, "2030-09-01T00:00:00Z", "2030-09-03T00:00:00Z", confirmar=True)
+    segundo = crear_alquiler(producto_id, 8, "2030-10-01T00:00:00Z", "2030-10-03T00:00:00Z", confirmar=True)
+
+    sin_retirar = client.post(f"/api/alquileres/{primero['id']}/registrar-devolucion", headers=headers)
+    retirado = client.post(f"/api/alquileres/{primero['id']}/retirar", headers=headers)
+    # Las unidades del primero no volvieron: el segundo no puede salir todavía.
+    adelantado = client.post(f"/api/alquileres/{segundo['id']}/retirar", headers=headers)
+
+    assert sin_retirar.status_code == 400
+    assert (retirado.status_code, retirado.json()["estado"]) == (200, "En curso")
+    assert _stock(client, headers, producto_id) == (10, 8, 2)
+    assert (adelantado.status_code, adelantado.json()["detail"]) == (400, "Stock insuficiente para alquiler")
+
+    devuelto = client.post(f"/api/alquileres/{primero['id']}/registrar-devolucion", headers=headers)
+    retirado = client.post(f"/api/alquileres/{segundo['id']}/retirar", headers=headers)
+
+    assert (devuelto.status_code, devuelto.json()["estado"]) == (200, "Finalizado")
+    assert (retirado.status_code, retirado.json()["estado"]) == (200, "En curso")
+    assert _stock(client, headers, producto_id) == (10, 8, 2)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from app.services import importacion_service
+
+
+def _importar(client, headers, contenido: bytes, nombre: str = "productos.csv"):
+    return client.post("/api/productos/importar", headers=headers, files={"archivo": (nombre, contenido, "text/csv")})
+
+
+def test_importacion_crea_y_actualiza(client, headers, crear_producto, deposito_id, sufijo) -> None:
+    existente = crear_producto(stock_actual=4)
+    contenido = (
+        "codigo;nombre;unidad_medida;tipo_vajilla;material;stock_actual;deposito_principal_id\n"
+        f"N-{sufijo};Fuente nueva;pieza;Fuente;Loza;7;{deposito_id}\n"
+        f"{existente['codigo']};;;;;9;\n"
+        f"X-{sufijo};Sin stock;pieza;Fuente;Loza;-1;{deposito_id}\n"
+    ).encode()
+
+    respuesta = _importar(client, headers, contenido)
+
+    assert respuesta.status_code == 200, respuesta.text
+    resumen = respuesta.json()
+    assert (resumen["procesadas"], resumen["creados"], resumen["actualizados"]) == (3, 1, 1)
+    assert [error["fila"] for error in resumen["errores"]] == [4]
+    nuevo = client.get("/api/productos/", headers=headers, params={"search": f"N-{sufijo}"}).json()["items"]
+    assert [(producto["codigo"], producto["stock_actual"]) for producto in nuevo] == [(f"N-{sufijo}", 7)]
+    actualizado = client.get(f"/api/productos/{existente['id']}", headers=headers).json()
+    assert (actualizado["stock_actual"], actualizado["stock_disponible"]) == (9, 9)
+
+
+def test_csv_que_no_es_utf8(client, headers, sufijo) -> None:
+    contenido = f"codigo;nombre\nL-{sufijo};Café señorial\n".encode("latin-1")
+
+    respuesta = _importar(client, headers, contenido)
+
+    assert respuesta.status_code == 400
+    assert "UTF-8" in respuesta.json()["detail"]
+
+
+def test_entero_fuera_de_rango_es_error_de_fila(client, headers, deposito_id, sufijo) -> None:
+    contenido = (
+        "codigo;nombre;unidad_medida;tipo_vajilla;material;stock_actual;deposito_principal_id\n"
+        f"G-{sufijo};Fuente grande;pieza;Fuente;Loza;99999999999;{deposito_id}\n"
+        f"B-{sufijo};Fuente chica;pieza;Fuente;Loza;3;{deposito_id}\n"
+    ).encode()
+
+    respuesta = _importar(client, headers, contenido)
+
+    assert respuesta.status_code == 200, respuesta.text
+    resumen = respuesta.json()
+    assert resumen["creados"] == 1
+    assert [(error["fila"], error["error"].split(":")[0]) for error in resumen["errores"]] == [(2, "stock_actual")]
+
+
+def test_error_del_copy_se_informa_por_fila(monkeypatch, client, headers, deposito_id, sufijo) -> None:
+    # Un valor que la base rechaza en el COPY (aquí, forzado con un byte nulo) no llega como DBAPIError.
+    copiar = importacion_service._copiar
+
+    def copiar_con_nulo(db, filas):
+        copiar(db, [{**fila, "nombre": "nulo\x00"} for fila in filas])
+
+    monkeypatch.setattr(importacion_service, "_copiar", copiar_con_nulo)
+    contenido = (
+        "codigo;nombre;unidad_medida;tipo_vajilla;material;stock_actual;deposito_principal_id\n"
+        f"Z-{sufijo};Fuente;pieza;Fuente;Loza;1;{deposito_id}\n"
+    ).encode()
+
+    respuesta = _importar(client, headers, contenido)
+
+    assert respuesta.status_code == 200, respuesta.text
+    assert [error["fila"] for error in respuesta.json()["errores"]] == [2]
+    assert respuesta.json()["creados"] == 0
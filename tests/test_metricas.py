@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+from app.services import metricas_service
+
+
+def test_variaciones_sin_commit_no_pasan_a_la_transaccion_siguiente() -> None:
+    db = SessionLocal()
+    try:
+        antes = metricas_service.obtener_metricas(db)["cantidad_depositos"]
+        db.rollback()
+
+        db.execute(text("SELECT 1"))
+        metricas_service.acumular(db, cantidad_depositos=1_000)
+        db.close()
+
+        db.execute(text("SELECT 1"))
+        db.commit()
+        assert metricas_service.obtener_metricas(db)["cantidad_depositos"] == antes
+    finally:
+        db.close()
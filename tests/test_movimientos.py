@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import threading
+
+from app.db.session import SessionLocal
+from app.schemas.movimiento import MovimientoCreate
+from app.schemas.producto import ProductoUpdate
+from app.services import movimiento_service, producto_service
+
+
+def _stock(client, headers, producto_id: int) -> tuple[int, int, int]:
+    producto = client.get(f"/api/productos/{producto_id}", headers=headers).json()
+    return producto["stock_actual"], producto["stock_rentado"], producto["stock_disponible"]
+
+
+def _mover(client, headers, producto_id: int, tipo: str, cantidad: int, **extra):
+    movimiento = {"producto_id": producto_id, "tipo": tipo, "cantidad": cantidad, **extra}
+    return client.post("/api/movimientos/", headers=headers, json=movimiento)
+
+
+def test_deltas_por_tipo(client, headers, crear_producto) -> None:
+    producto_id = crear_producto(stock_actual=10)["id"]
+
+    assert _mover(client, headers, producto_id, "INGRESO", 5).status_code == 201
+    assert _stock(client, headers, producto_id) == (15, 0, 15)
+    assert _mover(client, headers, producto_id, "ALQUILER", 4).status_code == 201
+    assert _stock(client, headers, producto_id) == (15, 4, 11)
+    assert _mover(client, headers, producto_id, "DEVOLUCION", 1).status_code == 201
+    assert _stock(client, headers, producto_id) == (15, 3, 12)
+    assert _mover(client, headers, producto_id, "AJUSTE", 2, ajuste_positivo=False).status_code == 201
+    assert _stock(client, headers, producto_id) == (13, 3, 10)
+    assert _mover(client, headers, producto_id, "EGRESO", 3).status_code == 201
+    assert _stock(client, headers, producto_id) == (10, 3, 7)
+
+
+def test_movimientos_invalidos_no_cambian_el_stock(client, headers, crear_producto) -> None:
+    producto_id = crear_producto(stock_actual=5)["id"]
+    assert _mover(client, headers, producto_id, "ALQUILER", 2).status_code == 201
+
+    egreso = _mover(client, headers, producto_id, "EGRESO", 4)
+    devolucion = _mover(client, headers, producto_id, "DEVOLUCION", 3)
+    alquiler = _mover(client, headers, producto_id, "ALQUILER", 4)
+
+    assert (egreso.status_code, egreso.json()["detail"]) == (400, "Stock insuficiente")
+    assert (devolucion.status_code, devolucion.json()["detail"]) == (400, "Cantidad devuelta mayor al rentado")
+    assert (alquiler.status_code, alquiler.json()["detail"]) == (400, "Stock insuficiente para alquiler")
+    assert _stock(client, headers, producto_id) == (5, 2, 3)
+
+
+def test_lote_es_atomico(client, headers, crear_producto) -> None:
+    primero, segundo = crear_producto(stock_actual=5)["id"], crear_producto(stock_actual=1)["id"]
+    lote = {
+        "movimientos": [
+            {"producto_id": primero, "tipo": "EGRESO", "cantidad": 2},
+            {"producto_id": segundo, "tipo": "EGRESO", "cantidad": 2},
+        ]
+    }
+
+    assert client.post("/api/movimientos/lote", headers=headers, json=lote).status_code == 400
+    assert _stock(client, headers, primero) == (5, 0, 5)
+    assert _stock(client, headers, segundo) == (1, 0, 1)
+
+
+def test_edicion_de_stock_no_pisa_un_movimiento_concurrente(client, headers, crear_producto) -> None:
+    producto_id = crear_producto(stock_actual=10)["id"]
+    leido, movido = threading.Event(), threading.Event()
+    errores = []
+
+    def editar() -> None:
+        with SessionLocal() as db:
+            producto = producto_service.get_producto_or_404(db, producto_id)
+            leido.set()
+            movido.wait(5)
+            try:
+                producto_service.update_producto(db, producto, ProductoUpdate(stock_actual=producto.stock_actual + 1))
+            except Exception as exc:  # noqa: BLE001 - se informa desde el hilo principal
+                errores.append(exc)
+
+    hilo = threading.Thread(target=editar)
+    hilo.start()
+    leido.wait(5)
+    with SessionLocal() as db:
+        movimiento_service.create_movimiento(db, MovimientoCreate(producto_id=producto_id, tipo="INGRESO", cantidad=5))
+    movido.set()
+    hilo.join(10)
+
+    assert not errores
+    assert _stock(client, headers, producto_id)[0] == 16
+
+
+def test_lote_no_suma_sentencias_por_linea(client, headers, crear_producto, max_consultas) -> None:
+    productos = [crear_producto(stock_actual=10)["id"] for _ in range(30)]
+    lineas = [
+        {"producto_id": producto_id, "tipo": tipo, "cantidad": 1}
+        for producto_id in productos
+        for tipo in ("INGRESO", "EGRESO")
+    ]
+
+    with max_consultas(100) as corto:
+        assert client.post("/api/movimientos/lote", headers=headers, json={"movimientos": lineas[:2]}).status_code == 201
+    with max_consultas(corto.cantidad) as largo:
+        assert client.post("/api/movimientos/lote", headers=headers, json={"movimientos": lineas}).status_code == 201
+
+    assert largo.cantidad == corto.cantidad
+    assert _stock(client, headers, productos[-1]) == (10, 0, 10)
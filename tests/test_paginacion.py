@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+
+def _recorrer(client, headers, ruta: str, **params) -> list[dict]:
+    items, cursor = [], None
+    while True:
+        respuesta = client.get(ruta, headers=headers, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert respuesta.status_code == 200, respuesta.text
+        pagina = respuesta.json()
+        items += pagina["items"]
+        cursor = pagina["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_movimientos_por_cursor_sin_repetir_ni_saltear(client, headers, crear_producto) -> None:
+    producto = crear_producto()
+    for cantidad in range(1, 6):
+        movimiento = {"producto_id": producto["id"], "tipo": "INGRESO", "cantidad": cantidad}
+        assert client.post("/api/movimientos/", headers=headers, json=movimiento).status_code == 201
+
+    completos = client.get("/api/movimientos/", headers=headers, params={"producto_id": producto["id"]}).json()
+    paginados = _recorrer(client, headers, "/api/movimientos/", producto_id=producto["id"], limit=2)
+
+    # El alta deja su propio movimiento en el ledger además de los cinco ingresos.
+    assert len(completos["items"]) == 6
+    assert completos["next_cursor"] is None
+    assert [movimiento["id"] for movimiento in paginados] == [movimiento["id"] for movimiento in completos["items"]]
+    claves = [(movimiento["fecha"], movimiento["id"]) for movimiento in paginados]
+    assert claves == sorted(claves, reverse=True)
+
+
+def test_busqueda_de_productos_por_cursor(client, headers, crear_producto, sufijo) -> None:
+    creados = {crear_producto(nombre=f"Bandeja {sufijo} {numero}")["id"] for numero in range(5)}
+
+    encontrados = _recorrer(client, headers, "/api/productos/", search=sufijo, limit=2)
+
+    assert [producto["id"] for producto in encontrados if producto["id"] in creados] == [
+        producto["id"] for producto in encontrados
+    ]
+    assert {producto["id"] for producto in encontrados} == creados
+    assert len(encontrados) == len(creados)
+
+
+def test_cursor_invalido(client, headers) -> None:
+    respuesta = client.get("/api/productos/", headers=headers, params={"cursor": "no-es-un-cursor"})
+    assert respuesta.status_code == 400
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import pytest
+
+from app.db.plan_check import verificar_planes
+from app.db.session import engine
+
+pytestmark = [
+    pytest.mark.planes,
+    pytest.mark.skipif(engine.dialect.name != "postgresql", reason="El chequeo de planes requiere PostgreSQL"),
+]
+
+
+def test_consultas_de_los_servicios_usan_indices() -> None:
+    fallas = {nombre: sin_indice for nombre, sin_indice, _ in verificar_planes(productos=2_000) if sin_indice}
+    assert not fallas, "Recorridos completos sin índice: " + "; ".join(
+        f"{nombre} en {', '.join(sorted(tablas))}" for nombre, tablas in fallas.items()
+    )
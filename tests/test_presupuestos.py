@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.api.deps import presupuesto_consultas
+from app.core.instrumentacion import (
+    PresupuestoConsultasExcedido,
+    PresupuestoConsultasMiddleware,
+)
+from app.db.session import engine
+
+
+def _app_con_presupuesto(maximo: int, sentencias: int) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(PresupuestoConsultasMiddleware)
+
+    @app.get("/consultas", dependencies=[Depends(presupuesto_consultas(maximo))])
+    def consultas() -> dict:
+        with engine.connect() as conexion:
+            for numero in range(sentencias):
+                conexion.execute(text("SELECT :numero"), {"numero": numero})
+        return {"ok": True}
+
+    return app
+
+
+def test_presupuesto_excedido_lanza_en_tests() -> None:
+    with (
+        TestClient(_app_con_presupuesto(maximo=1, sentencias=3)) as client,
+        pytest.raises(PresupuestoConsultasExcedido, match=r"3 sentencias SQL.*\n  3x SELECT"),
+    ):
+        client.get("/consultas")
+
+
+def test_presupuesto_excedido_responde_500_antes_de_enviar() -> None:
+    with TestClient(_app_con_presupuesto(maximo=1, sentencias=3), raise_server_exceptions=False) as client:
+        assert client.get("/consultas").status_code == 500
+
+
+def test_presupuesto_respetado() -> None:
+    with TestClient(_app_con_presupuesto(maximo=3, sentencias=3)) as client:
+        assert client.get("/consultas").status_code == 200
+
+
+def test_listado_de_productos_en_dos_consultas(client, headers, crear_producto, max_consultas) -> None:
+    for _ in range(3):
+        crear_producto()
+    with max_consultas(2) as consultas:
+        respuesta = client.get("/api/productos/", headers=headers, params={"limit": 50})
+    assert respuesta.status_code == 200
+    assert len(respuesta.json()["items"]) >= 3
+    assert not consultas.repetidas()
+
+
+def test_max_consultas_falla_si_se_supera(max_consultas) -> None:
+    with (
+        pytest.raises(pytest.fail.Exception, match="como máximo 1 sentencias SQL"),
+        max_consultas(1),
+        engine.connect() as conexion,
+    ):
+        conexion.execute(text("SELECT 1"))
+        conexion.execute(text("SELECT 1"))
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from sqlalchemy import update
+
+from app.db.session import SessionLocal
+from app.models.producto import Producto
+from app.services.reconcile import reconciliar_bloque
+
+
+def test_sin_deriva_despues_de_movimientos(client, headers, crear_producto) -> None:
+    producto_id = crear_producto(stock_actual=10)["id"]
+    for tipo, cantidad in (("INGRESO", 3), ("ALQUILER", 4), ("DEVOLUCION", 2)):
+        movimiento = {"producto_id": producto_id, "tipo": tipo, "cantidad": cantidad}
+        assert client.post("/api/movimientos/", headers=headers, json=movimiento).status_code == 201
+    assert client.put(f"/api/productos/{producto_id}", headers=headers, json={"stock_actual": 20}).status_code == 200
+
+    resumen = reconciliar_bloque(producto_id, producto_id)
+
+    assert (resumen["productos"], resumen["con_deriva"]) == (1, 0)
+
+
+def test_detecta_y_repara_la_deriva(crear_producto) -> None:
+    producto_id = crear_producto(stock_actual=10)["id"]
+    with SessionLocal() as db:
+        db.execute(update(Producto).where(Producto.id == producto_id).values(stock_actual=13, stock_disponible=13))
+        db.commit()
+
+    informe = reconciliar_bloque(producto_id, producto_id)
+    reparacion = reconciliar_bloque(producto_id, producto_id, reparar=True)
+    despues = reconciliar_bloque(producto_id, producto_id)
+
+    assert informe["con_deriva"] == 1
+    assert informe["muestras"] == [
+        {"producto_id": producto_id, "stock_actual": [13, 10], "stock_rentado": [0, 0], "stock_disponible": [13, 10]}
+    ]
+    assert informe["reparados"] == 0
+    assert reparacion["reparados"] == 1
+    assert despues["con_deriva"] == 0
+    with SessionLocal() as db:
+        producto = db.get(Producto, producto_id)
+        assert (producto.stock_actual, producto.stock_disponible) == (10, 10)
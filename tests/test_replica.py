@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.db import replica
+from app.db.session import AsyncSessionLocal
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(replica.LecturaPropiaMiddleware)
+
+    @app.post("/escribir")
+    async def escribir() -> dict:
+        async with AsyncSessionLocal(info={"usuario_id": 7}) as db:
+            await db.execute(text("SELECT 1"))
+            await db.commit()
+        return {"ok": True}
+
+    @app.get("/leer")
+    async def leer() -> dict:
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+        return {"ok": True}
+
+    return app
+
+
+def test_escritura_marca_al_cliente_para_leer_del_primario() -> None:
+    with TestClient(_app()) as client:
+        assert replica.COOKIE not in client.get("/leer").cookies
+        cookie = client.post("/escribir").cookies.get(replica.COOKIE)
+
+    assert replica.escribio_recientemente(7, cookie)
+    assert not replica.escribio_recientemente(8, cookie)
+    usuario_id, vencimiento, _ = cookie.split(".")
+    assert not replica.escribio_recientemente(7, f"{usuario_id}.{int(vencimiento) + 60}.{'0' * 64}")
+    assert not replica.escribio_recientemente(7, replica.marca(7, int(vencimiento) - 3600))
+    assert not replica.escribio_recientemente(7, None)
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+
+from app.db.session import SessionLocal
+from app.services import stock_historico_service
+
+
+def _stock_a_fecha(client, headers, producto_id: int, fecha: datetime) -> tuple[int, int]:
+    respuesta = client.get(
+        f"/api/productos/{producto_id}/stock-historico", headers=headers, params={"fecha": fecha.isoformat()}
+    )
+    assert respuesta.status_code == 200, respuesta.text
+    return respuesta.json()["stock_actual"], respuesta.json()["stock_rentado"]
+
+
+def test_movimiento_anterior_a_un_snapshot_entra_en_la_reconstruccion(client, headers, crear_producto) -> None:
+    producto_id = crear_producto(stock_actual=10)["id"]
+    antes = datetime.now(UTC)
+    fecha_movimiento = antes + timedelta(milliseconds=5)
+    with SessionLocal() as db:
+        # Snapshot posterior a la fecha con la que se registra el movimiento.
+        stock_historico_service.registrar_snapshots(db, [producto_id], fecha=fecha_movimiento + timedelta(seconds=1))
+        db.commit()
+
+    movimientos = [
+        {"producto_id": producto_id, "tipo": "INGRESO", "cantidad": 5, "fecha": fecha_movimiento.isoformat()},
+        {"producto_id": producto_id, "tipo": "ALQUILER", "cantidad": 2, "fecha": fecha_movimiento.isoformat()},
+    ]
+    for movimiento in movimientos:
+        assert client.post("/api/movimientos/", headers=headers, json=movimiento).status_code == 201
+
+    assert _stock_a_fecha(client, headers, producto_id, antes) == (10, 0)
+    assert _stock_a_fecha(client, headers, producto_id, fecha_movimiento + timedelta(seconds=2)) == (15, 2)